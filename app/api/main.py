@@ -1,5 +1,6 @@
 from fastapi import APIRouter
-from app.api.routes import minio
+from app.api.routes import minio, split
 
 api_router = APIRouter()
 api_router.include_router(minio.router, prefix="/minio", tags=["minio"])
+api_router.include_router(split.router, prefix="/split", tags=["split"])
@@ -1,11 +1,51 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
-from typing import Optional
-from io import BytesIO
+import re
+from datetime import datetime
+from email.utils import format_datetime
+from fastapi import APIRouter, UploadFile, File, Form, Header, HTTPException
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel
+from typing import List, Optional, Tuple
 from app.services.minio_service import get_minio_service
+from app.exceptions import FileDownloadError, FileValidationError, ServiceBusyError
 
 router = APIRouter()
 minio_service = get_minio_service()
 
+
+class ObjectNamesRequest(BaseModel):
+    """批量操作请求体"""
+    object_names: List[str]
+
+
+_RANGE_RE = re.compile(r"bytes=(\d*)-(\d*)")
+
+
+def _parse_range(header: Optional[str]) -> Optional[Tuple[Optional[int], Optional[int]]]:
+    """解析单段 Range（bytes=a-b / bytes=a- / bytes=-n）；多段或格式无效时返回 None，按 RFC 9110 忽略并返回整个文件"""
+    match = _RANGE_RE.fullmatch(header.strip()) if header else None
+    if not match or not (match.group(1) or match.group(2)):
+        return None
+    start = int(match.group(1)) if match.group(1) else None
+    end = int(match.group(2)) if match.group(2) else None
+    if start is not None and end is not None and end < start:
+        return None
+    return start, end
+
+
+def _parse_etags(header: Optional[str]) -> Optional[List[str]]:
+    """解析 If-None-Match 中的 ETag 列表（去掉引号与弱校验前缀 W/）"""
+    if not header:
+        return None
+    return [tag.strip().removeprefix("W/").strip('"') for tag in header.split(",")]
+
+class PresignUploadRequest(BaseModel):
+    """预签名上传请求体"""
+    filename: Optional[str] = None
+    object_name: Optional[str] = None
+    expires: Optional[int] = None
+    max_size: Optional[int] = None  # 仅 POST 策略使用
+
+
 @router.post("/upload")
 async def upload_file(
     file: UploadFile = File(...),
@@ -24,33 +64,184 @@ async def upload_file(
         dict: 上传结果
     """
     try:
-        # 读取文件内容
-        content = await file.read()
-        file_obj = BytesIO(content)
-        
+        # 直接传入上传的临时文件（超过 1MB 时已落盘），由上传按分片读取，不在内存中复制整个文件
         result = await minio_service.upload_file(
-            file_obj=file_obj,
+            file_obj=file.file,
             filename=file.filename,
             object_name=object_name,
             original_url=original_url
         )
         return result
+    except ServiceBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.delete("/delete")
-async def delete_file(object_name: str):
+async def delete_file(object_name: str, check_exists: bool = True):
     """
     删除文件接口
     
     Args:
         object_name: 要删除的对象名称
+        check_exists: 是否先检查文件是否存在（False 时为幂等删除，不额外发送 stat 请求）
         
     Returns:
         dict: 删除结果
     """
     try:
-        result = await minio_service.delete_file(object_name=object_name)
+        result = await minio_service.delete_file(object_name=object_name, check_exists=check_exists)
         return result
+    except ServiceBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/files_info")
+async def get_files_info(request: ObjectNamesRequest):
+    """
+    批量查询文件信息接口
+    
+    Args:
+        request: 包含对象名称列表的请求体
+        
+    Returns:
+        dict: 逐个对象的查询结果
+    """
+    try:
+        return await minio_service.get_files_info(request.object_names)
+    except ServiceBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/delete_files")
+async def delete_files(request: ObjectNamesRequest):
+    """
+    批量删除文件接口
+    
+    Args:
+        request: 包含对象名称列表的请求体
+        
+    Returns:
+        dict: 逐个对象的删除结果
+    """
+    try:
+        return await minio_service.delete_files(request.object_names)
+    except ServiceBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/presign/upload")
+async def presign_upload_url(request: PresignUploadRequest):
+    """
+    预签名上传 URL 接口（PUT）
+    
+    Args:
+        request: 文件名 / 对象名称与有效期
+        
+    Returns:
+        dict: 预签名 URL 及上传时需要携带的请求头
+    """
+    try:
+        return await minio_service.presigned_upload_url(request.object_name, request.filename, request.expires)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/presign/post")
+async def presign_post_policy(request: PresignUploadRequest):
+    """
+    预签名表单上传策略接口（POST，可限制文件大小与类型）
+    
+    Args:
+        request: 文件名 / 对象名称、有效期与文件大小上限
+        
+    Returns:
+        dict: 上传地址与需要随表单提交的字段
+    """
+    try:
+        return await minio_service.presigned_post_policy(
+            request.object_name, request.filename, request.expires, request.max_size
+        )
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/presign/download")
+async def presign_download_url(object_name: str, expires: Optional[int] = None, filename: Optional[str] = None):
+    """
+    预签名下载 URL 接口（GET）
+    
+    Args:
+        object_name: 对象名称
+        expires: 有效期（秒）
+        filename: 下载时保存的文件名（提供时以附件形式下载）
+        
+    Returns:
+        dict: 预签名 URL
+    """
+    try:
+        return await minio_service.presigned_download_url(object_name, expires, filename)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/objects/{object_name:path}")
+async def download_object(
+    object_name: str,
+    range_header: Optional[str] = Header(None, alias="Range"),
+    if_none_match: Optional[str] = Header(None)
+):
+    """
+    下载文件接口（流式）
+    
+    按块转发 MinIO 的响应，不在内存中缓冲整个文件；支持单段 Range（206）与 If-None-Match（304）。
+    
+    Args:
+        object_name: 对象名称（路径）
+        range_header: Range 请求头
+        if_none_match: If-None-Match 请求头
+        
+    Returns:
+        StreamingResponse: 文件内容
+    """
+    byte_range = _parse_range(range_header) or (None, None)
+    try:
+        info, chunks = await minio_service.open_object(
+            object_name, byte_range[0], byte_range[1], if_none_match=_parse_etags(if_none_match)
+        )
+    except ServiceBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except FileValidationError as e:
+        if e.code != "RANGE_NOT_SATISFIABLE":
+            raise HTTPException(status_code=400, detail=str(e))
+        try:
+            size = (await minio_service.get_file_info(object_name))['size']
+        except Exception:
+            raise HTTPException(status_code=416, detail=str(e))
+        raise HTTPException(status_code=416, detail=str(e), headers={"Content-Range": f"bytes */{size}"})
+    except FileDownloadError as e:
+        raise HTTPException(status_code=404 if e.code == "FILE_NOT_FOUND" else 400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    headers = {
+        "ETag": f'"{info["etag"]}"',
+        "Accept-Ranges": "bytes",
+    }
+    if info['last_modified']:
+        headers["Last-Modified"] = format_datetime(datetime.fromisoformat(info['last_modified']), usegmt=True)
+    if chunks is None:
+        return Response(status_code=304, headers=headers)
+    status_code = 200
+    headers["Content-Length"] = str(info['size'])
+    if info['range'] is not None:
+        start, end = info['range']
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{info['size']}"
+        headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        chunks,
+        status_code=status_code,
+        media_type=info['content_type'] or "application/octet-stream",
+        headers=headers
+    )
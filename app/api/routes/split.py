@@ -0,0 +1,180 @@
+import json
+import asyncio
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel
+from app.core import http_codec
+from app.core.config import get_settings
+from app.services.text_splitter_service import text_splitter_service
+
+router = APIRouter()
+settings = get_settings()
+
+# 超过该字节数的请求/响应体在默认线程池中解析、编码与压缩，避免阻塞事件循环
+OFFLOAD_BYTES = 1024 * 1024
+
+class SplitRequest(BaseModel):
+    """分块请求参数"""
+    mode: str
+    content: str
+    parent_block_size: int = 1280
+    sub_block_size: int = 512
+    parent_separator: str = "\n\n\n\n"
+    sub_separator: str = "\n\n\n"
+    preview_url: str = ""
+    overlap: int = 0
+    output: str = "text"
+
+@router.post(
+    "",
+    response_class=Response,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": SplitRequest.model_json_schema()}},
+        }
+    },
+)
+async def split(request: Request):
+    """
+    文本分块接口
+    
+    与 MCP 工具 text_splitter 相同，但不经过 SSE 会话与 JSON-RPC 封装，适合非 Dify 的批处理调用方。
+    - 请求体按块读取并增量解压（Content-Encoding: gzip / zstd），解压后超过
+      TEXT_SPLITTER_MAX_REQUEST_SIZE 时立即返回 413
+    - 请求与响应都由 orjson 直接在字节上解析/编码一次，按 Accept-Encoding 压缩响应
+    
+    Args:
+        request: JSON 请求体，字段见 SplitRequest
+        
+    Returns:
+        Response: application/json，{"result": ...}，与 text_splitter 的返回值相同
+    """
+    try:
+        decoder = http_codec.StreamDecoder(request.headers.get("content-encoding"), settings.TEXT_SPLITTER_MAX_REQUEST_SIZE)
+    except http_codec.UnsupportedEncodingError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+
+    chunks = []
+    try:
+        async for chunk in request.stream():
+            chunks.append(decoder.feed(chunk))
+        decoder.close()
+        body = b"".join(chunks)
+        chunks.clear()
+        payload = await _offload(len(body), http_codec.loads, body)
+        params = SplitRequest.model_validate(payload)
+        result = await text_splitter_service.split(**params.model_dump())
+    except http_codec.PayloadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    encoding = http_codec.negotiate_encoding(request.headers.get("accept-encoding"))
+    content, encoding = await _offload(len(params.content), _encode_response, result, encoding)
+    headers = {"Vary": "Accept-Encoding"}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=content, media_type="application/json", headers=headers)
+
+def _encode_response(result: Dict[str, Any], encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+    """编码为 JSON 字节，指定 encoding 且足够大时压缩；返回 (响应体, 实际使用的编码)"""
+    data = http_codec.dumps(result)
+    if encoding and len(data) >= http_codec.MIN_COMPRESS_SIZE:
+        return http_codec.compress(data, encoding), encoding
+    return data, None
+
+async def _offload(size: int, func, *args):
+    """按数据大小决定在事件循环内执行或放到默认线程池"""
+    if size < OFFLOAD_BYTES:
+        return func(*args)
+    return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+class SplitStreamRequest(BaseModel):
+    """流式分块请求参数"""
+    mode: str
+    content: str
+    parent_block_size: int = 1280
+    sub_block_size: int = 512
+    sub_separator: str = "\n\n\n"
+    preview_url: str = ""
+    overlap: int = 0
+
+class BatchDocument(BaseModel):
+    """批量分块中的单篇文档，未提供的参数使用请求中的共享参数"""
+    content: str
+    mode: Optional[str] = None
+    parent_block_size: Optional[int] = None
+    sub_block_size: Optional[int] = None
+    parent_separator: Optional[str] = None
+    sub_separator: Optional[str] = None
+    preview_url: Optional[str] = None
+    overlap: Optional[int] = None
+    output: Optional[str] = None
+
+class SplitBatchRequest(BaseModel):
+    """批量分块请求参数"""
+    documents: List[BatchDocument]
+    mode: str = "pdf"
+    parent_block_size: int = 1280
+    sub_block_size: int = 512
+    parent_separator: str = "\n\n\n\n"
+    sub_separator: str = "\n\n\n"
+    preview_url: str = ""
+    overlap: int = 0
+    output: str = "text"
+
+@router.post("/batch")
+async def split_batch(request: SplitBatchRequest):
+    """
+    批量文本分块接口
+    
+    一次请求处理多篇文档，结果按输入顺序返回。
+    
+    Args:
+        request: 文档列表与共享分块参数，与 MCP 工具 text_splitter_batch 一致
+        
+    Returns:
+        dict: {"results": [{"result": ...} | {"error": "错误信息"}, ...]}
+    """
+    shared = request.model_dump(exclude={"documents"})
+    documents = [document.model_dump(exclude_none=True) for document in request.documents]
+    try:
+        results = await text_splitter_service.split_batch(documents, **shared)
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"results": results}
+
+@router.post("/stream")
+async def split_stream(request: SplitStreamRequest):
+    """
+    流式文本分块接口 (NDJSON)
+    
+    父块一经确定立即写出，每行一个 JSON 对象。
+    
+    Args:
+        request: 分块参数，与 MCP 工具 text_splitter_stream 一致
+        
+    Returns:
+        StreamingResponse: application/x-ndjson，每行 {"index": 0, "content": "父块内容"}
+    """
+    blocks = text_splitter_service.iter_split(**request.model_dump())
+    try:
+        # 先取出第一个父块，使参数错误能以 400 返回而不是中断已开始的流
+        first = await blocks.__anext__()
+    except StopAsyncIteration:
+        first = None
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def body() -> AsyncIterator[str]:
+        if first is None:
+            return
+        index = 0
+        yield json.dumps({"index": index, "content": first}, ensure_ascii=False) + "\n"
+        async for block in blocks:
+            index += 1
+            yield json.dumps({"index": index, "content": block}, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(body(), media_type="application/x-ndjson")
@@ -0,0 +1,113 @@
+import time
+import asyncio
+import threading
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from app.exceptions import ServiceBusyError
+
+
+class BoundedExecutor:
+    """
+    有界线程池：固定 max_workers 个线程 + 最多 queue_size 个排队任务
+
+    - 准入由信号量控制：执行中与排队中的任务总数达到 max_workers + queue_size 时，
+      新任务立即以 ServiceBusyError 失败（不等待），避免突发流量无限堆积
+    - 统计排队深度、执行中任务数、被拒绝次数与排队等待时间，供 /metrics 展示
+    """
+
+    def __init__(self, max_workers: int, queue_size: int, thread_name_prefix: str = "bounded"):
+        self.max_workers = max(1, max_workers)
+        self.queue_size = max(0, queue_size)
+        self.name = thread_name_prefix
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._admission = threading.BoundedSemaphore(self.max_workers + self.queue_size)
+        self._lock = threading.Lock()
+
+        self.in_flight = 0
+        self.active = 0
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self._wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix=self.name,
+                    )
+        return self._executor
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """在线程池中执行 func；线程池与队列都已满时立即抛出 ServiceBusyError"""
+        return await self.submit(func, *args, **kwargs)
+
+    def submit(self, func: Callable, *args, **kwargs) -> "asyncio.Future":
+        """
+        提交 func 并返回 asyncio Future，不等待其完成（须在事件循环中调用）
+        准入检查在调用时同步完成：线程池与队列都已满时立即抛出 ServiceBusyError
+        """
+        if not self._admission.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise ServiceBusyError(
+                f"{self.name} 线程池繁忙（执行中 {self.max_workers}，排队已达上限 {self.queue_size}），请稍后重试",
+                "SERVICE_BUSY"
+            )
+        with self._lock:
+            self.in_flight += 1
+            self.submitted += 1
+        try:
+            future = self._get_executor().submit(self._call, time.perf_counter(), partial(func, *args, **kwargs))
+        except BaseException:
+            self._release()
+            raise
+        # 任务真正结束（或在开始前被取消）时才释放名额；调用方取消等待不会提前释放
+        future.add_done_callback(self._release)
+        return asyncio.wrap_future(future)
+
+    def _release(self, _future=None) -> None:
+        with self._lock:
+            self.in_flight -= 1
+        self._admission.release()
+
+    def _call(self, submitted_at: float, func: Callable) -> Any:
+        """工作线程中执行：记录排队等待时间"""
+        waited = time.perf_counter() - submitted_at
+        with self._lock:
+            self.active += 1
+            self._wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+        try:
+            return func()
+        finally:
+            with self._lock:
+                self.active -= 1
+                self.completed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """返回线程池统计（等待时间单位为毫秒）"""
+        with self._lock:
+            started = self.completed + self.active
+            return {
+                "max_workers": self.max_workers,
+                "queue_size": self.queue_size,
+                "active": self.active,
+                "queued": max(0, self.in_flight - self.active),
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "wait_ms_avg": round(self._wait_total / started * 1000, 3) if started else 0.0,
+                "wait_ms_max": round(self.wait_max * 1000, 3),
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """关闭线程池（应用退出时调用）"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
@@ -24,14 +24,42 @@ class Settings(BaseSettings):
     MINIO_SECRET_KEY: str = "minioadmin"
     MINIO_SECURE: bool = False
     MINIO_BUCKET_NAME: str = "dify-files"
-    MINIO_POOL_MAX_SIZE: int = 10
+    MINIO_POOL_MAX_SIZE: int = 10  # 连接池大小，同时也是 MinIO 专用线程池的线程数
+    MINIO_EXECUTOR_QUEUE_SIZE: int = 100  # MinIO 线程池排队上限，超出时立即返回 503
     MINIO_CONNECT_TIMEOUT: float = 5.0  # seconds
     MINIO_CONSOLE_ENDPOINT: str = "localhost:9001"
+    MINIO_REGION: str = "us-east-1"
+    MINIO_CLIENT_BACKEND: str = "sdk"  # sdk (MinIO SDK + 线程池) | httpx (原生异步 S3 客户端)
+    MINIO_UPLOAD_PART_SIZE: int = 8 * 1024 * 1024  # 分片上传的分片大小（不小于 5MB）
+    MINIO_UPLOAD_PARALLEL_PARTS: int = 1  # 并行上传的分片数，单次上传内存约为 分片大小 × 该值
+    MINIO_UPLOAD_DEDUP: bool = False  # 上传按内容 SHA-256 去重，相同内容只存储一次
+    MINIO_UPLOAD_DEDUP_DB: str = "data/upload_dedup.db"  # 去重索引（SQLite）文件路径
+    MINIO_PUBLIC_ENDPOINT: str = ""  # 客户端访问 MinIO 的地址（预签名 URL 使用，如 https://files.example.com），为空时使用 MINIO_ENDPOINT
+    MINIO_PRESIGN_EXPIRES: int = 3600  # 预签名 URL 默认有效期（秒），最长 7 天
+    MINIO_BATCH_MAX_OBJECTS: int = 1000  # 批量删除 / 批量查询单次请求的对象数上限
+    MINIO_BATCH_CONCURRENCY: int = 8  # 批量查询时并发 stat 的请求数（应小于 MINIO_POOL_MAX_SIZE）
+    MINIO_INFO_CACHE_ENABLED: bool = False  # get_file_info 元数据缓存（外部写入最多在 TTL 后可见，默认关闭）
+    MINIO_INFO_CACHE_MAX_ENTRIES: int = 10000
+    MINIO_INFO_CACHE_TTL: float = 30  # seconds
+    MINIO_INFO_CACHE_NEGATIVE_TTL: float = 0  # “文件不存在”结果的缓存时间（秒），0 表示不缓存
+    MINIO_INFO_CACHE_NOTIFICATIONS: bool = False  # 监听 MinIO 桶事件通知，外部写入/删除时立即失效
     
     # 文件配置
     MAX_FILE_SIZE: int = 100 * 1024 * 1024  # 100MB
     ALLOWED_EXTENSIONS: list[str] = ["jpg", "jpeg", "png", "gif", "pdf", "txt", "doc", "docx", "xls", "xlsx", "zip"]
 
+    # 文本分块配置
+    TEXT_SPLITTER_EXECUTOR: str = "thread"  # inline | thread | process
+    TEXT_SPLITTER_MAX_WORKERS: int = 4
+    TEXT_SPLITTER_INLINE_THRESHOLD: int = 32 * 1024  # 字符数，低于该值直接在事件循环内处理
+    TEXT_SPLITTER_CACHE_ENABLED: bool = True
+    TEXT_SPLITTER_CACHE_MAX_BYTES: int = 128 * 1024 * 1024  # 内存缓存上限 128MB
+    TEXT_SPLITTER_CACHE_TTL: int = 24 * 3600  # seconds, 0 表示不过期
+    TEXT_SPLITTER_CACHE_DIR: str = ""  # 磁盘缓存目录，为空时不启用磁盘缓存
+    TEXT_SPLITTER_CACHE_DISK_MAX_BYTES: int = 1024 * 1024 * 1024  # 磁盘缓存上限 1GB
+    TEXT_SPLITTER_BATCH_MAX_DOCUMENTS: int = 1000  # 单次批量分块的文档数上限
+    TEXT_SPLITTER_MAX_REQUEST_SIZE: int = 64 * 1024 * 1024  # 分块接口请求体（解压后）上限 64MB
+
     model_config = SettingsConfigDict(
         env_file=".env",
         env_file_encoding="utf-8",
@@ -0,0 +1,64 @@
+import os
+import sqlite3
+import threading
+from typing import Iterable, Optional, Tuple
+
+
+class DedupIndex:
+    """
+    上传去重索引：(内容 SHA-256, Content-Type) -> (对象名称, 上传时的 ETag)，持久化在本地 SQLite 文件中
+
+    方法均为同步阻塞调用，应在线程中执行；内部用一把锁串行化对同一连接的访问。
+    索引只是提示：命中后调用方仍需确认对象存在且 ETag 未变（未被覆盖），否则调用 discard 删除对应条目。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS uploads ("
+                " sha256 TEXT NOT NULL,"
+                " content_type TEXT NOT NULL,"
+                " object_name TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " etag TEXT NOT NULL DEFAULT '',"
+                " created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,"
+                " PRIMARY KEY (sha256, content_type))"
+            )
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(uploads)")}
+            if "etag" not in columns:
+                # 旧版本创建的索引没有 ETag：这些条目无法确认，命中时会被清理
+                self._conn.execute("ALTER TABLE uploads ADD COLUMN etag TEXT NOT NULL DEFAULT ''")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS uploads_object_name ON uploads (object_name)")
+
+    def get(self, sha256: str, content_type: str) -> Optional[Tuple[str, str]]:
+        """查找相同内容的已上传对象，返回 (对象名称, ETag)，未找到返回 None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT object_name, etag FROM uploads WHERE sha256 = ? AND content_type = ?",
+                (sha256, content_type)
+            ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def put(self, sha256: str, content_type: str, object_name: str, size: int, etag: str) -> None:
+        """记录上传结果（相同内容已有记录时覆盖）"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO uploads (sha256, content_type, object_name, size, etag) VALUES (?, ?, ?, ?, ?)",
+                (sha256, content_type, object_name, size, etag)
+            )
+
+    def discard(self, object_names: Iterable[str]) -> None:
+        """对象被删除（或已不存在）时移除指向它们的记录"""
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM uploads WHERE object_name = ?", ((name,) for name in object_names))
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,232 @@
+import re
+import html
+from typing import Dict, List, Optional, Tuple
+
+# 标签最大长度：'<' 之后这么多字符内没有 '>' 时，该 '<' 按普通文本处理
+MAX_TAG_LENGTH = 8192
+# 与 HTML 规范一致的合并上限，防止异常属性值放大输出
+MAX_COLSPAN = 1000
+MAX_ROWSPAN = 65534
+
+# 标签：'<' 后接字母、'/'、'!' 或 '?'，到 '>' 结束，中间不含 '<' / '>'。
+# 候选标签遇到下一个 '<' 即失败，每个 '<' 的匹配代价不超过到下一个 '<' 的距离，整体线性，不会灾难性回溯
+_TAG_BODY = r"[^<>]{0,%d}>" % MAX_TAG_LENGTH
+_TAG_RE = re.compile(r"<[A-Za-z/!?]" + _TAG_BODY)
+_TABLE_OPEN_RE = re.compile(r"<table(?![A-Za-z0-9])" + _TAG_BODY, re.I)
+_TABLE_TAG_RE = re.compile(r"<(/?)(table|tr|td|th)(?![A-Za-z0-9])" + _TAG_BODY, re.I)
+# 单元格的合并属性
+_SPAN_ATTR_RE = re.compile(r"""\b(colspan|rowspan)\s*=\s*["']?\s*(\d+)""", re.I)
+
+
+class HtmlTableConverter:
+    """
+    增量式 HTML 表格 -> Markdown 表格转换器
+
+    状态机 + 不回溯的标签正则，对输入只做一次线性扫描：
+    - feed(chunk) 可多次调用，返回已确定的输出；close() 返回剩余输出。分块方式不影响结果
+    - 表格外的文本原样输出；<table>...</table> 转换为 Markdown 表格（前后各加空行），
+      第一行作为表头
+    - 单元格内的标签被去除、实体被还原、'|' 被转义；colspan / rowspan 覆盖的格子重复该单元格内容
+    - 没有任何数据行或直到输入结束都未闭合的表格原样保留；嵌套的 <table> 标签忽略
+    - 未闭合的 <tr> / <td> 由下一个 <tr> / <td> / </table> 隐式结束
+
+    两次 feed 之间缓存的未处理输入不超过一个标签的长度（表格原文除外，转换失败时需原样输出）。
+    """
+
+    def __init__(self):
+        self._data = ""  # 上次未能处理的输入（末尾被截断的标签）
+        self._in_table = False
+        self._raw: List[str] = []  # 当前表格的原文
+        self._rows: List[List[str]] = []
+        self._cells: Optional[List[str]] = None  # 当前行已结束的单元格；None 表示不在行内
+        self._row_spans: Dict[int, Tuple[int, int]] = {}  # 当前行中带合并属性的单元格 -> (colspan, rowspan)
+        self._in_cell = False
+        self._cell_head = ""  # 跨越 feed 边界的单元格在之前输入中的原文
+        self._cell_spans: Optional[Tuple[int, int]] = None  # 当前单元格的 (colspan, rowspan)
+        self._carry: Dict[int, Tuple[str, int]] = {}  # 被上方 rowspan 占据的列 -> (内容, 剩余行数)
+
+    def feed(self, chunk: str) -> str:
+        """输入一段文本，返回已经可以确定的输出"""
+        self._data += chunk
+        return self._process(final=False)
+
+    def close(self) -> str:
+        """结束输入，返回剩余输出"""
+        out = self._process(final=True)
+        if self._in_table:
+            # 未闭合的表格原样保留
+            out += "".join(self._raw)
+            self._reset_table()
+        return out
+
+    # -------- 扫描 --------
+
+    def _process(self, final: bool) -> str:
+        data = self._data
+        end = len(data) if final else self._safe_end(data)
+        pos = 0
+        out: List[str] = []
+
+        while pos < end:
+            if self._in_table:
+                pos = self._scan_table(data, pos, end, out)
+                continue
+            m = _TABLE_OPEN_RE.search(data, pos, end)
+            if m is None:
+                out.append(data[pos:end])
+                pos = end
+                break
+            out.append(data[pos:m.start()])
+            self._in_table = True
+            self._raw = [m.group(0)]
+            pos = m.end()
+
+        self._data = data[pos:]
+        return "".join(out)
+
+    @staticmethod
+    def _safe_end(data: str) -> int:
+        """
+        可以确定处理的位置：末尾的 '<' 之后还没有 '>'，且仍可能在后续输入中构成标签时，
+        从该 '<' 起保留到下一次输入。标签内不含 '<'，因此之前的所有 '<' 都已可判断。
+        """
+        k = data.rfind("<")
+        if k != -1 and data.find(">", k) == -1 and len(data) - k < MAX_TAG_LENGTH + 3:
+            return k
+        return len(data)
+
+    def _scan_table(self, data: str, pos: int, end: int, out: List[str]) -> int:
+        """处理表格内 [pos, end) 的输入，返回处理到的位置；表格结束时把转换结果写入 out"""
+        start = pos
+        cell_start = pos if self._in_cell else None
+        for m in _TABLE_TAG_RE.finditer(data, pos, end):
+            closing, name = m.groups()
+            name = name.lower()
+            # 任何 table / tr / td / th 标签都结束当前单元格
+            if cell_start is not None:
+                self._add_cell(data[cell_start:m.start()])
+                cell_start = None
+            if name == "td" or name == "th":
+                if not closing:
+                    if self._cells is None:
+                        self._cells = []
+                    tag = m.group(0)
+                    if "=" in tag:
+                        self._cell_spans = self._spans(tag)
+                    cell_start = m.end()
+            elif name == "tr":
+                self._close_row()
+                if not closing:
+                    self._cells = []
+            elif closing:
+                # </table>；嵌套的 <table> 忽略，其单元格归入外层表格
+                self._close_row()
+                self._raw.append(data[start:m.end()])
+                out.append(self._finish_table())
+                return m.end()
+
+        self._in_cell = cell_start is not None
+        if self._in_cell:
+            self._cell_head += data[cell_start:end]
+        self._raw.append(data[start:end])
+        return end
+
+    # -------- 表格结构 --------
+
+    @staticmethod
+    def _spans(tag: str) -> Optional[Tuple[int, int]]:
+        """解析单元格标签的 (colspan, rowspan)，都为 1 时返回 None"""
+        colspan = rowspan = 1
+        for name, value in _SPAN_ATTR_RE.findall(tag):
+            if name.lower() == "colspan":
+                colspan = min(max(int(value), 1), MAX_COLSPAN)
+            else:
+                rowspan = min(max(int(value), 1), MAX_ROWSPAN)
+        return None if colspan == rowspan == 1 else (colspan, rowspan)
+
+    def _add_cell(self, text: str) -> None:
+        """结束当前单元格：去除其他标签、还原实体、转义 '|'"""
+        if self._cell_head:
+            text = self._cell_head + text
+            self._cell_head = ""
+        if "<" in text:
+            text = _TAG_RE.sub("", text)
+        text = html.unescape(text).strip().replace("|", "\\|")
+        if self._cell_spans is not None:
+            self._row_spans[len(self._cells)] = self._cell_spans
+            self._cell_spans = None
+        self._cells.append(text)
+
+    def _close_row(self) -> None:
+        cells, self._cells = self._cells, None
+        spans, self._row_spans = self._row_spans, {}
+        if cells is None:
+            return
+        carry = self._carry
+        if not spans and not carry:
+            if cells:
+                self._rows.append(cells)
+            return
+
+        # 按 colspan / rowspan 展开为网格行
+        next_carry: Dict[int, Tuple[str, int]] = {}
+        row: List[str] = []
+
+        def place(text: str, rowspan: int) -> None:
+            if rowspan > 1:
+                next_carry[len(row)] = (text, rowspan - 1)
+            row.append(text)
+
+        def fill_carried() -> None:
+            # 被上方 rowspan 占据的列，填入其内容
+            while len(row) in carry:
+                text, left = carry[len(row)]
+                place(text, left)
+
+        for i, text in enumerate(cells):
+            colspan, rowspan = spans.get(i, (1, 1))
+            fill_carried()
+            for _ in range(colspan):
+                place(text, rowspan)
+        # 行尾之后仍被 rowspan 占据的列，中间空缺补空单元格
+        last = max(carry, default=-1)
+        while len(row) <= last:
+            fill_carried()
+            if len(row) <= last:
+                row.append("")
+
+        self._carry = next_carry
+        if row:
+            self._rows.append(row)
+
+    def _finish_table(self) -> str:
+        rows, raw = self._rows, "".join(self._raw)
+        self._reset_table()
+        if not rows:
+            return raw
+
+        col_count = max(len(r) for r in rows)
+        norm_rows = [r + [""] * (col_count - len(r)) for r in rows]
+        header_line = "| " + " | ".join(norm_rows[0]) + " |"
+        sep_line = "| " + " | ".join(["----------"] * col_count) + " |"
+        data_lines = ["| " + " | ".join(r) + " |" for r in norm_rows[1:]]
+        return "\n\n" + "\n".join([header_line, sep_line] + data_lines) + "\n\n"
+
+    def _reset_table(self) -> None:
+        self._in_table = False
+        self._raw = []
+        self._rows = []
+        self._cells = None
+        self._row_spans = {}
+        self._in_cell = False
+        self._cell_head = ""
+        self._cell_spans = None
+        self._carry = {}
+
+
+def convert_html_tables(text: str) -> str:
+    """将文本中的 HTML 表格一次性转换为 Markdown 表格"""
+    if "<" not in text:
+        return text
+    converter = HtmlTableConverter()
+    return converter.feed(text) + converter.close()
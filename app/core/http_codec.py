@@ -0,0 +1,116 @@
+import json
+import zlib
+from typing import Any, Optional
+
+import orjson
+
+try:
+    import zstandard
+except ImportError:  # 可选依赖：未安装时不支持 zstd
+    zstandard = None
+
+# 支持的内容编码，按响应压缩的优先顺序排列
+SUPPORTED_ENCODINGS = ("zstd", "gzip") if zstandard is not None else ("gzip",)
+# 小于该字节数的响应不压缩
+MIN_COMPRESS_SIZE = 1024
+
+
+class PayloadTooLargeError(ValueError):
+    """请求体（解压后）超过上限"""
+    pass
+
+
+class UnsupportedEncodingError(ValueError):
+    """不支持的 Content-Encoding"""
+    pass
+
+
+class StreamDecoder:
+    """
+    增量解压请求体，并限制解压后的总大小（防止压缩炸弹）
+
+    encoding 为空或 identity 时原样透传；gzip 按 max_length 逐步解压，输出不会超过上限；
+    zstd 每块解压后检查累计大小。
+    """
+
+    def __init__(self, encoding: Optional[str], max_size: int):
+        encoding = (encoding or "identity").strip().lower()
+        if encoding not in ("identity",) + SUPPORTED_ENCODINGS:
+            raise UnsupportedEncodingError(f"不支持的 Content-Encoding: {encoding}")
+        self.encoding = encoding
+        self.max_size = max_size
+        self.size = 0
+        if encoding == "gzip":
+            self._decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+        elif encoding == "zstd":
+            self._decompressor = zstandard.ZstdDecompressor().decompressobj()
+        else:
+            self._decompressor = None
+
+    def feed(self, chunk: bytes) -> bytes:
+        """输入一块原始数据，返回解压后的数据"""
+        if not chunk:
+            # 请求流末尾的空块；zstd 解压对象在帧结束后不能再调用
+            return b""
+        if self._decompressor is None:
+            out = chunk
+        elif self.encoding == "gzip":
+            try:
+                # 多取 1 字节用于判断是否超限
+                out = self._decompressor.decompress(chunk, self.max_size - self.size + 1)
+            except zlib.error as e:
+                raise ValueError(f"gzip 数据无效: {e}")
+        else:
+            try:
+                out = self._decompressor.decompress(chunk)
+            except zstandard.ZstdError as e:
+                raise ValueError(f"zstd 数据无效: {e}")
+        self.size += len(out)
+        if self.size > self.max_size:
+            raise PayloadTooLargeError(f"请求体超过上限 {self.max_size} 字节")
+        return out
+
+    def close(self) -> None:
+        """结束输入，检查压缩流是否完整"""
+        if self.encoding == "gzip" and not self._decompressor.eof:
+            raise ValueError("gzip 数据不完整")
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """根据 Accept-Encoding 选择响应压缩方式，不压缩时返回 None（忽略 q 值为 0 的编码）"""
+    if not accept_encoding:
+        return None
+    accepted = set()
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q=") and q[2:].strip() in ("0", "0.0", "0.00", "0.000"):
+            continue
+        accepted.add(name.strip().lower())
+    for encoding in SUPPORTED_ENCODINGS:
+        if encoding in accepted:
+            return encoding
+    return None
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    """按指定编码压缩响应体"""
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    return zlib.compress(data, 6, zlib.MAX_WBITS | 16)
+
+
+def loads(data: bytes) -> Any:
+    """解析 JSON；orjson 拒绝孤立代理字符等输入时回退到标准库"""
+    try:
+        return orjson.loads(data)
+    except orjson.JSONDecodeError:
+        return json.loads(data)
+
+
+def dumps(value: Any) -> bytes:
+    """一次性编码为 UTF-8 JSON 字节；orjson 无法编码（如孤立代理字符）时回退到标准库的 ASCII 转义"""
+    try:
+        return orjson.dumps(value)
+    except TypeError:
+        return json.dumps(value).encode("ascii")
@@ -0,0 +1,111 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+class MetadataCache:
+    """
+    对象元数据缓存（LRU + TTL，按条目数限制）
+
+    - 正向条目缓存 stat 结果，有效期 ttl 秒
+    - 负向条目记录“对象不存在”（NoSuchKey），有效期 negative_ttl 秒，通常比 ttl 短，
+      以便外部写入的对象能较快可见
+    - invalidate 在本服务写入/删除对象后调用；同时递增版本号，
+      使在失效之前已发出、之后才返回的 stat 结果不会被写回缓存（避免缓存旧值）
+    - 命中/未命中/淘汰/过期/失效次数供 /metrics 展示
+
+    方法均为同步方法，只做字典操作，可在事件循环中直接调用。
+    """
+
+    def __init__(self, max_entries: int, ttl: float, negative_ttl: float = 0):
+        """
+        :param max_entries: 最大条目数（含负向条目）
+        :param ttl: 正向条目有效期（秒）
+        :param negative_ttl: 负向条目有效期（秒），0 表示不缓存“不存在”
+        """
+        self.max_entries = max(1, max_entries)
+        self.ttl = max(0, ttl)
+        self.negative_ttl = max(0, negative_ttl)
+
+        self._lock = threading.Lock()
+        # key -> (过期时间, 元数据；None 表示对象不存在)，按最近使用排序
+        self._entries: "OrderedDict[str, Tuple[float, Optional[Dict[str, Any]]]]" = OrderedDict()
+        self.version = 0
+
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """
+        查找缓存，返回 (是否命中, 元数据)
+        命中负向条目时返回 (True, None)；返回的字典是副本，调用方可以修改
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if time.monotonic() < expires_at:
+                    self._entries.move_to_end(key)
+                    if value is None:
+                        self.negative_hits += 1
+                        return True, None
+                    self.hits += 1
+                    return True, dict(value)
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return False, None
+
+    def set(self, key: str, value: Optional[Dict[str, Any]], version: Optional[int] = None) -> None:
+        """
+        写入元数据（value 为 None 表示对象不存在）
+        传入 version 时，若期间发生过失效（版本号已变化）则放弃写入
+        """
+        ttl = self.ttl if value is not None else self.negative_ttl
+        if not ttl:
+            return
+        with self._lock:
+            if version is not None and version != self.version:
+                return
+            self._entries.pop(key, None)
+            self._entries[key] = (time.monotonic() + ttl, None if value is None else dict(value))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: str) -> None:
+        """删除条目（对象被写入或删除后调用）"""
+        with self._lock:
+            self.version += 1
+            if self._entries.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        """清空缓存（如事件通知连接中断、可能漏掉变更时）"""
+        with self._lock:
+            self.version += 1
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """返回缓存统计"""
+        with self._lock:
+            lookups = self.hits + self.negative_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "negative_ttl": self.negative_ttl,
+                "hits": self.hits,
+                "negative_hits": self.negative_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.negative_hits) / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
@@ -2,6 +2,8 @@ import urllib3
 from minio import Minio
 from minio.error import S3Error
 from app.core.config import get_settings
+from app.core.s3_async import AsyncS3Client
+from app.core.bounded_executor import BoundedExecutor
 from app.core.logger import logger
 
 settings = get_settings()
@@ -15,6 +17,8 @@ class MinioClientManager:
     _instance = None
     _client = None
     _pool_manager = None
+    _async_client = None
+    _executor = None
 
     def __new__(cls):
         if cls._instance is None:
@@ -24,10 +28,12 @@ class MinioClientManager:
     def _init_pool(self):
         """初始化连接池"""
         if self._pool_manager is None:
-            logger.info(f"Initializing MinIO connection pool with max_size={settings.MINIO_POOL_MAX_SIZE}")
+            # 每个 MinIO 线程持有一个连接；分片上传时每个线程最多再并行 MINIO_UPLOAD_PARALLEL_PARTS 个请求
+            maxsize = settings.MINIO_POOL_MAX_SIZE * max(1, settings.MINIO_UPLOAD_PARALLEL_PARTS)
+            logger.info(f"Initializing MinIO connection pool with max_size={maxsize}")
             self._pool_manager = urllib3.PoolManager(
                 num_pools=10,
-                maxsize=settings.MINIO_POOL_MAX_SIZE,
+                maxsize=maxsize,
                 timeout=urllib3.Timeout(connect=settings.MINIO_CONNECT_TIMEOUT, read=30.0),
                 retries=urllib3.Retry(
                     total=3,
@@ -53,6 +59,52 @@ class MinioClientManager:
             )
         return self._client
 
+    def get_executor(self) -> BoundedExecutor:
+        """
+        获取 MinIO 专用的有界线程池（懒加载）
+        线程数与连接池大小一致（MINIO_POOL_MAX_SIZE），排队超过 MINIO_EXECUTOR_QUEUE_SIZE 时立即拒绝。
+        """
+        if self._executor is None:
+            logger.info(
+                f"Starting MinIO thread pool with {settings.MINIO_POOL_MAX_SIZE} workers, "
+                f"queue size {settings.MINIO_EXECUTOR_QUEUE_SIZE}"
+            )
+            self._executor = BoundedExecutor(
+                max_workers=settings.MINIO_POOL_MAX_SIZE,
+                queue_size=settings.MINIO_EXECUTOR_QUEUE_SIZE,
+                thread_name_prefix="minio",
+            )
+        return self._executor
+
+    def executor_stats(self) -> dict:
+        """MinIO 线程池统计（线程池尚未启动时计数均为 0）"""
+        return self.get_executor().stats()
+
+    def get_async_client(self) -> AsyncS3Client:
+        """
+        获取异步 S3 客户端实例（懒加载，MINIO_CLIENT_BACKEND=httpx 时使用）
+        使用独立的 httpx 连接池，不经过线程池。
+        """
+        if self._async_client is None:
+            logger.info(f"Creating async S3 client for endpoint: {settings.MINIO_ENDPOINT}")
+            self._async_client = AsyncS3Client(
+                settings.MINIO_ENDPOINT,
+                access_key=settings.MINIO_ACCESS_KEY,
+                secret_key=settings.MINIO_SECRET_KEY,
+                secure=settings.MINIO_SECURE,
+                region=settings.MINIO_REGION,
+                max_connections=settings.MINIO_POOL_MAX_SIZE,
+                connect_timeout=settings.MINIO_CONNECT_TIMEOUT,
+            )
+        return self._async_client
+
+    async def aclose(self):
+        """关闭线程池与异步客户端的连接池（应用退出时调用）"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        if self._async_client is not None:
+            await self._async_client.aclose()
+
     def ensure_bucket_exists(self):
         """确保配置的 Bucket 存在（同步阻塞方法，应在线程中调用）"""
         try:
@@ -0,0 +1,277 @@
+import os
+import json
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.logger import logger
+
+
+class ResultCache:
+    """
+    内容寻址的结果缓存（LRU + TTL）
+
+    - 内存层：按序列化后的字节数限制总大小，超出时淘汰最久未使用的条目
+    - 磁盘层（可选）：disk_dir 非空时启用，结果以 JSON 文件保存，服务重启后仍可命中；
+      内存未命中时查找磁盘，命中后回填内存
+    - 条目以序列化后的字节存储，每次命中都反序列化出新对象，调用方修改返回值不会影响缓存
+
+    键由调用方计算（通常为输入内容与参数的哈希），值必须可被 JSON 序列化。
+    """
+
+    # 超过该字节数的条目在默认线程池中序列化/反序列化，避免阻塞事件循环
+    OFFLOAD_BYTES = 256 * 1024
+
+    def __init__(
+        self,
+        max_bytes: int,
+        ttl: float = 0,
+        disk_dir: str = "",
+        disk_max_bytes: int = 0,
+    ):
+        """
+        :param max_bytes: 内存层字节上限
+        :param ttl: 条目有效期（秒），0 表示不过期
+        :param disk_dir: 磁盘层目录，为空时不启用磁盘层
+        :param disk_max_bytes: 磁盘层字节上限
+        """
+        self.max_bytes = max(0, max_bytes)
+        self.ttl = max(0, ttl)
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = max(0, disk_max_bytes)
+
+        self._lock = threading.Lock()
+        # key -> (写入时间, 序列化后的字节)，按最近使用排序
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._bytes = 0
+        # key -> 文件大小，按最近使用排序
+        self._disk_index: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_bytes = 0
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        if self.disk_dir:
+            self._load_disk_index()
+
+    # -------- 公共接口 --------
+
+    async def get(self, key: str) -> Optional[Any]:
+        """查找缓存，未命中返回 None"""
+        payload = self._get_memory(key)
+        if payload is None and self.disk_dir:
+            loop = asyncio.get_running_loop()
+            found = await loop.run_in_executor(None, self._get_disk, key)
+            if found is not None:
+                created_at, payload = found
+                self._put_memory(key, payload, created_at)
+
+        if payload is not None:
+            try:
+                if len(payload) < self.OFFLOAD_BYTES:
+                    return self._decode(payload)
+                return await asyncio.get_running_loop().run_in_executor(None, self._decode, payload)
+            except ValueError:
+                # 磁盘文件损坏：丢弃后按未命中处理
+                logger.warning(f"Result cache dropped corrupt entry {key}")
+                with self._lock:
+                    old = self._entries.pop(key, None)
+                    if old is not None:
+                        self._bytes -= len(old[1])
+                if self.disk_dir:
+                    self._drop_disk(key)
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    async def set(self, key: str, value: Any) -> None:
+        """写入缓存（内存层，以及启用时的磁盘层）"""
+        loop = asyncio.get_running_loop()
+        payload = await loop.run_in_executor(None, self._encode, value) if self._is_large(value) else self._encode(value)
+        self._put_memory(key, payload)
+        if self.disk_dir:
+            await loop.run_in_executor(None, self._put_disk, key, payload)
+
+    def clear(self) -> None:
+        """清空内存层与磁盘层，并重置统计"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            disk_keys = list(self._disk_index)
+            self._disk_index.clear()
+            self._disk_bytes = 0
+            self.hits = self.disk_hits = self.misses = self.evictions = self.expirations = 0
+        for key in disk_keys:
+            self._remove_file(key)
+
+    def stats(self) -> Dict[str, Any]:
+        """返回缓存统计"""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "disk_enabled": bool(self.disk_dir),
+                "disk_entries": len(self._disk_index),
+                "disk_bytes": self._disk_bytes,
+                "disk_max_bytes": self.disk_max_bytes,
+            }
+
+    # -------- 内存层 --------
+
+    def _expired(self, created_at: float) -> bool:
+        return bool(self.ttl) and time.time() - created_at > self.ttl
+
+    def _get_memory(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            created_at, payload = entry
+            if self._expired(created_at):
+                del self._entries[key]
+                self._bytes -= len(payload)
+                self.expirations += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return payload
+
+    def _put_memory(self, key: str, payload: bytes, created_at: Optional[float] = None) -> None:
+        size = len(payload)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old[1])
+            # 单个条目超过上限时不进入内存层
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (time.time() if created_at is None else created_at, payload)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+
+    # -------- 磁盘层 --------
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], f"{key}.json")
+
+    def _load_disk_index(self) -> None:
+        """启动时扫描磁盘目录，按写入时间重建淘汰顺序"""
+        os.makedirs(self.disk_dir, exist_ok=True)
+        found = []
+        for root, _, files in os.walk(self.disk_dir):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(root, name))
+                except OSError:
+                    continue
+                found.append((stat.st_mtime, name[:-len(".json")], stat.st_size))
+        for _, key, size in sorted(found):
+            self._disk_index[key] = size
+            self._disk_bytes += size
+        logger.info(f"Result cache loaded {len(self._disk_index)} entries from {self.disk_dir}")
+        self._evict_disk()
+
+    def _get_disk(self, key: str) -> Optional[Tuple[float, bytes]]:
+        """返回 (写入时间, 序列化后的字节)；文件修改时间即写入时间，用于 TTL 判断"""
+        with self._lock:
+            if key not in self._disk_index:
+                return None
+        path = self._path(key)
+        try:
+            created_at = os.stat(path).st_mtime
+            if self._expired(created_at):
+                self._drop_disk(key)
+                with self._lock:
+                    self.expirations += 1
+                return None
+            with open(path, "rb") as f:
+                payload = f.read()
+        except OSError:
+            self._drop_disk(key)
+            return None
+        with self._lock:
+            if key in self._disk_index:
+                self._disk_index.move_to_end(key)
+            self.disk_hits += 1
+        return created_at, payload
+
+    def _put_disk(self, key: str, payload: bytes) -> None:
+        size = len(payload)
+        if size > self.disk_max_bytes:
+            return
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Result cache failed to write {path}: {e}")
+            return
+        with self._lock:
+            old = self._disk_index.pop(key, None)
+            if old is not None:
+                self._disk_bytes -= old
+            self._disk_index[key] = size
+            self._disk_bytes += size
+        self._evict_disk()
+
+    def _evict_disk(self) -> None:
+        while True:
+            with self._lock:
+                if self._disk_bytes <= self.disk_max_bytes or not self._disk_index:
+                    return
+                key, size = self._disk_index.popitem(last=False)
+                self._disk_bytes -= size
+                self.evictions += 1
+            self._remove_file(key)
+
+    def _drop_disk(self, key: str) -> None:
+        with self._lock:
+            size = self._disk_index.pop(key, None)
+            if size is not None:
+                self._disk_bytes -= size
+        self._remove_file(key)
+
+    def _remove_file(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    # -------- 序列化 --------
+
+    def _is_large(self, value: Any) -> bool:
+        """粗略判断值序列化后是否较大（仅检查顶层字符串/列表长度）"""
+        items = value.values() if isinstance(value, dict) else [value]
+        return any(isinstance(v, (str, list)) and len(v) * 2 >= self.OFFLOAD_BYTES for v in items)
+
+    @staticmethod
+    def _encode(value: Any) -> bytes:
+        # surrogatepass: 允许内容中出现孤立代理字符
+        return json.dumps(value, ensure_ascii=False).encode("utf-8", "surrogatepass")
+
+    @staticmethod
+    def _decode(payload: bytes) -> Any:
+        return json.loads(payload.decode("utf-8", "surrogatepass"))
@@ -0,0 +1,515 @@
+import hmac
+import json
+import base64
+import asyncio
+import hashlib
+import urllib.parse
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from xml.sax.saxutils import escape
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import httpx
+from minio.error import S3Error
+
+from app.core.logger import logger
+
+# 不对请求体签名（HTTPS 下使用，与 MinIO SDK 一致）
+UNSIGNED_PAYLOAD = "UNSIGNED-PAYLOAD"
+_EMPTY_SHA256 = hashlib.sha256(b"").hexdigest()
+# 超过该字节数的请求体在默认线程池中计算 SHA-256
+_HASH_OFFLOAD_BYTES = 1024 * 1024
+# 批量删除（DeleteObjects）单次请求的最大对象数
+MAX_DELETE_OBJECTS = 1000
+# 分片上传中除最后一片外每片的最小字节数（S3 限制，过小时 CompleteMultipartUpload 返回 EntityTooSmall）
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+
+class S3ObjectStat(NamedTuple):
+    """对象元数据（字段与 MinIO SDK stat_object 的返回值一致）"""
+    object_name: str
+    size: int
+    last_modified: Optional[datetime]  # 响应中没有 Last-Modified 时为 None
+    etag: str
+    content_type: str
+
+
+class S3WriteResult(NamedTuple):
+    """写入结果"""
+    object_name: str
+    etag: str
+
+
+class S3DeleteError(NamedTuple):
+    """批量删除中单个对象的错误（字段与 MinIO SDK 的 DeleteError 一致）"""
+    name: str
+    code: str
+    message: Optional[str]
+
+
+def _sha256_hex(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _hmac_sha256(key: bytes, msg: str) -> bytes:
+    return hmac.new(key, msg.encode("utf-8"), hashlib.sha256).digest()
+
+
+def _xml_text(root: ET.Element, name: str) -> Optional[str]:
+    """查找第一个名为 name 的元素的文本（忽略命名空间）"""
+    for element in root.iter():
+        if element.tag == name or element.tag.endswith("}" + name):
+            return element.text
+    return None
+
+
+async def _read_part(read: Callable[[int], Awaitable[bytes]], size: int) -> bytes:
+    """读满一个分片：read 可能返回少于请求的字节数，循环读取直到读满 size 字节或返回空字节（结束）"""
+    chunks: List[bytes] = []
+    remaining = size
+    while remaining > 0:
+        chunk = await read(remaining)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return chunks[0] if len(chunks) == 1 else b"".join(chunks)
+
+
+class SigV4Signer:
+    """AWS Signature Version 4 请求签名（S3 服务）"""
+
+    def __init__(self, access_key: str, secret_key: str, region: str = "us-east-1"):
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self._key_cache: Tuple[str, bytes] = ("", b"")
+
+    def _signing_key(self, date: str) -> bytes:
+        """派生签名密钥，同一天内复用"""
+        cached_date, key = self._key_cache
+        if cached_date != date:
+            key = _hmac_sha256(("AWS4" + self.secret_key).encode("utf-8"), date)
+            for part in (self.region, "s3", "aws4_request"):
+                key = _hmac_sha256(key, part)
+            self._key_cache = (date, key)
+        return key
+
+    def sign(
+        self,
+        method: str,
+        path: str,
+        query: Dict[str, str],
+        headers: Dict[str, str],
+        payload_hash: str,
+        now: Optional[datetime] = None,
+    ) -> Dict[str, str]:
+        """
+        返回加上 x-amz-date / x-amz-content-sha256 / Authorization 后的请求头。
+        path 为已编码的路径；headers 的键为小写，需包含 host，全部参与签名。
+        """
+        now = now or datetime.now(timezone.utc)
+        amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+        headers = dict(headers, **{"x-amz-date": amz_date, "x-amz-content-sha256": payload_hash})
+        signed_headers = ";".join(sorted(headers))
+        signature = self._signature(method, path, query, headers, payload_hash, amz_date)
+        headers["authorization"] = (
+            f"AWS4-HMAC-SHA256 Credential={self.access_key}/{self._scope(amz_date)}, "
+            f"SignedHeaders={signed_headers}, Signature={signature}"
+        )
+        return headers
+
+    def presign(
+        self,
+        method: str,
+        path: str,
+        query: Dict[str, str],
+        host: str,
+        expires: int,
+        now: Optional[datetime] = None,
+    ) -> Dict[str, str]:
+        """
+        查询字符串签名（预签名 URL），返回加上 X-Amz-* 签名参数后的完整查询参数。
+        只对 host 头签名，请求体为 UNSIGNED-PAYLOAD；expires 为有效期（秒）。
+        """
+        now = now or datetime.now(timezone.utc)
+        amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+        query = dict(query, **{
+            "X-Amz-Algorithm": "AWS4-HMAC-SHA256",
+            "X-Amz-Credential": f"{self.access_key}/{self._scope(amz_date)}",
+            "X-Amz-Date": amz_date,
+            "X-Amz-Expires": str(expires),
+            "X-Amz-SignedHeaders": "host",
+        })
+        query["X-Amz-Signature"] = self._signature(method, path, query, {"host": host}, UNSIGNED_PAYLOAD, amz_date)
+        return query
+
+    def sign_post_policy(
+        self,
+        conditions: List[Any],
+        expires: int,
+        now: Optional[datetime] = None,
+    ) -> Dict[str, str]:
+        """
+        浏览器表单上传（POST Object）策略签名：在 conditions 中加入签名相关字段，
+        返回需要随表单提交的 policy / x-amz-* 字段。
+        """
+        now = now or datetime.now(timezone.utc)
+        amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+        fields = {
+            "x-amz-algorithm": "AWS4-HMAC-SHA256",
+            "x-amz-credential": f"{self.access_key}/{self._scope(amz_date)}",
+            "x-amz-date": amz_date,
+        }
+        policy = {
+            "expiration": (now + timedelta(seconds=expires)).strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+            "conditions": list(conditions) + [{name: value} for name, value in fields.items()],
+        }
+        fields["policy"] = base64.b64encode(json.dumps(policy).encode("utf-8")).decode("ascii")
+        fields["x-amz-signature"] = hmac.new(
+            self._signing_key(amz_date[:8]), fields["policy"].encode("utf-8"), hashlib.sha256
+        ).hexdigest()
+        return fields
+
+    def _scope(self, amz_date: str) -> str:
+        return f"{amz_date[:8]}/{self.region}/s3/aws4_request"
+
+    def _signature(
+        self,
+        method: str,
+        path: str,
+        query: Dict[str, str],
+        headers: Dict[str, str],
+        payload_hash: str,
+        amz_date: str,
+    ) -> str:
+        """计算规范请求的签名（headers 全部参与签名）"""
+        signed = sorted(headers)
+        canonical_headers = "".join(f"{name}:{' '.join(str(headers[name]).split())}\n" for name in signed)
+        canonical_query = "&".join(
+            f"{urllib.parse.quote(k, safe='-_.~')}={urllib.parse.quote(v, safe='-_.~')}"
+            for k, v in sorted(query.items())
+        )
+        canonical_request = "\n".join([
+            method, path, canonical_query, canonical_headers, ";".join(signed), payload_hash,
+        ])
+        string_to_sign = "\n".join([
+            "AWS4-HMAC-SHA256", amz_date, self._scope(amz_date), _sha256_hex(canonical_request.encode("utf-8")),
+        ])
+        return hmac.new(self._signing_key(amz_date[:8]), string_to_sign.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def _object_path(bucket: str, object_name: str = "") -> str:
+    """路径风格的请求路径（已编码）"""
+    path = "/" + urllib.parse.quote(bucket, safe="")
+    if object_name:
+        path += "/" + urllib.parse.quote(object_name, safe="/")
+    return path
+
+
+def _host(endpoint: str, secure: bool) -> str:
+    """与 httpx 实际发送的 Host 保持一致：省略默认端口"""
+    host, _, port = endpoint.partition(":")
+    return host if port in ("", "443" if secure else "80") else endpoint
+
+
+def presigned_url(
+    signer: SigV4Signer,
+    method: str,
+    endpoint: str,
+    secure: bool,
+    bucket: str,
+    object_name: str,
+    expires: int,
+    query: Optional[Dict[str, str]] = None,
+    now: Optional[datetime] = None,
+) -> str:
+    """
+    生成预签名 URL（纯计算，不访问网络）。endpoint 为客户端访问对象存储使用的 host[:port]，
+    签名包含 host，因此必须与客户端实际访问的地址一致。
+    """
+    path = _object_path(bucket, object_name)
+    signed = signer.presign(method, path, query or {}, _host(endpoint, secure), expires, now)
+    query_string = "&".join(
+        f"{urllib.parse.quote(k, safe='-_.~')}={urllib.parse.quote(v, safe='-_.~')}" for k, v in signed.items()
+    )
+    return f"{'https' if secure else 'http'}://{endpoint}{path}?{query_string}"
+
+
+class AsyncS3Client:
+    """
+    基于 httpx 的异步 S3 客户端（路径风格，兼容 MinIO）
+
+    - 独立的连接池，请求不经过线程池，stat / 删除 / 上传 / 下载都不阻塞事件循环
+    - SigV4 签名；HTTP 下对请求体计算 SHA-256，HTTPS 下使用 UNSIGNED-PAYLOAD（与 MinIO SDK 一致）
+    - 错误响应转换为 minio.error.S3Error，调用方可与 SDK 后端使用相同的错误处理
+    - httpx 连接池绑定事件循环，事件循环变化时（如测试中）自动重建
+    """
+
+    def __init__(
+        self,
+        endpoint: str,
+        access_key: str,
+        secret_key: str,
+        secure: bool = False,
+        region: str = "us-east-1",
+        max_connections: int = 10,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 30.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.secure = secure
+        self.base_url = f"{'https' if secure else 'http'}://{endpoint}"
+        self.host = _host(endpoint, secure)
+        self.signer = SigV4Signer(access_key, secret_key, region)
+        self.region = region
+        self._limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self._timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self._transport = transport
+        self._http: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._http is None or self._loop is not loop:
+            self._http = httpx.AsyncClient(
+                base_url=self.base_url,
+                limits=self._limits,
+                timeout=self._timeout,
+                transport=self._transport,
+            )
+            self._loop = loop
+        return self._http
+
+    async def aclose(self) -> None:
+        """关闭连接池"""
+        if self._http is not None and self._loop is asyncio.get_running_loop():
+            await self._http.aclose()
+        self._http = None
+        self._loop = None
+
+    # -------- 请求 --------
+
+    async def _payload_hash(self, content: bytes) -> str:
+        if self.secure:
+            return UNSIGNED_PAYLOAD
+        if not content:
+            return _EMPTY_SHA256
+        if len(content) < _HASH_OFFLOAD_BYTES:
+            return _sha256_hex(content)
+        return await asyncio.get_running_loop().run_in_executor(None, _sha256_hex, content)
+
+    async def _build_request(
+        self,
+        method: str,
+        bucket: str,
+        object_name: str = "",
+        query: Optional[Dict[str, str]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        content: bytes = b"",
+    ) -> httpx.Request:
+        path = _object_path(bucket, object_name)
+        query = query or {}
+        request_headers = {k.lower(): v for k, v in (headers or {}).items()}
+        request_headers["host"] = self.host
+        signed = self.signer.sign(method, path, query, request_headers, await self._payload_hash(content))
+        return self._client().build_request(method, path, params=query, headers=signed, content=content or None)
+
+    async def _request(self, method: str, bucket: str, object_name: str = "", **kwargs) -> httpx.Response:
+        """发送请求并读取完整响应，错误状态码转换为 S3Error"""
+        request = await self._build_request(method, bucket, object_name, **kwargs)
+        response = await self._client().send(request)
+        if response.status_code >= 300:
+            raise self._error(response, bucket, object_name)
+        return response
+
+    @staticmethod
+    def _error(response: httpx.Response, bucket: str, object_name: str) -> S3Error:
+        """根据错误响应构造 S3Error；HEAD 等无响应体时按状态码推断错误码"""
+        code = message = request_id = host_id = None
+        resource = response.request.url.path
+        if response.content:
+            try:
+                root = ET.fromstring(response.content)
+                code = _xml_text(root, "Code")
+                message = _xml_text(root, "Message")
+                request_id = _xml_text(root, "RequestId")
+                host_id = _xml_text(root, "HostId")
+                resource = _xml_text(root, "Resource") or resource
+            except ET.ParseError:
+                message = response.text[:200]
+        if code is None:
+            if response.status_code == 404:
+                code = "NoSuchKey" if object_name else "NoSuchBucket"
+            elif response.status_code == 403:
+                code = "AccessDenied"
+            else:
+                code = f"HTTP{response.status_code}"
+        request_id = request_id or response.headers.get("x-amz-request-id")
+        return S3Error(response, code, message or response.reason_phrase, resource, request_id, host_id, bucket, object_name or None)
+
+    # -------- Bucket --------
+
+    async def bucket_exists(self, bucket: str) -> bool:
+        try:
+            await self._request("HEAD", bucket)
+        except S3Error as e:
+            if e.code == "NoSuchBucket":
+                return False
+            raise
+        return True
+
+    async def make_bucket(self, bucket: str) -> None:
+        content = b""
+        if self.region != "us-east-1":
+            content = (
+                "<CreateBucketConfiguration><LocationConstraint>"
+                f"{self.region}</LocationConstraint></CreateBucketConfiguration>"
+            ).encode("utf-8")
+        await self._request("PUT", bucket, content=content)
+
+    # -------- Object --------
+
+    async def stat_object(self, bucket: str, object_name: str) -> S3ObjectStat:
+        response = await self._request("HEAD", bucket, object_name)
+        headers = response.headers
+        last_modified = headers.get("last-modified")
+        return S3ObjectStat(
+            object_name=object_name,
+            size=int(headers.get("content-length", 0)),
+            last_modified=parsedate_to_datetime(last_modified) if last_modified else None,
+            etag=headers.get("etag", "").strip('"'),
+            content_type=headers.get("content-type", ""),
+        )
+
+    async def remove_object(self, bucket: str, object_name: str) -> None:
+        await self._request("DELETE", bucket, object_name)
+
+    async def remove_objects(self, bucket: str, object_names: List[str]) -> List[S3DeleteError]:
+        """
+        批量删除（DeleteObjects，每次请求最多 1000 个对象，quiet 模式只返回失败项）。
+        与 S3 语义一致，不存在的对象视为删除成功。返回删除失败的对象列表。
+        """
+        errors: List[S3DeleteError] = []
+        for i in range(0, len(object_names), MAX_DELETE_OBJECTS):
+            chunk = object_names[i:i + MAX_DELETE_OBJECTS]
+            body = ("<Delete><Quiet>true</Quiet>" + "".join(
+                f"<Object><Key>{escape(name)}</Key></Object>" for name in chunk
+            ) + "</Delete>").encode("utf-8")
+            headers = {
+                "content-md5": base64.b64encode(hashlib.md5(body).digest()).decode(),
+                "content-type": "application/xml",
+            }
+            try:
+                response = await self._request("POST", bucket, query={"delete": ""}, headers=headers, content=body)
+            except S3Error as e:
+                # 整个请求失败：本批对象全部记为失败
+                errors.extend(S3DeleteError(name, e.code, e.message) for name in chunk)
+                continue
+            if not response.content:
+                continue
+            root = ET.fromstring(response.content)
+            for element in root.iter():
+                if element.tag == "Error" or element.tag.endswith("}Error"):
+                    errors.append(S3DeleteError(
+                        _xml_text(element, "Key"), _xml_text(element, "Code"), _xml_text(element, "Message")
+                    ))
+        return errors
+
+    async def put_object(
+        self, bucket: str, object_name: str, data: bytes, content_type: str = "application/octet-stream"
+    ) -> S3WriteResult:
+        """单次 PUT 上传"""
+        response = await self._request(
+            "PUT", bucket, object_name, headers={"content-type": content_type}, content=data
+        )
+        return S3WriteResult(object_name, response.headers.get("etag", "").strip('"'))
+
+    async def put_object_stream(
+        self,
+        bucket: str,
+        object_name: str,
+        read: Callable[[int], Awaitable[bytes]],
+        part_size: int,
+        content_type: str = "application/octet-stream",
+    ) -> S3WriteResult:
+        """
+        按分片读取并上传：read(n) 返回最多 n 字节（可以少于 n），返回空字节表示结束。
+        不超过一个分片的数据直接 PUT；否则走分片上传，任何错误都会中止该次分片上传。
+        内存中同一时间只有一个分片。part_size 不能小于 MIN_PART_SIZE（在传输任何数据前检查）。
+        """
+        if part_size < MIN_PART_SIZE:
+            raise ValueError(f"part_size 不能小于 {MIN_PART_SIZE} 字节（5MB），当前为: {part_size}")
+        data = await _read_part(read, part_size)
+        if len(data) < part_size:
+            return await self.put_object(bucket, object_name, data, content_type)
+
+        response = await self._request(
+            "POST", bucket, object_name, query={"uploads": ""}, headers={"content-type": content_type}
+        )
+        upload_id = _xml_text(ET.fromstring(response.content), "UploadId")
+        parts: List[Tuple[int, str]] = []
+        try:
+            while data:
+                number = len(parts) + 1
+                response = await self._request(
+                    "PUT", bucket, object_name,
+                    query={"partNumber": str(number), "uploadId": upload_id}, content=data,
+                )
+                parts.append((number, response.headers.get("etag", "")))
+                if len(data) < part_size:
+                    break
+                data = await _read_part(read, part_size)
+
+            body = "<CompleteMultipartUpload>" + "".join(
+                f"<Part><PartNumber>{number}</PartNumber><ETag>{etag}</ETag></Part>" for number, etag in parts
+            ) + "</CompleteMultipartUpload>"
+            response = await self._request(
+                "POST", bucket, object_name, query={"uploadId": upload_id}, content=body.encode("utf-8")
+            )
+            # CompleteMultipartUpload 可能以 200 状态码返回错误
+            root = ET.fromstring(response.content)
+            if root.tag == "Error" or root.tag.endswith("}Error"):
+                raise S3Error(
+                    response, _xml_text(root, "Code"), _xml_text(root, "Message"),
+                    _xml_text(root, "Resource"), _xml_text(root, "RequestId"), _xml_text(root, "HostId"),
+                    bucket, object_name,
+                )
+            return S3WriteResult(object_name, (_xml_text(root, "ETag") or "").strip('"'))
+        except BaseException:
+            try:
+                await self._request("DELETE", bucket, object_name, query={"uploadId": upload_id})
+            except Exception as e:
+                logger.warning(f"Abort multipart upload failed for {object_name}: {e}")
+            raise
+
+    async def get_object(
+        self,
+        bucket: str,
+        object_name: str,
+        chunk_size: int = 1024 * 1024,
+        offset: int = 0,
+        length: Optional[int] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> AsyncIterator[bytes]:
+        """
+        按块流式读取对象内容
+        offset / length 指定字节范围（Range 请求，length 为 None 时读到末尾）；
+        headers 为额外请求头（如 If-Match），条件不满足时抛出 S3Error
+        """
+        # 要求原样返回对象内容：不让 MinIO 按 Content-Encoding 转换，也不在本地解压，
+        # 保证读取的字节与存储的字节、Range 偏移量、Content-Length / ETag 一致（与 SDK 一致）
+        headers = {"accept-encoding": "identity", **(headers or {})}
+        if offset or length:
+            headers["range"] = f"bytes={offset}-{offset + length - 1 if length else ''}"
+        request = await self._build_request("GET", bucket, object_name, headers=headers)
+        response = await self._client().send(request, stream=True)
+        try:
+            if response.status_code >= 300:
+                await response.aread()
+                raise self._error(response, bucket, object_name)
+            async for chunk in response.aiter_raw(chunk_size):
+                yield chunk
+        finally:
+            await response.aclose()
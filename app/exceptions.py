@@ -16,3 +16,7 @@ class FileDownloadError(AppError):
 class FileValidationError(AppError):
     """Raised when file validation fails"""
     pass
+
+class ServiceBusyError(AppError):
+    """Raised when a bounded worker pool is saturated"""
+    pass
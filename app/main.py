@@ -1,9 +1,13 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from starlette.routing import Mount
 from app.core.config import get_settings
 from app.core.logger import setup_logging
 from app.mcp.server import mcp, init_mcp
 from app.api.main import api_router
+from app.core.minio_client import get_minio_client
+from app.services.text_splitter_service import text_splitter_service
+from app.services.minio_service import get_minio_service
 
 # 加载配置
 settings = get_settings()
@@ -14,11 +18,25 @@ setup_logging()
 # 初始化 MCP (加载插件)
 init_mcp()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    应用生命周期：按配置启动 MinIO 事件监听（元数据缓存失效）；
+    退出时关闭文本分块的线程池/进程池与异步 S3 客户端的连接池
+    """
+    if settings.MINIO_INFO_CACHE_NOTIFICATIONS:
+        get_minio_service().start_info_cache_listener()
+    yield
+    get_minio_service().stop_info_cache_listener()
+    text_splitter_service.shutdown(wait=False)
+    await get_minio_client().aclose()
+
 # 创建 FastAPI 应用
 app = FastAPI(
     title=settings.APP_NAME,
     description="MCP Server for Dify Integration",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # 挂载 API 路由
@@ -37,6 +55,17 @@ async def health_check():
     """
     return {"status": "ok", "app_name": settings.APP_NAME}
 
+@app.get("/metrics")
+async def metrics():
+    """
+    运行指标端点
+    """
+    return {
+        "text_splitter_cache": text_splitter_service.cache_stats(),
+        "minio_executor": get_minio_client().executor_stats(),
+        "minio_info_cache": get_minio_service().info_cache_stats(),
+    }
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
@@ -10,6 +10,7 @@ from app.core.logger import logger
 import base64
 import json
 from io import BytesIO
+from typing import List, Optional
 
 minio_service = get_minio_service()
 
@@ -78,7 +79,7 @@ async def get_file_info(object_name: str) -> str:
         return json.dumps({"error": str(e)}, ensure_ascii=False)
 
 @mcp.tool()
-async def delete_file(object_name: str) -> str:
+async def delete_file(object_name: str, check_exists: bool = True) -> str:
     """
     MinIO 文件删除工具
     
@@ -86,16 +87,171 @@ async def delete_file(object_name: str) -> str:
     
     Args:
         object_name: 要删除的对象名称（路径）。
+        check_exists: (可选) 是否先检查文件是否存在，默认 True，不存在时返回错误。
+                      设为 False 时为幂等删除：只发送一次删除请求，文件不存在也返回成功。
         
     Returns:
         str: 包含删除结果的 JSON 字符串。
-             成功示例: {"deleted": true, "object_name": "..."}
+             成功示例: {"deleted": true, "object_name": "...", "existence_checked": true}
              失败示例: {"error": "..."}
     """
     logger.info(f"MCP Tool 'delete_file' called for object: {object_name}")
     try:
-        result = await minio_service.delete_file(object_name)
+        result = await minio_service.delete_file(object_name, check_exists=check_exists)
         return json.dumps(result, ensure_ascii=False)
     except Exception as e:
         logger.error(f"Delete failed: {e}")
         return json.dumps({"error": str(e)}, ensure_ascii=False)
+
+@mcp.tool()
+async def get_files_info(object_names: List[str]) -> str:
+    """
+    MinIO 批量文件信息查询工具
+    
+    并发查询多个对象的元数据信息，单个对象查询失败不影响其他对象。
+    
+    Args:
+        object_names: 对象名称列表（单次最多 MINIO_BATCH_MAX_OBJECTS 个，重复的名称只查询一次）。
+        
+    Returns:
+        str: 包含逐个查询结果的 JSON 字符串（按输入顺序）。
+             成功示例: {"results": [{"object_name": "...", "size": 1024, ...}, {"object_name": "...", "error": "文件不存在", "code": "FILE_NOT_FOUND"}], "found": 1, "failed": 1}
+             失败示例: {"error": "..."}
+    """
+    logger.info(f"MCP Tool 'get_files_info' called for {len(object_names)} objects")
+    try:
+        result = await minio_service.get_files_info(object_names)
+        return json.dumps(result, ensure_ascii=False)
+    except Exception as e:
+        logger.error(f"Get files info failed: {e}")
+        return json.dumps({"error": str(e)}, ensure_ascii=False)
+
+@mcp.tool()
+async def delete_files(object_names: List[str]) -> str:
+    """
+    MinIO 批量文件删除工具
+    
+    使用 S3 批量删除接口（每次请求最多 1000 个对象）删除多个文件。
+    不逐个检查对象是否存在，不存在的对象视为删除成功。
+    
+    Args:
+        object_names: 要删除的对象名称列表（单次最多 MINIO_BATCH_MAX_OBJECTS 个）。
+        
+    Returns:
+        str: 包含逐个删除结果的 JSON 字符串（按输入顺序）。
+             成功示例: {"results": [{"object_name": "...", "deleted": true}], "deleted": 1, "failed": 0, "delete_time": "..."}
+             失败示例: {"error": "..."}
+    """
+    logger.info(f"MCP Tool 'delete_files' called for {len(object_names)} objects")
+    try:
+        result = await minio_service.delete_files(object_names)
+        return json.dumps(result, ensure_ascii=False)
+    except Exception as e:
+        logger.error(f"Batch delete failed: {e}")
+        return json.dumps({"error": str(e)}, ensure_ascii=False)
+
+@mcp.tool()
+async def presign_upload_url(filename: str = "", object_name: str = "", expires: Optional[int] = None) -> str:
+    """
+    MinIO 预签名上传 URL 工具
+    
+    生成预签名 PUT URL，客户端使用该 URL 直接将文件上传到 MinIO，数据不经过本服务。
+    签发时按扩展名检查文件类型；PUT URL 无法限制文件大小，需要限制时使用 presign_post_policy。
+    
+    Args:
+        filename: 文件名（包含扩展名），未提供 object_name 时用于生成对象名称。
+        object_name: (可选) 对象名称，提供时直接使用。
+        expires: (可选) 有效期（秒），默认 MINIO_PRESIGN_EXPIRES，最长 7 天。
+        
+    Returns:
+        str: 包含预签名 URL 的 JSON 字符串。
+             成功示例: {"object_name": "...", "method": "PUT", "url": "...", "headers": {"Content-Type": "..."}, "expires_in": 3600, "expires_at": "..."}
+             失败示例: {"error": "..."}
+    """
+    logger.info(f"MCP Tool 'presign_upload_url' called for file: {filename or object_name}")
+    try:
+        result = await minio_service.presigned_upload_url(object_name or None, filename or None, expires)
+        return json.dumps(result, ensure_ascii=False)
+    except Exception as e:
+        logger.error(f"Presign upload failed: {e}")
+        return json.dumps({"error": str(e)}, ensure_ascii=False)
+
+@mcp.tool()
+async def presign_download_url(object_name: str, expires: Optional[int] = None, filename: str = "") -> str:
+    """
+    MinIO 预签名下载 URL 工具
+    
+    生成预签名 GET URL，客户端使用该 URL 直接从 MinIO 下载文件（不检查文件是否存在）。
+    
+    Args:
+        object_name: 对象存储中的对象名称（路径）。
+        expires: (可选) 有效期（秒），默认 MINIO_PRESIGN_EXPIRES，最长 7 天。
+        filename: (可选) 下载时保存的文件名，提供时以附件形式下载。
+        
+    Returns:
+        str: 包含预签名 URL 的 JSON 字符串。
+             成功示例: {"object_name": "...", "method": "GET", "url": "...", "expires_in": 3600, "expires_at": "..."}
+             失败示例: {"error": "..."}
+    """
+    logger.info(f"MCP Tool 'presign_download_url' called for object: {object_name}")
+    try:
+        result = await minio_service.presigned_download_url(object_name, expires, filename or None)
+        return json.dumps(result, ensure_ascii=False)
+    except Exception as e:
+        logger.error(f"Presign download failed: {e}")
+        return json.dumps({"error": str(e)}, ensure_ascii=False)
+
+@mcp.tool()
+async def presign_post_policy(
+    filename: str = "", object_name: str = "", expires: Optional[int] = None, max_size: Optional[int] = None
+) -> str:
+    """
+    MinIO 预签名表单上传工具
+    
+    生成预签名 POST 策略，客户端以 multipart/form-data 提交返回的 fields 与文件（file 字段放在最后）
+    直接上传到 MinIO。策略限定对象名称、Content-Type 与文件大小，由 MinIO 在上传时强制校验。
+    
+    Args:
+        filename: 文件名（包含扩展名），未提供 object_name 时用于生成对象名称。
+        object_name: (可选) 对象名称，提供时直接使用。
+        expires: (可选) 有效期（秒），默认 MINIO_PRESIGN_EXPIRES，最长 7 天。
+        max_size: (可选) 文件大小上限（字节），默认且最大为 MAX_FILE_SIZE。
+        
+    Returns:
+        str: 包含上传地址与表单字段的 JSON 字符串。
+             成功示例: {"object_name": "...", "method": "POST", "url": "...", "fields": {...}, "max_size": 104857600, ...}
+             失败示例: {"error": "..."}
+    """
+    logger.info(f"MCP Tool 'presign_post_policy' called for file: {filename or object_name}")
+    try:
+        result = await minio_service.presigned_post_policy(object_name or None, filename or None, expires, max_size)
+        return json.dumps(result, ensure_ascii=False)
+    except Exception as e:
+        logger.error(f"Presign post policy failed: {e}")
+        return json.dumps({"error": str(e)}, ensure_ascii=False)
+
+@mcp.tool()
+async def read_file_range(object_name: str, offset: int = 0, length: int = 65536, as_text: bool = True) -> str:
+    """
+    MinIO 文件按范围读取工具
+    
+    只读取文件的一段字节（如大文件开头的 N KB，用于预览），不下载整个文件。
+    
+    Args:
+        object_name: 对象存储中的对象名称（路径）。
+        offset: (可选) 起始字节位置，默认 0。
+        length: (可选) 读取的字节数，默认 65536，最大 1048576。
+        as_text: (可选) 是否按 UTF-8 解码为文本，默认 True；False 时返回 Base64。
+        
+    Returns:
+        str: 包含读取结果的 JSON 字符串。
+             成功示例: {"object_name": "...", "size": 10485760, "offset": 0, "length": 65536, "truncated": true, "encoding": "text", "content": "..."}
+             失败示例: {"error": "..."}
+    """
+    logger.info(f"MCP Tool 'read_file_range' called for object: {object_name} ({offset}+{length})")
+    try:
+        result = await minio_service.read_range(object_name, offset, length, as_text)
+        return json.dumps(result, ensure_ascii=False)
+    except Exception as e:
+        logger.error(f"Read range failed: {e}")
+        return json.dumps({"error": str(e)}, ensure_ascii=False)
@@ -1,4 +1,5 @@
-from typing import Dict, Any
+from typing import Dict, Any, List
+from mcp.server.fastmcp import Context
 from app.mcp.server import mcp
 from app.services.text_splitter_service import text_splitter_service
 from app.core.logger import logger
@@ -6,13 +7,16 @@ from app.core.logger import logger
 @mcp.tool()
 async def text_splitter(
     mode: str,
-    content: str,
+    content: str = "",
+    object_name: str = "",
+    result_object_name: str = "",
     parent_block_size: int = 1280,
     sub_block_size: int = 512,
     parent_separator: str = "\n\n\n\n",
     sub_separator: str = "\n\n\n",
     preview_url: str = "",
     overlap: int = 0,
+    output: str = "text",
 ) -> Dict[str, Any]:
     """
     文本分块工具
@@ -20,18 +24,40 @@ async def text_splitter(
     
     Args:
         mode: 分块模式。取值: 'pdf' (PDF文本), 'table' (Markdown表格), 'image' (纯文本带图片预览)
-        content: 待处理的文本内容
+        content: 待处理的文本内容（与 object_name 二选一）
+        object_name: MinIO 中待处理文本对象的名称（UTF-8），指定时由服务端直接读取，不再通过 content 传输
+        result_object_name: 仅与 object_name 一起使用，指定时把分块结果写入该 MinIO 对象，只返回对象名与统计信息
         parent_block_size: 父块大小上限 (默认 1024)
         sub_block_size: 子块大小上限 (默认 512)
         parent_separator: 父块之间的分隔符 (默认 "\n\n\n\n")
         sub_separator: 子块之间的分隔符 (默认 "\n\n\n")
         preview_url: 当 mode=='image' 时必填的图片预览地址
         overlap: 仅针对 PDF 模式，相邻父块之间的重叠字符数 (默认 0)
+        output: 输出格式。'text' 返回连接后的字符串；'structured' 返回父块列表，子块以原文偏移量表示 (默认 'text')
         
     Returns:
-        Dict[str, Any]: 包含处理后文本的字典 {"result": splited_content}
+        Dict[str, Any]: 包含处理后文本的字典 {"result": splited_content}；
+            structured 模式下 result 为 [{"length": 父块长度, "subs": [[start, end], ...]}, ...]；
+            指定 result_object_name 时为 {"object_name": ..., "size": ..., "parent_blocks": ..., ...}
     """
     logger.info(f"MCP Tool 'text_splitter' called with mode: {mode}")
+    if object_name:
+        if content:
+            raise ValueError("content 与 object_name 只能提供一个")
+        return await text_splitter_service.split_object(
+            object_name=object_name,
+            mode=mode,
+            result_object_name=result_object_name,
+            parent_block_size=parent_block_size,
+            sub_block_size=sub_block_size,
+            parent_separator=parent_separator,
+            sub_separator=sub_separator,
+            preview_url=preview_url,
+            overlap=overlap,
+            output=output
+        )
+    if result_object_name:
+        raise ValueError("result_object_name 需要与 object_name 一起使用")
     result = await text_splitter_service.split(
         mode=mode,
         content=content,
@@ -40,6 +66,108 @@ async def text_splitter(
         parent_separator=parent_separator,
         sub_separator=sub_separator,
         preview_url=preview_url,
-        overlap=overlap
+        overlap=overlap,
+        output=output
     )
     return result
+
+@mcp.tool()
+async def text_splitter_stream(
+    mode: str,
+    content: str,
+    ctx: Context,
+    parent_block_size: int = 1280,
+    sub_block_size: int = 512,
+    sub_separator: str = "\n\n\n",
+    preview_url: str = "",
+    overlap: int = 0,
+) -> Dict[str, Any]:
+    """
+    流式文本分块工具
+    每确定一个父块即通过 MCP 进度通知 (notifications/progress) 推送，通知的 message 为父块内容，
+    客户端无需等待整篇文档处理完成。进度通知只在请求携带 progressToken 时发送；
+    未携带时无法推送，父块改为在结果的 blocks 中一次性返回，内容不会丢失。
+    
+    Args:
+        mode: 分块模式。取值: 'pdf' (PDF文本), 'table' (Markdown表格), 'image' (纯文本带图片预览)
+        content: 待处理的文本内容
+        parent_block_size: 父块大小上限 (默认 1280)
+        sub_block_size: 子块大小上限 (默认 512)
+        sub_separator: 子块之间的分隔符 (默认 "\n\n\n")
+        preview_url: 当 mode=='image' 时必填的图片预览地址
+        overlap: 仅针对 PDF 模式，相邻父块之间的重叠字符数 (默认 0)
+        
+    Returns:
+        Dict[str, Any]: 推送统计 {"parent_blocks": 父块数量, "total_length": 父块内容总长度}；
+            请求未携带 progressToken 时额外包含 "blocks": [父块内容, ...]
+    """
+    logger.info(f"MCP Tool 'text_splitter_stream' called with mode: {mode}")
+    meta = ctx.request_context.meta
+    streaming = meta is not None and meta.progressToken is not None
+    blocks: List[str] = []
+    count = 0
+    total_length = 0
+    async for block in text_splitter_service.iter_split(
+        mode=mode,
+        content=content,
+        parent_block_size=parent_block_size,
+        sub_block_size=sub_block_size,
+        sub_separator=sub_separator,
+        preview_url=preview_url,
+        overlap=overlap
+    ):
+        count += 1
+        total_length += len(block)
+        if streaming:
+            await ctx.report_progress(progress=count, message=block)
+        else:
+            blocks.append(block)
+    result: Dict[str, Any] = {"parent_blocks": count, "total_length": total_length}
+    if not streaming:
+        result["blocks"] = blocks
+    return result
+
+@mcp.tool()
+async def text_splitter_batch(
+    documents: List[Dict[str, Any]],
+    mode: str = "pdf",
+    parent_block_size: int = 1280,
+    sub_block_size: int = 512,
+    parent_separator: str = "\n\n\n\n",
+    sub_separator: str = "\n\n\n",
+    preview_url: str = "",
+    overlap: int = 0,
+    output: str = "text",
+) -> Dict[str, Any]:
+    """
+    批量文本分块工具
+    一次调用处理多篇文档，省去逐篇调用的往返开销，结果按输入顺序返回。
+    
+    Args:
+        documents: 文档列表，每项为 {"content": "文本内容", ...}，可带 mode、parent_block_size 等参数覆盖下方的共享参数
+        mode: 共享的分块模式。取值: 'pdf' (PDF文本), 'table' (Markdown表格), 'image' (纯文本带图片预览)
+        parent_block_size: 共享的父块大小上限 (默认 1280)
+        sub_block_size: 共享的子块大小上限 (默认 512)
+        parent_separator: 共享的父块分隔符 (默认 "\n\n\n\n")
+        sub_separator: 共享的子块分隔符 (默认 "\n\n\n")
+        preview_url: 当 mode=='image' 时必填的图片预览地址
+        overlap: 仅针对 PDF 模式，相邻父块之间的重叠字符数 (默认 0)
+        output: 输出格式。'text' 或 'structured'，与 text_splitter 一致 (默认 'text')
+        
+    Returns:
+        Dict[str, Any]: {"results": [...]}，与 documents 一一对应；
+            成功项为 {"result": ...}（同 text_splitter），参数错误的文档为 {"error": "错误信息"}
+    """
+    logger.info(f"MCP Tool 'text_splitter_batch' called with {len(documents)} documents")
+    results = await text_splitter_service.split_batch(
+        documents,
+        mode=mode,
+        parent_block_size=parent_block_size,
+        sub_block_size=sub_block_size,
+        parent_separator=parent_separator,
+        sub_separator=sub_separator,
+        preview_url=preview_url,
+        overlap=overlap,
+        output=output
+    )
+    return {"results": results}
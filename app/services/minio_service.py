@@ -6,43 +6,180 @@ MinIO 文件服务模块
 """
 
 import uuid
+import base64
+import codecs
+import hashlib
 import asyncio
+import threading
 import urllib.parse
-from datetime import datetime
-from typing import Optional, Dict, Any
-from functools import partial
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, AsyncIterator, List, Tuple
+from io import BytesIO
+from contextlib import aclosing
 
 # MinIO SDK imports
 from minio.error import S3Error
+from minio.deleteobjects import DeleteObject
 
 # App imports
 from app.core.minio_client import get_minio_client
+from app.core.s3_async import MAX_DELETE_OBJECTS, SigV4Signer, presigned_url
+from app.core.metadata_cache import MetadataCache
+from app.core.dedup_index import DedupIndex
 from app.core.config import get_settings
 from app.core.logger import logger
-from app.exceptions import FileUploadError, FileDownloadError, FileValidationError
+from app.exceptions import FileUploadError, FileDownloadError, FileValidationError, ServiceBusyError
 
 settings = get_settings()
 
+class _UploadStream:
+    """
+    上传数据流包装：put_object 按分片读取的同时完成校验，只读一遍数据
+
+    - 累计字节数，超过 limit 立即抛出 FileValidationError（不依赖预先得到的文件大小，
+      MinIO SDK / 异步客户端随后会中止分片上传）
+    - 增量计算 MD5 与 SHA-256
+    - check_header 非空时，用第一块数据的文件头调用它检测文件类型（文件名没有扩展名时），
+      类型不支持时在上传任何数据之前失败
+
+    只需要 read()，可以包装不可 seek 的流。
+    """
+
+    def __init__(self, raw, limit: int, check_header=None):
+        self._raw = raw
+        self._limit = limit
+        self._check_header = check_header
+        self._md5 = hashlib.md5()
+        self._sha256 = hashlib.sha256()
+        self.bytes_read = 0
+
+    def _too_large(self) -> FileValidationError:
+        return FileValidationError(
+            f"文件大小超过限制。最大允许: {self._limit / (1024*1024):.1f}MB",
+            "FILE_TOO_LARGE"
+        )
+
+    def check_length(self, length: int) -> None:
+        """已知文件大小时在上传前检查，超限的文件不发送任何数据"""
+        if length > self._limit:
+            raise self._too_large()
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._raw.read(size)
+        if self._check_header is not None:
+            check, self._check_header = self._check_header, None
+            check(data[:16])
+        self.bytes_read += len(data)
+        if self.bytes_read > self._limit:
+            raise self._too_large()
+        self._md5.update(data)
+        self._sha256.update(data)
+        return data
+
+    def drain(self, chunk_size: int) -> None:
+        """读完剩余数据（只校验与计算哈希）"""
+        while self.read(chunk_size):
+            pass
+
+    @property
+    def md5(self) -> str:
+        return self._md5.hexdigest()
+
+    @property
+    def sha256(self) -> str:
+        return self._sha256.hexdigest()
+
+class _TextDecoder:
+    """按块增量解码 UTF-8 文本（兼容 BOM），累计字节数超过 MAX_FILE_SIZE 时抛出 FileValidationError"""
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self._parts = []
+        self._size = 0
+
+    def feed(self, chunk: bytes) -> None:
+        self._size += len(chunk)
+        if self._size > settings.MAX_FILE_SIZE:
+            raise FileValidationError(
+                f"文件大小超过限制。最大允许: {settings.MAX_FILE_SIZE / (1024*1024):.1f}MB",
+                "FILE_TOO_LARGE"
+            )
+        try:
+            self._parts.append(self._decoder.decode(chunk))
+        except UnicodeDecodeError:
+            raise FileValidationError("文件不是有效的 UTF-8 文本", "INVALID_ENCODING")
+
+    def finish(self) -> str:
+        try:
+            self._parts.append(self._decoder.decode(b"", final=True))
+        except UnicodeDecodeError:
+            raise FileValidationError("文件不是有效的 UTF-8 文本", "INVALID_ENCODING")
+        return "".join(self._parts)
+
 class MinioService:
     """
     MinIO 文件服务类 (Async)
+
+    MINIO_CLIENT_BACKEND 选择访问 MinIO 的方式：
+    - sdk: MinIO SDK（同步），每次调用派发到线程池
+    - httpx: 原生异步 S3 客户端（独立连接池 + SigV4 签名），网络 IO 不经过线程池
+
+    MINIO_INFO_CACHE_ENABLED 时 get_file_info 的结果（含“不存在”）缓存在进程内，
+    本服务写入/删除对象时失效；外部写入可通过 MinIO 事件通知失效（MINIO_INFO_CACHE_NOTIFICATIONS），
+    否则最多在 TTL 后可见。
+
+    MINIO_UPLOAD_DEDUP 时上传按内容去重：未指定 object_name 的上传先计算 SHA-256，
+    本地索引中已有相同内容（且对象仍存在）时不再写入 MinIO，直接返回已有对象。
     """
+
+    BACKENDS = ("sdk", "httpx")
     
+    # 读取文本对象时每次从连接中读取的字节数
+    READ_CHUNK_SIZE = 1024 * 1024
+    # 预签名 URL 的最长有效期（S3 上限为 7 天）
+    PRESIGN_MAX_EXPIRES = 7 * 24 * 3600
+    # read_range 单次最多读取的字节数
+    READ_RANGE_MAX = 1024 * 1024
+
     def __init__(self):
         self.client_manager = get_minio_client()
         # bucket_name 从配置获取，不直接存储在实例中，或者在需要时获取
         self.bucket_name = settings.MINIO_BUCKET_NAME
         self._bucket_checked = False
+        backend = str(settings.MINIO_CLIENT_BACKEND).strip().lower()
+        if backend not in self.BACKENDS:
+            raise ValueError(f"MINIO_CLIENT_BACKEND 必须是 {' | '.join(self.BACKENDS)}，当前为: {backend}")
+        self.use_async_client = backend == "httpx"
+        self.info_cache: Optional[MetadataCache] = None
+        if settings.MINIO_INFO_CACHE_ENABLED:
+            self.info_cache = MetadataCache(
+                max_entries=settings.MINIO_INFO_CACHE_MAX_ENTRIES,
+                ttl=settings.MINIO_INFO_CACHE_TTL,
+                negative_ttl=settings.MINIO_INFO_CACHE_NEGATIVE_TTL,
+            )
+        self.dedup_index: Optional[DedupIndex] = None
+        if settings.MINIO_UPLOAD_DEDUP:
+            self.dedup_index = DedupIndex(settings.MINIO_UPLOAD_DEDUP_DB)
+        self._listener: Optional[threading.Thread] = None
+        self._listener_stop = threading.Event()
 
     async def _run_in_thread(self, func, *args, **kwargs):
-        """在线程池中运行同步阻塞函数"""
-        loop = asyncio.get_running_loop()
-        return await loop.run_in_executor(None, partial(func, *args, **kwargs))
+        """
+        在 MinIO 专用的有界线程池中运行同步阻塞函数
+        线程池与排队都已满时立即抛出 ServiceBusyError（路由返回 503）
+        """
+        return await self.client_manager.get_executor().run(func, *args, **kwargs)
 
     async def _ensure_bucket(self):
         """确保 Bucket 存在（线程安全且只检查一次）"""
         if not self._bucket_checked:
-            await self._run_in_thread(self.client_manager.ensure_bucket_exists)
+            if self.use_async_client:
+                client = self.client_manager.get_async_client()
+                if not await client.bucket_exists(self.bucket_name):
+                    logger.info(f"Bucket '{self.bucket_name}' does not exist. Creating it.")
+                    await client.make_bucket(self.bucket_name)
+            else:
+                await self._run_in_thread(self.client_manager.ensure_bucket_exists)
             self._bucket_checked = True
 
     def validate_file(self, file_obj, filename: str):
@@ -59,11 +196,7 @@ class MinioService:
         if not file_ext:
             file_ext = self._detect_file_type_from_content(file_obj)
         
-        if file_ext not in settings.ALLOWED_EXTENSIONS:
-            raise FileValidationError(
-                f"不支持的文件类型: {file_ext}。支持的类型: {', '.join(settings.ALLOWED_EXTENSIONS)}",
-                "UNSUPPORTED_FILE_TYPE"
-            )
+        self._check_file_type(file_ext)
         
         # 检查文件大小
         try:
@@ -86,25 +219,65 @@ class MinioService:
             file_obj.seek(0)
             header = file_obj.read(16)
             file_obj.seek(original_position)
-            
-            if not header:
-                return ''
-            
-            if header.startswith(b'\xff\xd8\xff'): return 'jpg'
-            if header.startswith(b'\x89PNG\r\n\x1a\n'): return 'png'
-            if header.startswith(b'GIF87a') or header.startswith(b'GIF89a'): return 'gif'
-            if header.startswith(b'%PDF'): return 'pdf'
-            
-            try:
-                header.decode('utf-8')
-                return 'txt'
-            except UnicodeDecodeError:
-                pass
-                
+            return self._detect_file_type(header)
         except Exception:
             pass
         return ''
 
+    @staticmethod
+    def _detect_file_type(header: bytes) -> str:
+        """根据文件头（前 16 字节）检测文件类型，无法识别时返回空字符串"""
+        if not header:
+            return ''
+        
+        if header.startswith(b'\xff\xd8\xff'): return 'jpg'
+        if header.startswith(b'\x89PNG\r\n\x1a\n'): return 'png'
+        if header.startswith(b'GIF87a') or header.startswith(b'GIF89a'): return 'gif'
+        if header.startswith(b'%PDF'): return 'pdf'
+        
+        try:
+            header.decode('utf-8')
+            return 'txt'
+        except UnicodeDecodeError:
+            pass
+        return ''
+
+    @staticmethod
+    def _check_file_type(file_ext: str) -> None:
+        if file_ext not in settings.ALLOWED_EXTENSIONS:
+            raise FileValidationError(
+                f"不支持的文件类型: {file_ext}。支持的类型: {', '.join(settings.ALLOWED_EXTENSIONS)}",
+                "UNSUPPORTED_FILE_TYPE"
+            )
+
+    def _open_upload_stream(self, file_obj, filename: str) -> _UploadStream:
+        """
+        按文件名做上传前可以立即完成的校验，返回边读边校验的数据流：
+        扩展名在上传前检查；没有扩展名时在读取第一块数据时按文件头检测类型
+        """
+        if not file_obj or not filename:
+            raise FileValidationError("文件不能为空", "EMPTY_FILE")
+        file_ext = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+        check_header = None
+        if file_ext:
+            self._check_file_type(file_ext)
+        else:
+            check_header = lambda header: self._check_file_type(self._detect_file_type(header))
+        return _UploadStream(file_obj, settings.MAX_FILE_SIZE, check_header)
+
+    @staticmethod
+    def _rewind(file_obj) -> int:
+        """
+        可 seek 的文件回到开头并返回文件大小（只 seek，不读取数据）；
+        不可 seek 的流返回 -1（大小未知），从当前位置读取
+        """
+        seekable = getattr(file_obj, "seekable", None)
+        if seekable is not None and seekable():
+            size = file_obj.seek(0, 2)
+            file_obj.seek(0)
+            return size
+        return -1
+
     def generate_object_name(self, original_filename: str) -> str:
         """生成对象存储名称"""
         file_ext = ''
@@ -115,80 +288,156 @@ class MinioService:
         unique_id = str(uuid.uuid4())
         return f"{date_prefix}/{unique_id}{file_ext}"
 
-    def _validate_task(self, file_obj, filename: str, object_name: str = None):
-        """在线程中执行文件验证和参数准备"""
-        # 1. 准备参数
-        if object_name is None:
-            object_name = self.generate_object_name(filename)
-            
-        content_type = self._get_content_type(filename)
-
-        # 2. 验证
-        self.validate_file(file_obj, filename)
-        
-        # 验证后重置指针
-        file_obj.seek(0, 2)
-        file_size = file_obj.tell()
+    def _hash_task(self, file_obj, stream: _UploadStream) -> None:
+        """在线程中预先读完整个文件计算哈希（用于去重，要求文件可 seek），读完后回到开头"""
+        stream.check_length(self._rewind(file_obj))
+        stream.drain(self.READ_CHUNK_SIZE)
         file_obj.seek(0)
-        
-        return file_size, object_name, content_type
 
-    def _execute_upload_task(self, file_obj, filename: str, file_size: int, object_name: str, content_type: str):
-        """在线程中执行实际上传"""
+    def _execute_upload_task(self, file_obj, stream: _UploadStream, object_name: str, content_type: str):
+        """
+        在线程中执行实际上传（校验在读取数据时同步完成，不需要单独的校验步骤）
+        超过 MINIO_UPLOAD_PART_SIZE 的文件走分片上传，按分片从 stream 读取，
+        单次上传占用的内存约为 分片大小 × MINIO_UPLOAD_PARALLEL_PARTS，与文件大小无关。
+        """
+        length = self._rewind(file_obj)
+        stream.check_length(length)
         client = self.client_manager.get_client()
         return client.put_object(
             bucket_name=self.bucket_name,
             object_name=object_name,
-            data=file_obj,
-            length=file_size,
+            data=stream,
+            length=length,
+            content_type=content_type,
+            part_size=settings.MINIO_UPLOAD_PART_SIZE,
+            num_parallel_uploads=settings.MINIO_UPLOAD_PARALLEL_PARTS
+        )
+
+    async def _execute_upload_async(self, file_obj, stream: _UploadStream, object_name: str, content_type: str):
+        """
+        使用异步客户端上传：按分片读取 stream（本地文件读取在线程中执行），网络 IO 在事件循环中完成。
+        内存中同一时间只有一个分片。
+        """
+        stream.check_length(self._rewind(file_obj))
+
+        async def read(size: int) -> bytes:
+            return await self._run_in_thread(stream.read, size)
+
+        return await self.client_manager.get_async_client().put_object_stream(
+            self.bucket_name, object_name, read,
+            part_size=settings.MINIO_UPLOAD_PART_SIZE,
             content_type=content_type
         )
 
+    async def _find_duplicate(self, content_sha256: str, content_type: str, file_size: int) -> Optional[Dict[str, Any]]:
+        """
+        在去重索引中查找相同内容的已上传对象。对象已不存在，或 ETag / 大小与记录不一致
+        （已被覆盖，如通过预签名 URL 或直接在 MinIO 中写入同名对象）时清理索引并返回 None
+        """
+        entry = await self._run_in_thread(self.dedup_index.get, content_sha256, content_type)
+        if entry is None:
+            return None
+        object_name, etag = entry
+        try:
+            info = await self.get_file_info(object_name)
+        except FileDownloadError as e:
+            if e.code != "FILE_NOT_FOUND":
+                return None
+            info = None
+        if info is None or info['etag'] != etag or info['size'] != file_size:
+            await self._discard_dedup([object_name])
+            return None
+        return info
+
+    async def _discard_dedup(self, object_names: List[str]) -> None:
+        """对象被删除或覆盖后，从去重索引中移除指向它们的记录"""
+        if self.dedup_index is not None:
+            await self._run_in_thread(self.dedup_index.discard, object_names)
+
     async def upload_file(self, file_obj, filename: str, object_name: str = None, original_url: str = None) -> Dict[str, Any]:
         """
         异步上传文件到 MinIO
+        
+        校验与上传在同一遍读取中完成（见 _UploadStream）：扩展名在上传前检查，
+        文件头类型检测、大小限制、MD5 / SHA-256 在读取分片时完成，校验失败时中止上传。
+        file_obj 只需要支持 read()，可以是不可 seek 的流。
+        
+        启用去重（MINIO_UPLOAD_DEDUP）且未指定 object_name 时，相同内容只存储一次，
+        命中时返回已有对象的信息，并带有 deduplicated=True。去重需要在上传前读一遍文件计算哈希，
+        只对可 seek 的文件生效；不可 seek 的流直接上传，上传后记录哈希供之后的上传命中。
         """
         try:
+            stream = self._open_upload_stream(file_obj, filename)
+            dedup = self.dedup_index is not None and object_name is None
+            if object_name is None:
+                object_name = self.generate_object_name(filename)
+            content_type = self._get_content_type(filename)
+            
             await self._ensure_bucket()
             
             start_time = datetime.now()
             
-            # 1. 验证任务 (CPU/IO Bound)
-            # 必须先执行验证，验证通过后才能进行上传
-            file_size, object_name, content_type = await self._run_in_thread(
-                self._validate_task,
-                file_obj,
-                filename,
-                object_name
-            )
+            seekable = getattr(file_obj, "seekable", None)
+            if dedup and seekable is not None and seekable():
+                await self._run_in_thread(self._hash_task, file_obj, stream)
+                existing = await self._find_duplicate(stream.sha256, content_type, stream.bytes_read)
+                if existing is not None:
+                    logger.info(f"Duplicate upload skipped: {filename} -> {existing['object_name']}")
+                    return {
+                        'object_name': existing['object_name'],
+                        'original_filename': filename,
+                        'file_size': stream.bytes_read,
+                        'preview_url': await self.generate_preview_url(existing['object_name']),
+                        'upload_time': datetime.now().isoformat(),
+                        'etag': existing['etag'],
+                        'original_url': original_url,
+                        'content_md5': stream.md5,
+                        'content_sha256': stream.sha256,
+                        'deduplicated': True
+                    }
+                # 未命中：类型已校验，重新读取上传
+                stream = _UploadStream(file_obj, settings.MAX_FILE_SIZE)
             
-            # 2. 上传任务 (Network IO Bound)
-            result = await self._run_in_thread(
-                self._execute_upload_task,
-                file_obj,
-                filename,
-                file_size,
-                object_name,
-                content_type
-            )
+            # 上传（边读边校验）
+            if self.use_async_client:
+                result = await self._execute_upload_async(file_obj, stream, object_name, content_type)
+            else:
+                result = await self._run_in_thread(
+                    self._execute_upload_task,
+                    file_obj,
+                    stream,
+                    object_name,
+                    content_type
+                )
             
+            file_size = stream.bytes_read
+            self._invalidate_info(object_name)
+            if dedup:
+                await self._run_in_thread(
+                    self.dedup_index.put, stream.sha256, content_type, object_name, file_size, result.etag
+                )
             duration = (datetime.now() - start_time).total_seconds()
             
             preview_url = await self.generate_preview_url(object_name)
             
             logger.info(f"File uploaded successfully: {filename} -> {object_name} ({duration:.2f}s)")
             
-            return {
+            result = {
                 'object_name': object_name,
                 'original_filename': filename,
                 'file_size': file_size,
                 'preview_url': preview_url,
                 'upload_time': datetime.now().isoformat(),
                 'etag': result.etag,
-                'original_url': original_url
+                'original_url': original_url,
+                'content_md5': stream.md5,
+                'content_sha256': stream.sha256
             }
+            if dedup:
+                result['deduplicated'] = False
+            return result
             
-        except FileValidationError:
+        except (FileValidationError, ServiceBusyError):
             raise
         except S3Error as e:
             logger.error(f"MinIO upload error: {e}")
@@ -222,27 +471,219 @@ class MinioService:
             logger.error(f"Preview URL generation failed: {e}")
             return ''
 
+    # -------- 预签名 URL（客户端直连 MinIO 上传/下载，数据不经过本服务） --------
+
+    def _presign_target(self) -> Tuple[SigV4Signer, str, bool]:
+        """
+        返回 (签名器, 客户端访问地址, 是否 HTTPS)
+        签名包含 Host，地址取 MINIO_PUBLIC_ENDPOINT（可带 http:// 或 https://），为空时使用 MINIO_ENDPOINT
+        """
+        endpoint = settings.MINIO_PUBLIC_ENDPOINT or settings.MINIO_ENDPOINT
+        secure = settings.MINIO_SECURE
+        for scheme in ("http://", "https://"):
+            if endpoint.startswith(scheme):
+                endpoint, secure = endpoint[len(scheme):].rstrip("/"), scheme == "https://"
+        signer = SigV4Signer(settings.MINIO_ACCESS_KEY, settings.MINIO_SECRET_KEY, settings.MINIO_REGION)
+        return signer, endpoint, secure
+
+    def _presign_expires(self, expires: Optional[int]) -> int:
+        expires = settings.MINIO_PRESIGN_EXPIRES if expires is None else expires
+        if not isinstance(expires, int) or not 1 <= expires <= self.PRESIGN_MAX_EXPIRES:
+            raise FileValidationError(
+                f"expires 必须是 1 到 {self.PRESIGN_MAX_EXPIRES} 之间的秒数", "INVALID_EXPIRES"
+            )
+        return expires
+
+    def _presign_upload_target(self, object_name: Optional[str], filename: Optional[str]) -> Tuple[str, str]:
+        """校验上传目标的文件类型（按扩展名，直传时无法检查文件内容），返回 (对象名称, Content-Type)"""
+        name = filename or object_name
+        if not name:
+            raise FileValidationError("filename 与 object_name 至少提供一个", "EMPTY_FILE")
+        self._check_file_type(name.rsplit('.', 1)[-1].lower() if '.' in name else '')
+        if not object_name:
+            object_name = self.generate_object_name(filename)
+        # 调用方指定的对象名称可能有“不存在”的缓存
+        self._invalidate_info(object_name)
+        return object_name, self._get_content_type(name)
+
+    @staticmethod
+    def _expires_at(expires: int) -> str:
+        return (datetime.now() + timedelta(seconds=expires)).isoformat()
+
+    async def presigned_upload_url(
+        self, object_name: Optional[str] = None, filename: Optional[str] = None, expires: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        生成预签名 PUT URL，客户端直接上传到 MinIO
+
+        只在签发时按扩展名检查文件类型；PUT URL 无法限制文件大小，需要限制时使用 presigned_post_policy。
+        """
+        expires = self._presign_expires(expires)
+        object_name, content_type = self._presign_upload_target(object_name, filename)
+        signer, endpoint, secure = self._presign_target()
+        url = presigned_url(signer, "PUT", endpoint, secure, self.bucket_name, object_name, expires)
+        return {
+            'object_name': object_name,
+            'method': 'PUT',
+            'url': url,
+            'headers': {'Content-Type': content_type},
+            'expires_in': expires,
+            'expires_at': self._expires_at(expires)
+        }
+
+    async def presigned_download_url(
+        self, object_name: str, expires: Optional[int] = None, filename: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """生成预签名 GET URL（不检查对象是否存在）；提供 filename 时以附件形式下载并使用该文件名"""
+        if not object_name:
+            raise FileValidationError("object_name 不能为空", "EMPTY_FILE")
+        expires = self._presign_expires(expires)
+        query = {}
+        if filename:
+            query['response-content-disposition'] = (
+                f"attachment; filename*=UTF-8''{urllib.parse.quote(filename, safe='')}"
+            )
+        signer, endpoint, secure = self._presign_target()
+        url = presigned_url(signer, "GET", endpoint, secure, self.bucket_name, object_name, expires, query)
+        return {
+            'object_name': object_name,
+            'method': 'GET',
+            'url': url,
+            'expires_in': expires,
+            'expires_at': self._expires_at(expires)
+        }
+
+    async def presigned_post_policy(
+        self,
+        object_name: Optional[str] = None,
+        filename: Optional[str] = None,
+        expires: Optional[int] = None,
+        max_size: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        生成预签名 POST 表单策略：客户端以 multipart/form-data 提交 fields 与文件（file 字段放在最后）。
+        策略限定对象名称、Content-Type 与文件大小（不超过 max_size，默认且最大为 MAX_FILE_SIZE），
+        由 MinIO 在上传时强制校验。
+        """
+        expires = self._presign_expires(expires)
+        max_size = settings.MAX_FILE_SIZE if max_size is None else max_size
+        if not isinstance(max_size, int) or not 1 <= max_size <= settings.MAX_FILE_SIZE:
+            raise FileValidationError(
+                f"max_size 必须是 1 到 {settings.MAX_FILE_SIZE} 之间的字节数", "INVALID_MAX_SIZE"
+            )
+        object_name, content_type = self._presign_upload_target(object_name, filename)
+        signer, endpoint, secure = self._presign_target()
+        conditions = [
+            {"bucket": self.bucket_name},
+            ["eq", "$key", object_name],
+            ["eq", "$Content-Type", content_type],
+            ["content-length-range", 0, max_size],
+        ]
+        fields = {'key': object_name, 'Content-Type': content_type}
+        fields.update(signer.sign_post_policy(conditions, expires))
+        return {
+            'object_name': object_name,
+            'method': 'POST',
+            'url': f"{'https' if secure else 'http'}://{endpoint}/{urllib.parse.quote(self.bucket_name, safe='')}",
+            'fields': fields,
+            'max_size': max_size,
+            'expires_in': expires,
+            'expires_at': self._expires_at(expires)
+        }
+
+    def _invalidate_info(self, object_name: str) -> None:
+        """对象被写入或删除后使元数据缓存失效"""
+        if self.info_cache is not None:
+            self.info_cache.invalidate(object_name)
+
+    def info_cache_stats(self) -> Dict[str, Any]:
+        """返回元数据缓存统计（供 /metrics 展示）"""
+        if self.info_cache is None:
+            return {"enabled": False}
+        return {
+            "enabled": True,
+            "notifications": self._listener is not None and self._listener.is_alive(),
+            **self.info_cache.stats()
+        }
+
+    def start_info_cache_listener(self) -> None:
+        """
+        启动 MinIO 桶事件监听线程：收到对象创建/删除事件时使对应的元数据缓存失效
+        （需要 MINIO_INFO_CACHE_NOTIFICATIONS 且启用缓存；监听是长连接，使用独立线程而非 MinIO 线程池）
+        """
+        if self.info_cache is None or (self._listener is not None and self._listener.is_alive()):
+            return
+        self._listener_stop.clear()
+        self._listener = threading.Thread(target=self._listen_notifications, name="minio-notify", daemon=True)
+        self._listener.start()
+
+    def stop_info_cache_listener(self) -> None:
+        """停止事件监听（线程在下一次收到数据或心跳时退出）"""
+        self._listener_stop.set()
+
+    def _listen_notifications(self) -> None:
+        client = self.client_manager.get_client()
+        while not self._listener_stop.is_set():
+            try:
+                with client.listen_bucket_notification(
+                    self.bucket_name, events=("s3:ObjectCreated:*", "s3:ObjectRemoved:*")
+                ) as events:
+                    logger.info(f"Listening for bucket notifications on '{self.bucket_name}'")
+                    for event in events:
+                        for record in event.get("Records", []):
+                            key = record.get("s3", {}).get("object", {}).get("key")
+                            if key:
+                                self.info_cache.invalidate(urllib.parse.unquote_plus(key))
+                        if self._listener_stop.is_set():
+                            return
+            except Exception as e:
+                if self._listener_stop.is_set():
+                    return
+                logger.warning(f"Bucket notification listener failed, retrying: {e}")
+            # 连接中断期间可能漏掉事件：清空缓存后重连
+            self.info_cache.clear()
+            self._listener_stop.wait(5)
+
     def _stat_task(self, object_name: str):
         """在线程中执行获取文件信息任务"""
         client = self.client_manager.get_client()
         return client.stat_object(self.bucket_name, object_name)
 
     async def get_file_info(self, object_name: str) -> Dict[str, Any]:
-        """异步获取文件信息"""
+        """异步获取文件信息（启用元数据缓存时优先读取缓存）"""
+        cache = self.info_cache
+        version = None
+        if cache is not None:
+            found, info = cache.get(object_name)
+            if found:
+                if info is None:
+                    raise FileDownloadError("文件不存在", "FILE_NOT_FOUND")
+                return info
+            version = cache.version
         try:
             await self._ensure_bucket()
             
-            stat = await self._run_in_thread(self._stat_task, object_name)
+            if self.use_async_client:
+                stat = await self.client_manager.get_async_client().stat_object(self.bucket_name, object_name)
+            else:
+                stat = await self._run_in_thread(self._stat_task, object_name)
             
-            return {
+            info = {
                 'object_name': object_name,
                 'size': stat.size,
-                'last_modified': stat.last_modified.isoformat(),
+                'last_modified': stat.last_modified.isoformat() if stat.last_modified else None,
                 'etag': stat.etag,
                 'content_type': stat.content_type
             }
+            if cache is not None:
+                cache.set(object_name, info, version)
+            return info
+        except ServiceBusyError:
+            raise
         except S3Error as e:
             if e.code == 'NoSuchKey':
+                if cache is not None:
+                    cache.set(object_name, None, version)
                 raise FileDownloadError("文件不存在", "FILE_NOT_FOUND")
             logger.error(f"Get file info failed: {e}")
             raise FileDownloadError(f"获取文件信息失败: {str(e)}", "FILE_INFO_ERROR")
@@ -250,35 +691,60 @@ class MinioService:
             logger.error(f"Get file info exception: {e}")
             raise FileDownloadError(f"获取文件信息失败: {str(e)}", "FILE_INFO_ERROR")
 
-    def _delete_task(self, object_name: str):
+    def _delete_task(self, object_name: str, check_exists: bool = True):
         """在线程中执行删除文件任务"""
         client = self.client_manager.get_client()
         
         # Check existence first
-        try:
-            client.stat_object(self.bucket_name, object_name)
-        except S3Error as e:
-            if e.code == 'NoSuchKey':
-                raise FileDownloadError("文件不存在", "FILE_NOT_FOUND")
-            raise
+        if check_exists:
+            try:
+                client.stat_object(self.bucket_name, object_name)
+            except S3Error as e:
+                if e.code == 'NoSuchKey':
+                    raise FileDownloadError("文件不存在", "FILE_NOT_FOUND")
+                raise
         
         client.remove_object(self.bucket_name, object_name)
 
-    async def delete_file(self, object_name: str) -> Dict[str, Any]:
-        """异步删除文件"""
+    async def _delete_async(self, object_name: str, check_exists: bool = True):
+        """使用异步客户端删除文件（check_exists 时先检查是否存在）"""
+        client = self.client_manager.get_async_client()
+        if check_exists:
+            try:
+                await client.stat_object(self.bucket_name, object_name)
+            except S3Error as e:
+                if e.code == 'NoSuchKey':
+                    raise FileDownloadError("文件不存在", "FILE_NOT_FOUND")
+                raise
+        await client.remove_object(self.bucket_name, object_name)
+
+    async def delete_file(self, object_name: str, check_exists: bool = True) -> Dict[str, Any]:
+        """
+        异步删除文件
+
+        check_exists=True（默认）时先 stat 对象，不存在则抛出 FILE_NOT_FOUND；
+        check_exists=False 时为幂等删除：只发送一次 remove_object（S3 删除本身是幂等的），
+        请求数与延迟减半，对象不存在时同样返回 deleted=True。
+        """
         try:
             await self._ensure_bucket()
             
-            await self._run_in_thread(self._delete_task, object_name)
+            if self.use_async_client:
+                await self._delete_async(object_name, check_exists)
+            else:
+                await self._run_in_thread(self._delete_task, object_name, check_exists)
             
+            self._invalidate_info(object_name)
+            await self._discard_dedup([object_name])
             logger.info(f"File deleted: {object_name}")
             
             return {
                 'object_name': object_name,
                 'deleted': True,
+                'existence_checked': check_exists,
                 'delete_time': datetime.now().isoformat()
             }
-        except FileDownloadError:
+        except (FileDownloadError, ServiceBusyError):
             raise
         except S3Error as e:
             logger.error(f"MinIO delete error: {e}")
@@ -287,6 +753,371 @@ class MinioService:
             logger.error(f"Delete exception: {e}")
             raise FileDownloadError(f"文件删除失败: {str(e)}", "DELETE_ERROR")
 
+    @staticmethod
+    def _batch_object_names(object_names: List[str]) -> List[str]:
+        """校验批量操作的对象名列表：去重（保持原顺序）并限制数量"""
+        if not isinstance(object_names, list) or not object_names:
+            raise FileValidationError("object_names 必须是非空列表", "INVALID_OBJECT_NAMES")
+        if not all(isinstance(name, str) and name for name in object_names):
+            raise FileValidationError("object_names 中的对象名必须是非空字符串", "INVALID_OBJECT_NAMES")
+        names = list(dict.fromkeys(object_names))
+        if len(names) > settings.MINIO_BATCH_MAX_OBJECTS:
+            raise FileValidationError(
+                f"单次最多处理 {settings.MINIO_BATCH_MAX_OBJECTS} 个对象，当前为 {len(names)}",
+                "TOO_MANY_OBJECTS"
+            )
+        return names
+
+    def _delete_many_task(self, object_names: List[str]) -> List[Tuple[str, str, Optional[str]]]:
+        """在线程中执行批量删除，返回 (对象名, 错误码, 错误信息) 列表"""
+        client = self.client_manager.get_client()
+        errors = []
+        # 每 MAX_DELETE_OBJECTS 个对象一次 DeleteObjects 请求；单次请求失败只影响本批对象
+        for i in range(0, len(object_names), MAX_DELETE_OBJECTS):
+            chunk = object_names[i:i + MAX_DELETE_OBJECTS]
+            try:
+                # remove_objects 是惰性的，必须遍历结果才会真正发出请求
+                for error in client.remove_objects(self.bucket_name, [DeleteObject(name) for name in chunk]):
+                    errors.append((error.name, error.code, error.message))
+            except S3Error as e:
+                errors.extend((name, e.code, e.message) for name in chunk)
+        return errors
+
+    async def delete_files(self, object_names: List[str]) -> Dict[str, Any]:
+        """
+        批量删除文件（S3 DeleteObjects，每次请求最多 1000 个对象）
+
+        与 delete_file 不同，批量删除不逐个检查对象是否存在：不存在的对象按 S3 语义视为删除成功。
+        返回按输入顺序（去重后）排列的逐个结果。
+        """
+        names = self._batch_object_names(object_names)
+        try:
+            await self._ensure_bucket()
+
+            if self.use_async_client:
+                errors = await self.client_manager.get_async_client().remove_objects(self.bucket_name, names)
+            else:
+                errors = await self._run_in_thread(self._delete_many_task, names)
+        except ServiceBusyError:
+            raise
+        except Exception as e:
+            logger.error(f"Batch delete exception: {e}")
+            raise FileDownloadError(f"批量删除失败: {str(e)}", "DELETE_ERROR")
+
+        for name in names:
+            self._invalidate_info(name)
+        await self._discard_dedup(names)
+        failed = {name: (code, message) for name, code, message in errors}
+        results = []
+        for name in names:
+            if name in failed:
+                code, message = failed[name]
+                results.append({'object_name': name, 'deleted': False, 'error': message or code, 'code': code})
+            else:
+                results.append({'object_name': name, 'deleted': True})
+        logger.info(f"Batch delete: {len(names) - len(failed)} deleted, {len(failed)} failed")
+
+        return {
+            'results': results,
+            'deleted': len(names) - len(failed),
+            'failed': len(failed),
+            'delete_time': datetime.now().isoformat()
+        }
+
+    async def get_files_info(self, object_names: List[str]) -> Dict[str, Any]:
+        """
+        批量获取文件信息
+
+        并发执行 stat（并发数由 MINIO_BATCH_CONCURRENCY 限制，避免占满线程池 / 连接池），
+        单个对象失败（如不存在）记录在该对象的结果中，不影响其他对象；线程池繁忙时整体失败。
+        """
+        names = self._batch_object_names(object_names)
+        await self._ensure_bucket()
+        semaphore = asyncio.Semaphore(max(1, settings.MINIO_BATCH_CONCURRENCY))
+
+        async def stat_one(name: str) -> Dict[str, Any]:
+            async with semaphore:
+                try:
+                    return await self.get_file_info(name)
+                except FileDownloadError as e:
+                    return {'object_name': name, 'error': e.message, 'code': e.code}
+
+        results = await asyncio.gather(*(stat_one(name) for name in names))
+        failed = sum(1 for result in results if 'error' in result)
+
+        return {
+            'results': list(results),
+            'found': len(results) - failed,
+            'failed': failed
+        }
+
+    def _read_text_task(self, object_name: str) -> str:
+        """
+        在线程中按块读取对象并增量解码为 UTF-8 文本（兼容 BOM）。
+        内存中只保留当前字节块与已解码的文本，不会同时持有整个对象的字节与文本。
+        """
+        client = self.client_manager.get_client()
+        response = client.get_object(self.bucket_name, object_name)
+        try:
+            decoder = _TextDecoder()
+            for chunk in response.stream(self.READ_CHUNK_SIZE):
+                decoder.feed(chunk)
+            return decoder.finish()
+        finally:
+            response.close()
+            response.release_conn()
+
+    async def _read_text_async(self, object_name: str) -> str:
+        """使用异步客户端按块读取对象并增量解码"""
+        decoder = _TextDecoder()
+        chunks = self.client_manager.get_async_client().get_object(self.bucket_name, object_name, self.READ_CHUNK_SIZE)
+        # 解码出错提前退出时也立即释放连接
+        async with aclosing(chunks):
+            async for chunk in chunks:
+                decoder.feed(chunk)
+        return decoder.finish()
+
+    async def read_text(self, object_name: str) -> str:
+        """异步读取文本对象的内容"""
+        try:
+            await self._ensure_bucket()
+            if self.use_async_client:
+                return await self._read_text_async(object_name)
+            return await self._run_in_thread(self._read_text_task, object_name)
+        except (FileValidationError, ServiceBusyError):
+            raise
+        except S3Error as e:
+            if e.code == 'NoSuchKey':
+                raise FileDownloadError("文件不存在", "FILE_NOT_FOUND")
+            logger.error(f"Read text failed: {e}")
+            raise FileDownloadError(f"读取文件失败: {str(e)}", "FILE_READ_ERROR")
+        except Exception as e:
+            logger.error(f"Read text exception: {e}")
+            raise FileDownloadError(f"读取文件失败: {str(e)}", "FILE_READ_ERROR")
+
+    # -------- 流式 / 按范围读取 --------
+
+    @staticmethod
+    def _resolve_range(size: int, start: Optional[int], end: Optional[int]) -> Tuple[int, int]:
+        """
+        将字节范围（闭区间，语义同 HTTP Range）解析为 (offset, length)：
+        start 为 None 时表示最后 end 个字节，end 为 None 时表示读到末尾。范围无法满足时抛出 FileValidationError
+        """
+        if start is None:
+            length = min(end or 0, size)
+            offset = size - length
+        else:
+            offset = start
+            length = (size if end is None else min(end + 1, size)) - start
+        if length <= 0 or offset >= size:
+            raise FileValidationError(f"请求的范围无法满足（文件大小 {size} 字节）", "RANGE_NOT_SATISFIABLE")
+        return offset, length
+
+    def _get_object_task(self, object_name: str, offset: int, length: int, etag: Optional[str]):
+        """在线程中发起 GET 请求（只读取响应头，响应体由调用方按块读取）"""
+        client = self.client_manager.get_client()
+        return client.get_object(
+            self.bucket_name, object_name, offset=offset, length=length,
+            request_headers={'If-Match': f'"{etag}"'} if etag else None
+        )
+
+    def _stream_object_task(
+        self, object_name: str, offset: int, length: int, etag: Optional[str],
+        loop: asyncio.AbstractEventLoop, queue: asyncio.Queue, stop: threading.Event
+    ) -> None:
+        """
+        在线程中发起 GET 请求并逐块放入 queue，结束时放入 None，出错时放入异常
+        queue 有界：消费者读取慢时在放入处等待，不在内存中缓冲整个对象；stop 被设置后不再放入并退出
+        """
+        def put(item) -> None:
+            if not stop.is_set():
+                asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+        try:
+            response = self._get_object_task(object_name, offset, length, etag)
+        except Exception as e:
+            put(e)
+            return
+        try:
+            for chunk in response.stream(self.READ_CHUNK_SIZE):
+                if stop.is_set():
+                    return
+                put(chunk)
+            put(None)
+        except Exception as e:
+            put(e)
+        finally:
+            response.close()
+            response.release_conn()
+
+    async def _iter_object(
+        self, object_name: str, offset: int = 0, length: int = 0, etag: Optional[str] = None
+    ) -> AsyncIterator[bytes]:
+        """
+        按块流式读取对象（length 为 0 时读到末尾），不在内存中缓冲整个对象。
+        传入 etag 时带 If-Match 请求，对象已变更时抛出 FILE_CHANGED 并使元数据缓存失效。
+        """
+        try:
+            if self.use_async_client:
+                chunks = self.client_manager.get_async_client().get_object(
+                    self.bucket_name, object_name, self.READ_CHUNK_SIZE, offset=offset, length=length or None,
+                    headers={'if-match': f'"{etag}"'} if etag else None
+                )
+                async with aclosing(chunks):
+                    async for chunk in chunks:
+                        yield chunk
+            else:
+                queue: asyncio.Queue = asyncio.Queue(maxsize=2)
+                stop = threading.Event()
+                # 整个读取过程只占用一个线程池名额：准入失败在此立即抛出 ServiceBusyError（尚未发送响应），
+                # 之后的数据块不再经过准入，线程池繁忙也不会使已开始的下载中途失败
+                worker = self.client_manager.get_executor().submit(
+                    self._stream_object_task, object_name, offset, length, etag,
+                    asyncio.get_running_loop(), queue, stop
+                )
+                try:
+                    while (item := await queue.get()) is not None:
+                        if isinstance(item, BaseException):
+                            raise item
+                        yield item
+                    # 读取完毕：等待读取线程关闭连接
+                    await worker
+                finally:
+                    # 提前结束（如客户端断开）时通知读取线程退出，并清空队列使其不会阻塞在放入上
+                    stop.set()
+                    while not queue.empty():
+                        queue.get_nowait()
+        except S3Error as e:
+            if e.code in ('NoSuchKey', 'PreconditionFailed'):
+                self._invalidate_info(object_name)
+            if e.code == 'NoSuchKey':
+                raise FileDownloadError("文件不存在", "FILE_NOT_FOUND")
+            if e.code == 'PreconditionFailed':
+                raise FileDownloadError("文件在读取过程中已变更", "FILE_CHANGED")
+            if e.code == 'InvalidRange':
+                raise FileValidationError("请求的范围无法满足", "RANGE_NOT_SATISFIABLE")
+            logger.error(f"Get object failed: {e}")
+            raise FileDownloadError(f"读取文件失败: {str(e)}", "FILE_READ_ERROR")
+
+    async def open_object(
+        self,
+        object_name: str,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+        if_none_match: Optional[List[str]] = None,
+    ) -> Tuple[Dict[str, Any], Optional[AsyncIterator[bytes]]]:
+        """
+        打开对象用于流式下载，返回 (文件信息, 数据块异步迭代器)
+
+        - start / end 为字节范围（闭区间，语义同 HTTP Range，见 _resolve_range），都为 None 时读取整个对象；
+          文件信息中的 range 为实际读取的 (起始, 结束) 字节位置，未指定范围时为 None
+        - if_none_match 中包含当前 ETag（或 "*"）时不读取数据，迭代器为 None（对应 304）
+        - 文件信息来自 get_file_info（可命中元数据缓存），读取时带 If-Match 保证数据与文件信息一致；
+          缓存的信息已过期（对象已变更）时刷新后重试一次
+        - 返回前已读取第一块数据，文件不存在等错误在此抛出，而不是在开始发送响应之后
+        """
+        await self._ensure_bucket()
+        for attempt in range(2):
+            info = await self.get_file_info(object_name)
+            if if_none_match and ('*' in if_none_match or info['etag'] in if_none_match):
+                return info, None
+            offset, length = 0, 0
+            info['range'] = None
+            if start is not None or end is not None:
+                offset, length = self._resolve_range(info['size'], start, end)
+                info['range'] = (offset, offset + length - 1)
+
+            chunks = self._iter_object(object_name, offset, length, info['etag'])
+            try:
+                first = await chunks.__anext__()
+            except StopAsyncIteration:
+                first = b""
+            except FileDownloadError as e:
+                if e.code == "FILE_CHANGED" and attempt == 0:
+                    continue
+                raise
+            return info, self._prepend(first, chunks)
+        raise FileDownloadError("文件在读取过程中已变更", "FILE_CHANGED")
+
+    @staticmethod
+    async def _prepend(first: bytes, chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        async with aclosing(chunks):
+            if first:
+                yield first
+            async for chunk in chunks:
+                yield chunk
+
+    async def read_range(self, object_name: str, offset: int = 0, length: int = 64 * 1024, as_text: bool = True) -> Dict[str, Any]:
+        """
+        读取对象的一段字节（如大文件开头的 N KB，用于预览），只向 MinIO 请求该范围
+        as_text 时按 UTF-8 解码（范围边界处被截断的字符以替换字符表示），否则返回 Base64
+        """
+        if not isinstance(offset, int) or offset < 0:
+            raise FileValidationError("offset 必须是非负整数", "INVALID_RANGE")
+        if not isinstance(length, int) or not 1 <= length <= self.READ_RANGE_MAX:
+            raise FileValidationError(f"length 必须是 1 到 {self.READ_RANGE_MAX} 之间的字节数", "INVALID_RANGE")
+        info, chunks = await self.open_object(object_name, offset, offset + length - 1)
+        parts = []
+        async with aclosing(chunks):
+            async for chunk in chunks:
+                parts.append(chunk)
+        data = b"".join(parts)
+        range_start, range_end = info['range']
+        return {
+            'object_name': object_name,
+            'size': info['size'],
+            'etag': info['etag'],
+            'content_type': info['content_type'],
+            'offset': range_start,
+            'length': len(data),
+            'truncated': range_end + 1 < info['size'],
+            'encoding': 'text' if as_text else 'base64',
+            'content': data.decode('utf-8', errors='replace') if as_text else base64.b64encode(data).decode('ascii')
+        }
+
+    def _put_text_task(self, object_name: str, text: str, content_type: str):
+        """在线程中编码文本并上传"""
+        data = text.encode("utf-8")
+        client = self.client_manager.get_client()
+        result = client.put_object(
+            bucket_name=self.bucket_name,
+            object_name=object_name,
+            data=BytesIO(data),
+            length=len(data),
+            content_type=content_type
+        )
+        return len(data), result
+
+    async def put_text(self, object_name: str, text: str, content_type: str = "text/plain; charset=utf-8") -> Dict[str, Any]:
+        """异步将文本以 UTF-8 编码写入指定对象（已存在时覆盖）"""
+        try:
+            await self._ensure_bucket()
+            if self.use_async_client:
+                data = text.encode("utf-8")
+                size = len(data)
+                result = await self.client_manager.get_async_client().put_object(
+                    self.bucket_name, object_name, data, content_type
+                )
+            else:
+                size, result = await self._run_in_thread(self._put_text_task, object_name, text, content_type)
+            self._invalidate_info(object_name)
+            await self._discard_dedup([object_name])
+            logger.info(f"Text object written: {object_name} ({size} bytes)")
+            return {
+                'object_name': object_name,
+                'size': size,
+                'etag': result.etag,
+                'upload_time': datetime.now().isoformat()
+            }
+        except ServiceBusyError:
+            raise
+        except S3Error as e:
+            logger.error(f"MinIO put text error: {e}")
+            raise FileUploadError(f"文件上传失败: {str(e)}", "MINIO_UPLOAD_ERROR")
+        except Exception as e:
+            logger.exception(f"Unexpected put text error: {e}")
+            raise FileUploadError(f"文件上传失败: {str(e)}", "UPLOAD_ERROR")
+
     def _get_content_type(self, filename: str) -> str:
         content_types = {
             'jpg': 'image/jpeg', 'jpeg': 'image/jpeg', 'png': 'image/png',
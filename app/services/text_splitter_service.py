@@ -1,18 +1,252 @@
 import re
-import html
+import json
 import asyncio
-from typing import List, Tuple, Dict, Any, Optional
+import hashlib
+import inspect
+import multiprocessing
+import threading
+import itertools
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Tuple, Dict, Any, Optional, Union, Iterator, AsyncIterator, NamedTuple
+
+from app.core.config import get_settings
+from app.core.logger import logger
+from app.core.result_cache import ResultCache
+from app.core.html_table import convert_html_tables
+from app.services.minio_service import get_minio_service
+
+settings = get_settings()
+
+# 源缓冲区上的半开区间 [start, end)
+Span = Tuple[int, int]
+# str.splitlines 识别的行边界字符
+_LINE_BOUNDARIES = "\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029"
+# 图片解析内容块的起始标记，块到其后第一个 '】' 结束
+_IMAGE_BLOCK_PREFIXES = ("【图片主题", "【图片解析内容")
+
+# 片段类型：普通文本与各类原子块
+SEG_TEXT = "TEXT"
+ATOMIC_IMG = "IMG"
+ATOMIC_TAB = "TAB"
+ATOMIC_PREVIEW = "PREVIEW"
+
+# -------- 预编译正则 --------
+# 模块加载时编译一次，热路径上不再经过 re 模块的缓存查找或重新编译
+
+# 非空白字符（原子块识别中跳过空白行）
+_NON_SPACE_RE = re.compile(r"\S")
+# 行边界（与 str.splitlines 一致）
+_LINE_BREAK_RE = re.compile(r"\r\n|[\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]")
+# Markdown 表格分隔行的单元格（:?-+:?，至少一个 '-'）
+_TABLE_SEPARATOR_CELL_RE = re.compile(r":?-+:?")
+
+
+def _is_table_separator(stripped: str) -> bool:
+    """是否为表格分隔行（如 |---|:--:|）；各单元格都为空的数据行（如 |  |  |）不算"""
+    cells = stripped.strip("|").split("|")
+    return all(_TABLE_SEPARATOR_CELL_RE.fullmatch(cell.strip()) for cell in cells)
+
+
+@lru_cache(maxsize=64)
+def _broken_header_pattern(parent_separator: str) -> "re.Pattern[str]":
+    """父块分隔符对应的标题修复正则（按分隔符取值缓存，请求间复用）"""
+    return re.compile(rf"#\s*{re.escape(parent_separator)}\s*([^\n]+)")
+
+
+class SubBlock(NamedTuple):
+    """
+    子块：缓冲区上的区间 [start, end)。
+    text 为 None 时子块内容就是该区间的原文切片；
+    否则 text 为由该区间生成的替代文本（如超限图片/表格拆分出的片段、图片模式追加的链接）。
+    """
+    start: int
+    end: int
+    text: Optional[str] = None
+
+
+class MarkdownTable(NamedTuple):
+    """表格模式提取出的 Markdown 表格：表头（含分隔行）与数据行，以及它们在原文中的位置"""
+    header: str
+    header_span: Span
+    rows: List[str]
+    row_starts: List[int]
+
+
+class Segment(NamedTuple):
+    """
+    类型化片段：源文本上的区间 [start, end) 及其类型。
+    SEG_TEXT 为普通文本；其余为原子块（图片解析内容、连续的 Markdown 表格行、图片模式的链接后缀），
+    原子块不在内部切分。
+    """
+    kind: str
+    start: int
+    end: int
+
+    @property
+    def length(self) -> int:
+        return self.end - self.start
+
+
+class SegmentedText:
+    """
+    PDF / 图片模式分块流水线的中间表示：源文本 + 按位置排列的原子块。
+
+    粗切、父块细化与子块拆分都直接在源文本上传递区间：
+    - 切分位置只在普通文本片段中查找（find），不会落入原子块内部
+    - 区间从不切开原子块，因此区间长度 end - start 即真实长度
+    无需把原子块替换为占位符再在各阶段重新查找、还原，用户内容中的任何字样也不会被误认为原子块。
+    """
+
+    def __init__(self, text: str, atomic: List[Segment]):
+        """
+        :param text: 源文本
+        :param atomic: 原子块片段（按位置升序、互不重叠）
+        """
+        self.text = text
+        self.atomic = atomic
+        self._starts: List[int] = [seg.start for seg in atomic]
+        self._ends: List[int] = [seg.end for seg in atomic]
+
+    def find(self, sub: str, start: int, end: int) -> int:
+        """在 [start, end) 的普通文本中查找 sub（跳过与原子块重叠的匹配），找不到返回 -1"""
+        text = self.text
+        while True:
+            found = text.find(sub, start, end)
+            if found < 0 or not self._starts:
+                return found
+            # 第一个结束位置在 found 之后的原子块
+            i = bisect_right(self._ends, found)
+            if i == len(self._starts) or self._starts[i] >= found + len(sub):
+                return found
+            start = self._ends[i]
+
+    def last_atomic_end(self, start: int, end: int) -> int:
+        """(start, end] 内最后一个原子块的结束位置，没有则返回 -1"""
+        i = bisect_right(self._ends, end) - 1
+        if i >= 0 and self._ends[i] > start:
+            return self._ends[i]
+        return -1
+
+    def iter_parts(self, start: int, end: int, reverse: bool = False) -> Iterator[Segment]:
+        """
+        按文档顺序（reverse 时逆序）产出 [start, end) 内的片段：完整的原子块，以及它们之间的普通文本片段。
+        不产出空片段；区间不应切开原子块。
+        """
+        first = bisect_left(self._starts, start)
+        last = max(first, bisect_right(self._ends, end))
+        if not reverse:
+            cursor = start
+            for seg in self.atomic[first:last]:
+                if cursor < seg.start:
+                    yield Segment(SEG_TEXT, cursor, seg.start)
+                yield seg
+                cursor = seg.end
+            if cursor < end:
+                yield Segment(SEG_TEXT, cursor, end)
+        else:
+            cursor = end
+            for seg in reversed(self.atomic[first:last]):
+                if seg.end < cursor:
+                    yield Segment(SEG_TEXT, seg.end, cursor)
+                yield seg
+                cursor = seg.start
+            if start < cursor:
+                yield Segment(SEG_TEXT, start, cursor)
+
+
+def _run_split_job(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    在工作线程/进程中执行一次分块任务。
+    模块级函数，便于进程池序列化；工作进程中使用独立的 inline 实例。
+    """
+    service = TextSplitterService(executor_mode="inline")
+    return asyncio.run(service._split_inline(**kwargs))
+
+
+def _run_split_batch_job(jobs: List[Dict[str, Any]]) -> List[Union[Dict[str, Any], Exception]]:
+    """
+    在工作线程/进程中依次执行一组分块任务，一次调度处理多篇小文档。
+    参数错误按文档返回异常对象，不影响同组其他文档。
+    """
+    service = TextSplitterService(executor_mode="inline")
+    return asyncio.run(service._split_batch_inline(jobs))
+
 
 class TextSplitterService:
     """
     文本分块服务
     统一文本分块处理架构（可复用，保持与三类现有实现一致）
+
+    分块是纯 CPU 计算，大文本会长时间占用事件循环。根据 executor_mode 决定执行位置：
+    - inline: 直接在事件循环中执行
+    - thread: 派发到线程池
+    - process: 派发到进程池（真正并行，不受 GIL 限制）
+    内容长度低于 inline_threshold 时始终 inline 执行，避免小任务的调度/IPC 开销。
+
+    传入 cache 时，split 的结果按 (输入内容, 全部参数) 的哈希缓存，重复提交的相同文档直接返回缓存结果。
     """
     
     # 内部预设大小限制
     INTERNAL_PARENT_SIZE = 1280
     INTERNAL_SUB_SIZE = 320
 
+    EXECUTOR_MODES = ("inline", "thread", "process")
+    OUTPUT_MODES = ("text", "structured")
+    # 流式输出时工作线程与事件循环之间缓冲的父块数量（背压）
+    STREAM_QUEUE_SIZE = 16
+    # split 接受的参数，批量分块时每篇文档可单独覆盖
+    SPLIT_PARAMS = (
+        "mode", "content", "parent_block_size", "sub_block_size", "parent_separator",
+        "sub_separator", "preview_url", "overlap", "output",
+    )
+    # 结果缓存版本：分块输出发生变化时递增，使已有缓存（含磁盘缓存）失效
+    CACHE_VERSION = 3
+
+    def __init__(
+        self,
+        executor_mode: Optional[str] = None,
+        max_workers: Optional[int] = None,
+        inline_threshold: Optional[int] = None,
+        cache: Optional[ResultCache] = None,
+    ):
+        mode = (executor_mode or settings.TEXT_SPLITTER_EXECUTOR).strip().lower()
+        if mode not in self.EXECUTOR_MODES:
+            raise ValueError(f"TEXT_SPLITTER_EXECUTOR 必须是 {' | '.join(self.EXECUTOR_MODES)}，当前为: {mode}")
+        self.executor_mode = mode
+        self.max_workers = max(1, max_workers or settings.TEXT_SPLITTER_MAX_WORKERS)
+        self.inline_threshold = settings.TEXT_SPLITTER_INLINE_THRESHOLD if inline_threshold is None else inline_threshold
+        self._executor: Optional[Executor] = None
+        self.cache = cache
+
+    def _get_executor(self, content_len: int) -> Optional[Executor]:
+        """返回应当使用的执行器；返回 None 表示在事件循环内直接执行"""
+        if self.executor_mode == "inline" or content_len < self.inline_threshold:
+            return None
+        if self._executor is None:
+            if self.executor_mode == "process":
+                logger.info(f"Starting text splitter process pool with {self.max_workers} workers")
+                # spawn: 避免在已启动线程的服务进程中 fork
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            else:
+                logger.info(f"Starting text splitter thread pool with {self.max_workers} workers")
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="text-splitter",
+                )
+        return self._executor
+
+    def shutdown(self, wait: bool = True):
+        """关闭线程池/进程池（应用退出时调用）"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
     async def split(
         self,
         mode: str,
@@ -23,16 +257,261 @@ class TextSplitterService:
         sub_separator: str = "\n\n\n",
         preview_url: str = "",
         overlap: int = 0,
+        output: str = "text",
     ) -> Dict[str, Any]:
         """
         统一入口：根据 mode 调度对应的分块函数。
+        大文本按 executor_mode 派发到线程池/进程池执行，事件循环保持响应。
+        启用结果缓存时，相同内容与参数的重复请求直接返回缓存结果。
+
+        output:
+        - text: result 为用 parent_separator / sub_separator 连接后的字符串
+        - structured: result 为父块列表，子块以原文偏移量表示，详见 _split_structured
         """
-        if not isinstance(mode, str):
-            raise TypeError("mode 必须是字符串类型")
+        kwargs = dict(
+            mode=mode,
+            content=content,
+            parent_block_size=parent_block_size,
+            sub_block_size=sub_block_size,
+            parent_separator=parent_separator,
+            sub_separator=sub_separator,
+            preview_url=preview_url,
+            overlap=overlap,
+            output=output,
+        )
+        cache_key, cached = await self._cache_lookup(kwargs)
+        if cached is not None:
+            return cached
+
+        result = await self._split_dispatch(kwargs)
+        if cache_key is not None:
+            await self.cache.set(cache_key, result)
+        return result
+
+    async def split_object(
+        self,
+        object_name: str,
+        mode: str,
+        result_object_name: str = "",
+        parent_block_size: int = 1024,
+        sub_block_size: int = 512,
+        parent_separator: str = "\n\n\n\n",
+        sub_separator: str = "\n\n\n",
+        preview_url: str = "",
+        overlap: int = 0,
+        output: str = "text",
+    ) -> Dict[str, Any]:
+        """
+        从 MinIO 读取 object_name 的文本（UTF-8）进行分块，大文档不必经过 MCP 传输。
+
+        未指定 result_object_name 时返回与 split 相同的结果；
+        指定时把分块结果写入该对象（text 输出为纯文本，structured 输出为 JSON），只返回对象名与统计信息:
+        {"object_name", "source_object_name", "size", "etag", "content_length", "parent_blocks"}
+        """
+        minio_service = get_minio_service()
+        content = await minio_service.read_text(object_name)
+        result = await self.split(
+            mode=mode,
+            content=content,
+            parent_block_size=parent_block_size,
+            sub_block_size=sub_block_size,
+            parent_separator=parent_separator,
+            sub_separator=sub_separator,
+            preview_url=preview_url,
+            overlap=overlap,
+            output=output,
+        )
+        if not result_object_name:
+            return result
+
+        blocks = result["result"]
+        if isinstance(blocks, str):
+            text, content_type = blocks, "text/plain; charset=utf-8"
+            parent_blocks = blocks.count(parent_separator) + 1 if blocks and parent_separator else int(bool(blocks))
+        else:
+            # 结构化结果可能很大，序列化放到默认线程池
+            loop = asyncio.get_running_loop()
+            text = await loop.run_in_executor(None, lambda: json.dumps(result, ensure_ascii=False))
+            content_type, parent_blocks = "application/json", len(blocks)
+        saved = await minio_service.put_text(result_object_name, text, content_type=content_type)
+        return {
+            "object_name": result_object_name,
+            "source_object_name": object_name,
+            "size": saved["size"],
+            "etag": saved["etag"],
+            "content_length": len(content),
+            "parent_blocks": parent_blocks,
+        }
+
+    async def split_batch(self, documents: List[Dict[str, Any]], **defaults: Any) -> List[Dict[str, Any]]:
+        """
+        批量分块：一次调用处理多篇文档，按输入顺序返回结果。
+
+        documents 中每项为包含 content 的字典，可带 split 的其他参数覆盖 defaults 中的共享参数。
+        每篇文档的结果为 {"result": ...}（与 split 一致），参数错误时为 {"error": "错误信息"}，
+        不影响其他文档。
+
+        小文档按总字符数打包（每包至少 inline_threshold 个字符），整包派发到线程池/进程池，
+        避免逐篇调度/IPC 的开销；各包之间并行执行。启用结果缓存时逐篇查找与写入缓存。
+        """
+        if not isinstance(documents, list):
+            raise TypeError("documents 必须是列表")
+        if len(documents) > settings.TEXT_SPLITTER_BATCH_MAX_DOCUMENTS:
+            raise ValueError(f"单次批量分块最多 {settings.TEXT_SPLITTER_BATCH_MAX_DOCUMENTS} 篇文档，当前为 {len(documents)}")
+        unknown = set(defaults) - set(self.SPLIT_PARAMS)
+        if unknown:
+            raise TypeError(f"未知的分块参数: {', '.join(sorted(unknown))}")
+
+        signature = inspect.signature(self.split).parameters
+        jobs: List[Dict[str, Any]] = []
+        for i, document in enumerate(documents):
+            if not isinstance(document, dict) or "content" not in document:
+                raise ValueError(f"documents[{i}] 必须是包含 content 的对象")
+            unknown = set(document) - set(self.SPLIT_PARAMS)
+            if unknown:
+                raise ValueError(f"documents[{i}] 包含未知参数: {', '.join(sorted(unknown))}")
+            job = {
+                name: signature[name].default for name in self.SPLIT_PARAMS
+                if signature[name].default is not inspect.Parameter.empty
+            }
+            job.update(defaults)
+            job.update(document)
+            if "mode" not in job:
+                raise ValueError(f"documents[{i}] 缺少 mode 参数")
+            jobs.append(job)
+
+        results: List[Optional[Dict[str, Any]]] = [None] * len(jobs)
+        cache_keys: List[Optional[str]] = [None] * len(jobs)
+        pending: List[int] = []
+        for i, job in enumerate(jobs):
+            cache_keys[i], results[i] = await self._cache_lookup(job)
+            if results[i] is None:
+                pending.append(i)
+
+        async def run_pack(indexes: List[int]) -> None:
+            outcomes = await self._split_batch_dispatch([jobs[i] for i in indexes])
+            for i, outcome in zip(indexes, outcomes):
+                if isinstance(outcome, Exception):
+                    results[i] = {"error": str(outcome)}
+                    continue
+                results[i] = outcome
+                if cache_keys[i] is not None:
+                    await self.cache.set(cache_keys[i], outcome)
+
+        await asyncio.gather(*(run_pack(pack) for pack in self._pack_batch(jobs, pending)))
+        return results
+
+    def _pack_batch(self, jobs: List[Dict[str, Any]], indexes: List[int]) -> List[List[int]]:
+        """按内容长度把文档打包，每包累计至少 inline_threshold 个字符（大文档单独成包）"""
+        packs: List[List[int]] = []
+        pack: List[int] = []
+        pack_len = 0
+        for i in indexes:
+            content = jobs[i]["content"]
+            pack.append(i)
+            pack_len += len(content) if isinstance(content, str) else 0
+            if pack_len >= self.inline_threshold:
+                packs.append(pack)
+                pack, pack_len = [], 0
+        if pack:
+            packs.append(pack)
+        return packs
+
+    async def _split_batch_dispatch(self, jobs: List[Dict[str, Any]]) -> List[Union[Dict[str, Any], Exception]]:
+        """按整包内容长度选择在事件循环内或线程池/进程池中执行一包分块任务"""
+        total = sum(len(job["content"]) for job in jobs if isinstance(job["content"], str))
+        executor = self._get_executor(total)
+        if executor is None:
+            return await self._split_batch_inline(jobs)
+
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(executor, _run_split_batch_job, jobs)
+        except BrokenProcessPool:
+            logger.error("Text splitter process pool is broken, it will be recreated on next call")
+            self._executor = None
+            raise
+
+    async def _split_batch_inline(self, jobs: List[Dict[str, Any]]) -> List[Union[Dict[str, Any], Exception]]:
+        """在当前事件循环中依次执行一组分块任务，参数错误按文档返回异常对象"""
+        outcomes: List[Union[Dict[str, Any], Exception]] = []
+        for job in jobs:
+            try:
+                outcomes.append(await self._split_inline(**job))
+            except (ValueError, TypeError) as e:
+                outcomes.append(e)
+        return outcomes
+
+    async def _cache_lookup(self, kwargs: Dict[str, Any]) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """计算缓存键并查找缓存，返回 (缓存键, 缓存结果)；未启用缓存时均为 None"""
+        content = kwargs["content"]
+        if self.cache is None or not isinstance(content, str):
+            return None, None
+        if len(content) < self.inline_threshold:
+            cache_key = self._cache_key(kwargs)
+        else:
+            # 大文本的编码与哈希放到默认线程池，避免阻塞事件循环
+            cache_key = await asyncio.get_running_loop().run_in_executor(None, self._cache_key, kwargs)
+        return cache_key, await self.cache.get(cache_key)
+
+    def _cache_key(self, kwargs: Dict[str, Any]) -> str:
+        """结果缓存键：缓存版本、全部参数与内容的 SHA-256"""
+        params = {k: v for k, v in kwargs.items() if k != "content"}
+        header = json.dumps([self.CACHE_VERSION, params], sort_keys=True, ensure_ascii=False, default=str)
+        digest = hashlib.sha256(header.encode("utf-8", "surrogatepass"))
+        digest.update(b"\0")
+        digest.update(kwargs["content"].encode("utf-8", "surrogatepass"))
+        return digest.hexdigest()
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """结果缓存统计（未启用缓存时仅返回 enabled=False）"""
+        if self.cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.cache.stats()}
+
+    async def _split_dispatch(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """按内容长度与 executor_mode 选择在事件循环内或线程池/进程池中执行分块"""
+        content = kwargs["content"]
+        executor = self._get_executor(len(content) if isinstance(content, str) else 0)
+        if executor is None:
+            return await self._split_inline(**kwargs)
+
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(executor, _run_split_job, kwargs)
+        except BrokenProcessPool:
+            # 工作进程异常退出，丢弃进程池，下次调用时重建
+            logger.error("Text splitter process pool is broken, it will be recreated on next call")
+            self._executor = None
+            raise
+
+    async def _split_inline(
+        self,
+        mode: str,
+        content: str,
+        parent_block_size: int = 1024,
+        sub_block_size: int = 512,
+        parent_separator: str = "\n\n\n\n",
+        sub_separator: str = "\n\n\n",
+        preview_url: str = "",
+        overlap: int = 0,
+        output: str = "text",
+    ) -> Dict[str, Any]:
+        """在当前事件循环中执行分块"""
+        m = self._normalize_mode(mode)
+        if output not in self.OUTPUT_MODES:
+            raise ValueError(f"output 参数必须是 {' | '.join(repr(o) for o in self.OUTPUT_MODES)}")
+        if m == "image" and not preview_url:
+            raise ValueError("preview_url is required for image mode")
+
+        if output == "structured":
+            return await self._split_structured(
+                m, content, parent_block_size, sub_block_size,
+                sub_separator=sub_separator, preview_url=preview_url, overlap=overlap
+            )
 
-        m = mode.strip().lower()
         splited_content = ""
-        if m in ("pdf", "pdf_text"):
+        if m == "pdf":
             splited_content = await self._split_pdf_text(
                 content, 
                 parent_block_size, 
@@ -41,7 +520,7 @@ class TextSplitterService:
                 sub_separator=sub_separator,
                 overlap=overlap
             )
-        elif m in ("table", "md_table", "markdown"):
+        elif m == "table":
             # 专用表格分块逻辑
             splited_content = await self._split_table_text(
                 content, 
@@ -50,9 +529,7 @@ class TextSplitterService:
                 parent_separator=parent_separator,
                 sub_separator=sub_separator
             )
-        elif m in ("image", "img", "text_with_preview", "preview"):
-            if not preview_url:
-                raise ValueError("preview_url is required for image mode")
+        else:
             splited_content = await self._split_image_text(
                 content,
                 parent_block_size,
@@ -61,20 +538,284 @@ class TextSplitterService:
                 sub_separator=sub_separator,
                 preview_url=preview_url
             )
-        else:
-            raise ValueError("mode 参数必须是 'pdf' | 'table' | 'image'")
 
         if isinstance(splited_content, str) and parent_separator:
-            escaped_sep = re.escape(parent_separator)
-            fix_pattern = rf"#\s*{escaped_sep}\s*([^\n]+)"
-            splited_content = re.sub(
-                fix_pattern,
-                lambda m: f"{parent_separator}# {m.group(1)}",
-                splited_content,
-            )
+            splited_content = self._fix_broken_headers(splited_content, parent_separator)
 
         return {"result": splited_content}
 
+    async def iter_split(
+        self,
+        mode: str,
+        content: str,
+        parent_block_size: int = 1024,
+        sub_block_size: int = 512,
+        sub_separator: str = "\n\n\n",
+        preview_url: str = "",
+        overlap: int = 0,
+    ) -> AsyncIterator[str]:
+        """
+        流式分块：父块一经确定立即产出，调用方无需等待整篇文档处理完成。
+        产出的父块（已包含子块分隔符）以 "\n\n\n\n" 连接后与 split 的 result 一致，
+        包括相邻父块之间的标题修复；空父块不会产出（此时连接结果少一个分隔符）。
+        大文本按 executor_mode 在工作线程中生成（进程池模式同样使用线程，避免逐块 IPC）。
+        """
+        kwargs = dict(
+            mode=mode,
+            content=content,
+            parent_block_size=parent_block_size,
+            sub_block_size=sub_block_size,
+            sub_separator=sub_separator,
+            preview_url=preview_url,
+            overlap=overlap,
+        )
+        executor = self._get_executor(len(content) if isinstance(content, str) else 0)
+        if executor is None:
+            async for block in self._iter_split_inline(**kwargs):
+                yield block
+                # 逐块让出事件循环
+                await asyncio.sleep(0)
+            return
+
+        if not isinstance(executor, ThreadPoolExecutor):
+            executor = None  # 默认线程池
+        async for block in self._iter_in_thread(executor, kwargs):
+            yield block
+
+    async def _iter_in_thread(self, executor: Optional[Executor], kwargs: Dict[str, Any]) -> AsyncIterator[str]:
+        """在工作线程中驱动 _iter_split_inline，通过有界队列把父块交回事件循环"""
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.STREAM_QUEUE_SIZE)
+        cancelled = threading.Event()
+        finished = object()
+
+        def put(item) -> None:
+            # 队列满时阻塞工作线程，实现背压；消费方退出后不再投递
+            if not cancelled.is_set():
+                asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+        async def produce() -> None:
+            async for block in self._iter_split_inline(**kwargs):
+                if cancelled.is_set():
+                    return
+                put(block)
+
+        def run() -> None:
+            try:
+                asyncio.run(produce())
+                put(finished)
+            except BaseException as e:
+                put(e)
+
+        worker = loop.run_in_executor(executor, run)
+        try:
+            while True:
+                item = await queue.get()
+                if item is finished:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            cancelled.set()
+            # 释放可能阻塞在 put 上的工作线程
+            while not queue.empty():
+                queue.get_nowait()
+            await worker
+
+    async def _iter_split_inline(
+        self,
+        mode: str,
+        content: str,
+        parent_block_size: int = 1024,
+        sub_block_size: int = 512,
+        sub_separator: str = "\n\n\n",
+        preview_url: str = "",
+        overlap: int = 0,
+    ) -> AsyncIterator[str]:
+        """在当前事件循环中逐个产出父块，并在相邻父块之间修复被拆开的标题前缀"""
+        m = self._normalize_mode(mode)
+        if m == "pdf":
+            # 与 _split_pdf_text 内部的标题修复对应
+            blocks = self._iter_fix_broken_headers(
+                self._iter_pdf_blocks(content, parent_block_size, sub_block_size, sub_separator, overlap), "\n\n\n\n"
+            )
+        elif m == "table":
+            blocks = self._iter_table_blocks(content, parent_block_size, sub_block_size, sub_separator)
+        else:
+            if not preview_url:
+                raise ValueError("preview_url is required for image mode")
+            blocks = self._iter_image_blocks(content, parent_block_size, sub_block_size, preview_url)
+
+        # 与 _split_inline 对连接结果执行的标题修复对应
+        async for block in self._iter_fix_broken_headers(blocks, "\n\n\n\n"):
+            if block:
+                yield block
+
+    @staticmethod
+    async def _iter_fix_broken_headers(blocks: AsyncIterator[str], parent_separator: str) -> AsyncIterator[str]:
+        """
+        流式版 _fix_broken_headers：产出的父块以 parent_separator 连接后，
+        与对整段连接结果执行 _fix_broken_headers 完全一致（空父块也会产出，由调用方过滤）。
+        要求 parent_separator 以换行开头（标题行在分隔符前结束）。
+
+        匹配从 '#' 开始，经过空白与分隔符，到其后第一个非空白字符所在行的行尾结束。
+        因此一旦后续父块中出现非空白字符，起点位于第一个待处理父块内的匹配就已确定：
+        在这些父块连接成的窗口中按 re.sub 的顺序替换，跨越边界的匹配把标题行移入其所在的父块，
+        之后从移入的标题行末尾继续查找（与 re.sub 从上一个匹配的结尾继续查找一致）。
+        """
+        pattern = _broken_header_pattern(parent_separator)
+        pending: List[str] = []
+        scan = 0  # pending[0] 中继续查找的起点
+        finished = False
+        iterator = blocks.__aiter__()
+        while not finished:
+            try:
+                block = await iterator.__anext__()
+                pending.append(block)
+                if len(pending) < 2 or not block or block.isspace():
+                    continue
+            except StopAsyncIteration:
+                finished = True
+
+            # 后续父块中已有非空白字符（或文档结束）：处理第一个父块
+            while len(pending) > 1 and (finished or any(b and not b.isspace() for b in pending[1:])):
+                window = parent_separator.join(pending)
+                boundary = len(pending[0])
+                pieces: List[str] = []
+                pos = 0
+                while (match := pattern.search(window, scan)) is not None and match.start() < boundary:
+                    pieces.append(window[pos:match.start()])
+                    if match.end() > boundary:
+                        # 跨越边界：第一个父块到 '#' 之前为止，标题行移到其所在父块的开头
+                        yield "".join(pieces)
+                        offset, index = boundary + len(parent_separator), 1
+                        while offset + len(pending[index]) < match.end():
+                            offset += len(pending[index]) + len(parent_separator)
+                            index += 1
+                        header = f"# {match.group(1)}"
+                        pending = [header + window[match.end():offset + len(pending[index])]] + pending[index + 1:]
+                        scan = len(header)
+                        break
+                    pieces.append(f"{parent_separator}# {match.group(1)}")
+                    pos = scan = match.end()
+                else:
+                    pieces.append(pending[0][pos:])
+                    yield "".join(pieces)
+                    pending, scan = pending[1:], 0
+
+        if pending:
+            last = pending[0]
+            yield last[:scan] + TextSplitterService._fix_broken_headers(last[scan:], parent_separator)
+
+    @staticmethod
+    def _normalize_mode(mode: str) -> str:
+        """将 mode 别名归一为 'pdf' | 'table' | 'image'"""
+        if not isinstance(mode, str):
+            raise TypeError("mode 必须是字符串类型")
+
+        m = mode.strip().lower()
+        if m in ("pdf", "pdf_text"):
+            return "pdf"
+        if m in ("table", "md_table", "markdown"):
+            return "table"
+        if m in ("image", "img", "text_with_preview", "preview"):
+            return "image"
+        raise ValueError("mode 参数必须是 'pdf' | 'table' | 'image'")
+
+    @staticmethod
+    def _fix_broken_headers(text: str, parent_separator: str) -> str:
+        """将父块末尾孤立的 '#' 移到下一个父块开头：'#<sep>Title' -> '<sep># Title'"""
+        if "#" not in text:
+            return text
+        return _broken_header_pattern(parent_separator).sub(
+            lambda m: f"{parent_separator}# {m.group(1)}",
+            text,
+        )
+
+    async def _split_structured(
+        self,
+        m: str,
+        content: str,
+        parent_block_size: int,
+        sub_block_size: int,
+        sub_separator: str = "\n\n\n",
+        preview_url: str = "",
+        overlap: int = 0,
+    ) -> Dict[str, Any]:
+        """
+        结构化输出：不拼接字符串，直接返回父块列表，下游按偏移量切片即可，无需再按分隔符拆分。
+
+        返回 {"result": [block, ...]}，每个 block 为:
+        - length: 父块真实长度（各子块长度之和，不含分隔符；表格模式含表头及其后的换行）
+        - subs: 子块列表，[start, end] 表示子块即 content[start:end]；
+          [start, end, text] 表示子块由 content[start:end] 生成但内容不是原文切片
+          （超限图片/表格拆分片段、图片模式追加的链接、不相邻的表格行），直接使用 text
+        - header: 仅表格模式，表头（含分隔行）区间，格式同子块
+
+        偏移量基于 HTML 表格转换后的文本；若转换改变了内容，返回值额外包含 "content" 字段。
+        分块结果与文本输出一致（表格模式的父块长度预算仍计入 sub_separator），
+        但不执行跨父块的标题修复（父块末尾孤立的 '#' 保持原位）。
+        """
+        source = content
+        if m == "image":
+            cut, image_source, subs = await self._image_sub_blocks(
+                content, parent_block_size, sub_block_size, preview_url, parent_separator=""
+            )
+            # 链接等原文中不存在的部分以替代文本返回，区间为空
+            subs = [
+                sub if sub.text is None and sub.end <= cut else SubBlock(cut, cut, sub.text or image_source[sub.start:sub.end])
+                for sub in subs
+            ]
+            blocks = [self._structured_block(subs)] if subs else []
+        elif m == "table":
+            source = await self._convert_html_tables_to_markdown(content)
+            blocks = []
+            for segment in self._iter_table_segments(source):
+                if isinstance(segment, MarkdownTable):
+                    header = self._table_header(source, segment)
+                    async for ranges in self._iter_table_rows(segment, parent_block_size, sub_block_size, sub_separator):
+                        blocks.append(self._structured_block(self._table_sub_blocks(source, segment, ranges), header))
+                    continue
+                # 表格外的文本走 PDF 逻辑（与文本输出一致，不使用 overlap），偏移量换算回 source
+                start, end = segment
+                prose = source[start:end]
+                async for subs in self._iter_pdf_sub_blocks(prose, parent_block_size, sub_block_size):
+                    blocks.append(self._structured_block([
+                        SubBlock(sub.start + start, sub.end + start, sub.text) for sub in subs
+                    ]))
+        else:
+            source = await self._convert_html_tables_to_markdown(content)
+            blocks = [
+                self._structured_block(subs)
+                async for subs in self._iter_pdf_sub_blocks(source, parent_block_size, sub_block_size, overlap)
+            ]
+
+        result: Dict[str, Any] = {"result": blocks}
+        if source is not content and source != content:
+            result["content"] = source
+        return result
+
+    @staticmethod
+    def _structured_block(subs: List[SubBlock], header: Optional[SubBlock] = None) -> Dict[str, Any]:
+        """将子块列表转换为结构化输出中的父块"""
+        def encode(sub: SubBlock) -> Tuple[list, int]:
+            if sub.text is None:
+                return [sub.start, sub.end], sub.end - sub.start
+            return [sub.start, sub.end, sub.text], len(sub.text)
+
+        length = 0
+        entries = []
+        for sub in subs:
+            entry, sub_len = encode(sub)
+            entries.append(entry)
+            length += sub_len
+        block: Dict[str, Any] = {"length": length, "subs": entries}
+        if header is not None:
+            block["header"], header_len = encode(header)
+            block["length"] += header_len + 1
+        return block
+
     # -------- 核心业务接口 (Rewrite) --------
 
     async def _split_table_text(
@@ -88,165 +829,272 @@ class TextSplitterService:
         """
         表格模式专用分块逻辑
         严格遵循输入的 parent_block_size 和 sub_block_size。
+        文档可包含多个表格（各自带表头），表格外的文本按 PDF 逻辑分块，按文档顺序输出。
         """
         # 1. HTML -> Markdown
         content = await self._convert_html_tables_to_markdown(content)
 
-        # 2. 提取表格结构
-        lines = content.splitlines()
-        header_idx = -1
-        sep_idx = -1
-        
-        # 简单查找表格头
-        for i, line in enumerate(lines):
-            if line.strip().startswith("|"):
-                if header_idx == -1:
-                    header_idx = i
-                elif sep_idx == -1 and set(line.strip()) <= {'|', '-', ' ', ':'}:
-                    sep_idx = i
-                    break
-        
-        # 如果找不到标准表格结构，回退到 PDF 逻辑
-        if header_idx == -1 or sep_idx == -1:
+        # 2. 单次扫描识别表格与表格外文本
+        segments = self._iter_table_segments(content)
+        first = next(segments, None)
+
+        # 整篇文档都不含表格：与 PDF 模式的输出一致
+        if first is None or first == (0, len(content)):
             return await self._split_pdf_text(content, parent_block_size, sub_block_size, parent_separator, sub_separator)
 
-        header_lines = lines[header_idx:sep_idx+1]
-        header_str = "\n".join(header_lines)
-        
-        # 提取数据行
-        data_rows = []
-        # 保留表格前的文本 (可选，暂时忽略，聚焦表格)
-        
-        current_row_idx = sep_idx + 1
-        while current_row_idx < len(lines):
-            line = lines[current_row_idx]
-            if line.strip().startswith("|"):
-                data_rows.append(line)
-            # 忽略空行或非表格行
-            current_row_idx += 1
-            
-        # 3. 分块逻辑
-        parent_blocks = []
-        current_parent_subs = [] # 存储子块字符串
-        current_sub_rows = []    # 存储当前子块的行
-        
-        def calculate_sub_block_len(rows):
-            if not rows: return 0
-            return sum(len(r) for r in rows) + len(rows) - 1
-
-        def calculate_parent_block_len(sub_blocks):
-            if not sub_blocks: return len(header_str)
-            total = len(header_str) + 1 # header + newline
-            for i, sub in enumerate(sub_blocks):
-                total += len(sub)
-                if i < len(sub_blocks) - 1:
-                    total += len(sub_separator)
-            return total
-
-        # 遍历所有行
-        for row in data_rows:
-            temp_sub_rows = current_sub_rows + [row]
-            temp_sub_len = calculate_sub_block_len(temp_sub_rows)
-            
-            # 判断当前子块是否是父块的第一个子块
-            is_first_sub = (len(current_parent_subs) == 0)
-            
-            # 确定当前子块的有效大小限制
-            # 如果是第一个子块，需要预留表头空间，以保证 visual chunk 符合 sub_block_size (参考 result.txt 行为)
+        # 3. 分块
+        parent_blocks = [
+            block async for block in self._iter_segment_blocks(
+                content, itertools.chain([first], segments), parent_block_size, sub_block_size, sub_separator
+            )
+        ]
+        return parent_separator.join(parent_blocks)
+
+    async def _iter_table_blocks(
+        self,
+        content: str,
+        parent_block_size: int,
+        sub_block_size: int,
+        sub_separator: str = "\n\n\n"
+    ) -> AsyncIterator[str]:
+        """表格模式流式分块：边扫描边产出父块"""
+        content = await self._convert_html_tables_to_markdown(content)
+        segments = self._iter_table_segments(content)
+        first = next(segments, None)
+        if first is None or first == (0, len(content)):
+            # 与 _split_table_text 一致：整篇文档都不含表格时按 PDF 模式输出（含其中的标题修复）
+            blocks = self._iter_fix_broken_headers(
+                self._iter_pdf_blocks(content, parent_block_size, sub_block_size, sub_separator), "\n\n\n\n"
+            )
+        else:
+            blocks = self._iter_segment_blocks(
+                content, itertools.chain([first], segments), parent_block_size, sub_block_size, sub_separator
+            )
+        async for block in blocks:
+            yield block
+
+    async def _iter_segment_blocks(
+        self,
+        source: str,
+        segments: Iterator[Union[Span, MarkdownTable]],
+        parent_block_size: int,
+        sub_block_size: int,
+        sub_separator: str = "\n\n\n"
+    ) -> AsyncIterator[str]:
+        """按文档顺序产出各片段的父块：表格按行分块，表格外的文本区间按 PDF 逻辑分块（不使用 overlap）"""
+        pdf_sub_separator = sub_separator.replace("\\n", "\n")
+        for segment in segments:
+            if isinstance(segment, MarkdownTable):
+                async for ranges in self._iter_table_rows(segment, parent_block_size, sub_block_size, sub_separator):
+                    yield self._render_table_block(segment, ranges, sub_separator)
+                continue
+            start, end = segment
+            prose = source[start:end]
+            async for subs in self._iter_pdf_sub_blocks(prose, parent_block_size, sub_block_size):
+                yield pdf_sub_separator.join(self._sub_block_texts(prose, subs))
+
+    @staticmethod
+    def _iter_lines(text: str) -> Iterator[Span]:
+        """逐行产出 (行首, 行尾) 位置（不含换行符），分行规则与 str.splitlines 一致"""
+        pos = 0
+        for match in _LINE_BREAK_RE.finditer(text):
+            yield pos, match.start()
+            pos = match.end()
+        if pos < len(text):
+            yield pos, len(text)
+
+    def _iter_table_segments(self, source: str) -> Iterator[Union[Span, MarkdownTable]]:
+        """
+        表格模式的单次扫描：按文档顺序产出 MarkdownTable 与表格外文本的区间 (start, end)。
+
+        - 表格以 表头行 + 紧随的分隔行 开始，之后的表格行均为数据行（其间的空行忽略）
+        - 分隔行只在一段连续表格行的第二行出现时才开始新表格；表格中间形似分隔行的行按数据行处理
+        - 遇到非空的非表格行，或新的 表头行 + 分隔行 时当前表格结束，因此可以识别多个表格
+        - 没有数据行的表头，以及不属于任何表格的表格行，作为表格外文本保留
+        表格一旦出现第一行数据即产出其之前的文本区间，无需等待全文扫描完成。
+        """
+        prose_start: Optional[int] = 0   # 当前表格外文本的起点；None 表示没有待产出的文本
+        header: Optional[str] = None      # 当前表格的表头；None 表示不在表格中
+        header_span: Span = (0, 0)
+        rows: List[str] = []
+        row_starts: List[int] = []
+        pending: Optional[Span] = None    # 上一行是表格行，需根据下一行判断是否为表头
+        pending_first = False             # pending 是否为一段连续表格行的第一行
+        prev_is_row = False
+
+        for start, end in self._iter_lines(source):
+            line = source[start:end]
+            stripped = line.strip()
+            is_row = stripped.startswith("|")
+            run_start = not prev_is_row
+            prev_is_row = is_row
+
+            if pending is not None:
+                p_start, p_end = pending
+                pending = None
+                if pending_first and is_row and _is_table_separator(stripped):
+                    # 上一行是表头：结束当前表格，开始新表格
+                    if header is not None:
+                        if rows:
+                            yield MarkdownTable(header, header_span, rows, row_starts)
+                        elif prose_start is None:
+                            prose_start = header_span[0]
+                    header = source[p_start:p_end] + "\n" + line
+                    header_span = (p_start, end)
+                    rows, row_starts = [], []
+                    continue
+                if header is not None:
+                    if not rows and prose_start is not None:
+                        if prose_start < header_span[0]:
+                            yield prose_start, header_span[0]
+                        prose_start = None
+                    rows.append(source[p_start:p_end])
+                    row_starts.append(p_start)
+
+            if is_row:
+                pending = (start, end)
+                pending_first = run_start
+            elif stripped and header is not None:
+                # 非表格行：当前表格结束
+                if rows:
+                    yield MarkdownTable(header, header_span, rows, row_starts)
+                    prose_start = start
+                elif prose_start is None:
+                    prose_start = header_span[0]
+                header = None
+
+        if pending is not None and header is not None:
+            if not rows and prose_start is not None:
+                if prose_start < header_span[0]:
+                    yield prose_start, header_span[0]
+                prose_start = None
+            rows.append(source[pending[0]:pending[1]])
+            row_starts.append(pending[0])
+        if header is not None:
+            if rows:
+                yield MarkdownTable(header, header_span, rows, row_starts)
+            elif prose_start is None:
+                prose_start = header_span[0]
+        if prose_start is not None and prose_start < len(source):
+            yield prose_start, len(source)
+
+    @staticmethod
+    def _render_table_block(table: MarkdownTable, ranges: List[Span], sub_separator: str) -> str:
+        """按行号区间拼接表格父块：表头 + 换行 + 各子块（子块内各行以换行连接）"""
+        subs = ["\n".join(table.rows[first:last]) for first, last in ranges]
+        return table.header + "\n" + sub_separator.join(subs)
+
+    @staticmethod
+    def _table_header(source: str, table: MarkdownTable) -> SubBlock:
+        """表头在原文中的区间；表头各行在原文中不以单个换行相连时附带拼接后的文本"""
+        start, end = table.header_span
+        if source[start:end] == table.header:
+            return SubBlock(start, end)
+        return SubBlock(start, end, table.header)
+
+    @staticmethod
+    def _table_sub_blocks(source: str, table: MarkdownTable, ranges: List[Span]) -> List[SubBlock]:
+        """将行号区间转换为原文区间；行之间夹有被忽略的行或非 '\\n' 换行时附带拼接后的文本"""
+        subs: List[SubBlock] = []
+        rows, row_starts = table.rows, table.row_starts
+        for first, last in ranges:
+            start = row_starts[first]
+            end = row_starts[last - 1] + len(rows[last - 1])
+            contiguous = all(
+                row_starts[i] == row_starts[i - 1] + len(rows[i - 1]) + 1 and source[row_starts[i] - 1] == "\n"
+                for i in range(first + 1, last)
+            )
+            subs.append(SubBlock(start, end) if contiguous else SubBlock(start, end, "\n".join(rows[first:last])))
+        return subs
+
+    async def _iter_table_rows(
+        self,
+        table: MarkdownTable,
+        parent_block_size: int,
+        sub_block_size: int,
+        sub_separator: str = "\n\n\n"
+    ) -> AsyncIterator[List[Span]]:
+        """
+        按行将表格拆分为父块/子块，每个父块都以表头开头，父块一经确定立即产出。
+        每个父块以子块的行号区间列表 [(first_row, last_row), ...] 表示，由调用方拼接或转换为偏移量。
+
+        单次遍历：子块与父块长度均以累计值维护，不重新拼接或求和已累积的行，整体 O(行数)。
+        长度定义：
+        - 子块长度 = 各行长度之和 + 行间换行数
+        - 父块长度 = 表头长度 + 1（换行） + 各子块长度之和 + 子块间分隔符长度；没有子块时为表头长度
+        """
+        header_len = len(table.header)
+        sep_len = len(sub_separator)
+
+        parent_ranges: List[Span] = []  # 当前父块已确定的子块（行号区间）
+        parent_body = 0                 # 当前父块各子块长度之和 + 子块间分隔符长度
+        sub_first = 0                   # 当前子块第一行的行号
+        sub_rows = 0                    # 当前子块的行数
+        sub_len = 0                     # 当前子块长度
+
+        def parent_len_with(extra_sub_len: int) -> int:
+            """当前父块再加入一个长度为 extra_sub_len 的子块后的父块长度"""
+            if parent_ranges:
+                return header_len + 1 + parent_body + sep_len + extra_sub_len
+            return header_len + 1 + extra_sub_len
+
+        def close_sub(row_idx: int) -> None:
+            """将当前子块（不含第 row_idx 行）加入父块"""
+            nonlocal parent_body
+            parent_body = parent_body + sep_len + sub_len if parent_ranges else sub_len
+            parent_ranges.append((sub_first, row_idx))
+
+        for row_idx, row in enumerate(table.rows):
+            row_len = len(row)
+            temp_sub_len = sub_len + 1 + row_len if sub_rows else row_len
+
+            # 第一个子块需要预留表头空间，以保证 visual chunk 符合 sub_block_size
             current_sub_limit = sub_block_size
-            if is_first_sub:
-                current_sub_limit -= (len(header_str) + 1)
-                if current_sub_limit < 0: current_sub_limit = 0 # 保护
+            if not parent_ranges:
+                current_sub_limit = max(0, current_sub_limit - (header_len + 1))
 
             if temp_sub_len <= current_sub_limit:
                 # 满足子块限制，检查父块限制
-                temp_parent_subs_if_added = []
-                if current_parent_subs:
-                    temp_parent_subs_if_added = current_parent_subs + ["\n".join(temp_sub_rows)]
-                else:
-                    temp_parent_subs_if_added = ["\n".join(temp_sub_rows)]
-                
-                if calculate_parent_block_len(temp_parent_subs_if_added) <= parent_block_size:
-                    current_sub_rows.append(row)
-                else:
-                    # 加上这行后，子块虽然满足子块限制，但会导致父块超限
-                    # 策略：结束当前子块（不含新行），结束父块，新行放入新父块的新子块
-                    if current_sub_rows:
-                        sub_str = "\n".join(current_sub_rows)
-                        current_parent_subs.append(sub_str)
-                        
-                        parent_content = header_str + "\n" + sub_separator.join(current_parent_subs)
-                        parent_blocks.append(parent_content)
-                        current_parent_subs = []
-                        
-                        current_sub_rows = [row]
-                    else:
-                        # 单行就超父块？强制放入（保持行完整性）
-                        current_sub_rows.append(row)
+                if parent_len_with(temp_sub_len) <= parent_block_size or not sub_rows:
+                    # 放得下；或单行就超父块，强制放入（保持行完整性）
+                    sub_rows += 1
+                    sub_len = temp_sub_len
+                    continue
+                # 加上这行后父块超限：结束当前子块与父块，新行放入新父块的新子块
+                close_sub(row_idx)
+                yield parent_ranges
+                parent_ranges, parent_body = [], 0
+            elif sub_rows:
+                # 超出子块限制：结束当前子块（不含新行）
+                if parent_len_with(sub_len) > parent_block_size and parent_ranges:
+                    # 已完成的子块放不进当前父块，先结束父块，该子块作为新父块的第一个
+                    yield parent_ranges
+                    parent_ranges, parent_body = [], 0
+                close_sub(row_idx)
+                # 新行开启新子块；若新子块放不进当前父块，结束父块
+                if parent_len_with(row_len) > parent_block_size:
+                    yield parent_ranges
+                    parent_ranges, parent_body = [], 0
             else:
-                # 超出子块限制
-                # 结束当前子块（不含新行）
-                if current_sub_rows:
-                    sub_str = "\n".join(current_sub_rows)
-                    
-                    # 检查这个已完成的子块放入父块是否超限（理论上在添加行时已检查，但需再次确认）
-                    temp_parent_subs = current_parent_subs + [sub_str]
-                    if calculate_parent_block_len(temp_parent_subs) <= parent_block_size:
-                        current_parent_subs.append(sub_str)
-                        # 新行开启新子块
-                        current_sub_rows = [row]
-                        
-                        # 检查新子块放入当前父块是否超限
-                        # 注意：此时 is_first_sub 为 False
-                        temp_parent_subs_new = current_parent_subs + ["\n".join(current_sub_rows)]
-                        if calculate_parent_block_len(temp_parent_subs_new) > parent_block_size:
-                            # 超限，结束父块
-                            parent_content = header_str + "\n" + sub_separator.join(current_parent_subs)
-                            parent_blocks.append(parent_content)
-                            current_parent_subs = []
-                            # current_sub_rows 保持不变，作为新父块的开始
-                    else:
-                        # 极其罕见：之前的行累积符合子块限制，但突然不符合父块限制？
-                        # 逻辑上在 append(row) 时 checked check，所以这里应该是符合的。
-                        # 除非是边界情况。为安全起见，若不符合则结束父块。
-                        if current_parent_subs:
-                            parent_content = header_str + "\n" + sub_separator.join(current_parent_subs)
-                            parent_blocks.append(parent_content)
-                            current_parent_subs = []
-                        # 将当前 sub_str 作为新父块的第一个
-                        current_parent_subs.append(sub_str)
-                        current_sub_rows = [row]
-                        
-                        # 再检查新行
-                        temp_parent_subs_new = current_parent_subs + ["\n".join(current_sub_rows)]
-                        if calculate_parent_block_len(temp_parent_subs_new) > parent_block_size:
-                             parent_content = header_str + "\n" + sub_separator.join(current_parent_subs)
-                             parent_blocks.append(parent_content)
-                             current_parent_subs = []
-                else:
-                    # 单行超子块限制
-                    current_sub_rows.append(row)
-        
+                # 单行超子块限制
+                sub_rows += 1
+                sub_len = temp_sub_len
+                continue
+
+            sub_first, sub_rows, sub_len = row_idx, 1, row_len
+
         # 处理遗留
-        if current_sub_rows:
-            sub_str = "\n".join(current_sub_rows)
-            temp_parent_subs = current_parent_subs + [sub_str]
-            if calculate_parent_block_len(temp_parent_subs) <= parent_block_size:
-                current_parent_subs.append(sub_str)
-                parent_content = header_str + "\n" + sub_separator.join(current_parent_subs)
-                parent_blocks.append(parent_content)
+        if sub_rows:
+            last_range = (sub_first, len(table.rows))
+            if parent_len_with(sub_len) <= parent_block_size:
+                yield parent_ranges + [last_range]
             else:
-                if current_parent_subs:
-                    parent_content = header_str + "\n" + sub_separator.join(current_parent_subs)
-                    parent_blocks.append(parent_content)
+                if parent_ranges:
+                    yield parent_ranges
                 # 新父块
-                parent_content = header_str + "\n" + sub_str
-                parent_blocks.append(parent_content)
-        elif current_parent_subs:
-             parent_content = header_str + "\n" + sub_separator.join(current_parent_subs)
-             parent_blocks.append(parent_content)
-             
-        return parent_separator.join(parent_blocks)
+                yield [last_range]
+        elif parent_ranges:
+            yield parent_ranges
 
     async def _split_image_text(
         self,
@@ -267,6 +1115,25 @@ class TextSplitterService:
         3. 将裁剪后的 content 与图片连接地址合并 content = content + f"\n图片连接：{preview_url}{parent_separator}"
         4. 对合并后的内容做子块拆分，分块前提条件是保证 preview_url 部分不可拆分。
         """
+        _, image_source, subs = await self._image_sub_blocks(
+            content, parent_block_size, sub_block_size, preview_url, parent_separator
+        )
+        # 过滤空块，连接并返回
+        return sub_separator.join(self._sub_block_texts(image_source, subs))
+
+    async def _image_sub_blocks(
+        self,
+        content: str,
+        parent_block_size: int,
+        sub_block_size: int,
+        preview_url: str,
+        parent_separator: str
+    ) -> Tuple[int, str, List[SubBlock]]:
+        """
+        图片模式的裁剪与子块拆分（见 _split_image_text）。
+        返回 (裁剪位置, 裁剪后内容与链接后缀拼接成的文本, 该文本上的子块)；
+        裁剪位置之前的部分与原始 content 的前缀一致。
+        """
         # 1. 计算长度 & 2. 裁剪
         # 注意：这里计算 mix_content 长度时不包含 parent_separator，根据需求描述 1
         url_suffix_for_calc = f"\n图片连接：{preview_url}"
@@ -284,25 +1151,30 @@ class TextSplitterService:
         protected_suffix = f"\n图片连接：{preview_url}{parent_separator}"
         
         # 4. 子块拆分
-        # 构造一个 Token 来保护后缀不被拆分
-        # 注意：Token 格式必须匹配 _split_into_sub_blocks 中的正则 r"(<<ATOMIC_\w+_\d+>>)"
-        token_key = "<<ATOMIC_PREVIEW_URL_SECTION_0>>"
-        tokens = {token_key: protected_suffix}
-        text_with_token = content + token_key
+        # 后缀作为原子块保护，不被拆分（类型不是图片/表格，超限时也整体保留）
+        image_source = content + protected_suffix
+        segments = SegmentedText(image_source, [Segment(ATOMIC_PREVIEW, len(content), len(image_source))])
         
         # 获取有效限制
         _, _, s_target, s_max = await self._determine_effective_limits(parent_block_size, sub_block_size)
         
         # 调用子块拆分
-        # _split_into_sub_blocks 会识别 <<ATOMIC_...>> 并保留（因为 key 不含 IMG/TAB，且长度超限时 fallback 为保留）
-        # 如果 protected_suffix 长度本身小于 s_max，则更是直接保留。
-        sub_blocks = await self._split_into_sub_blocks(text_with_token, s_target, s_max, tokens)
-        
-        # 过滤空块
-        valid_subs = [s.strip() for s in sub_blocks if s.strip()]
-        
-        # 连接并返回
-        return sub_separator.join(valid_subs)
+        sub_blocks = await self._split_into_sub_blocks(image_source, 0, len(image_source), s_target, s_max, segments)
+        return len(content), image_source, self._to_sub_blocks(image_source, sub_blocks)
+
+    async def _iter_image_blocks(
+        self,
+        content: str,
+        parent_block_size: int,
+        sub_block_size: int,
+        preview_url: str = ""
+    ) -> AsyncIterator[str]:
+        """图片模式流式分块：整段内容只构成一个父块（不追加父块分隔符）"""
+        block = await self._split_image_text(
+            content, parent_block_size, sub_block_size, parent_separator="", preview_url=preview_url
+        )
+        if block:
+            yield block
 
     async def _split_pdf_text(
         self, 
@@ -318,62 +1190,84 @@ class TextSplitterService:
         # 0. 预处理：处理转义换行符
         # 用户反馈输入中包含 literal \n，需要转义为真实换行符
         parent_separator = parent_separator.replace("\\n", "\n")
+
+        # 1-6. 逐个生成父块
+        parent_blocks = [
+            block async for block in self._iter_pdf_blocks(
+                content, parent_block_size, sub_block_size, sub_separator, overlap
+            )
+        ]
+
+        # 7. 父块连接
+        final_text = parent_separator.join(parent_blocks)
+
+        if parent_separator:
+            final_text = self._fix_broken_headers(final_text, parent_separator)
+        
+        # 8. 子块直接取自原文，连接后的文本即最终文本
+        return final_text
+
+    async def _iter_pdf_blocks(
+        self,
+        content: str,
+        parent_block_size: int,
+        sub_block_size: int,
+        sub_separator: str = "\n\n\n",
+        overlap: int = 0
+    ) -> AsyncIterator[str]:
+        """
+        PDF 文本流式分块：按文档顺序逐个产出父块（子块已用 sub_separator 连接）。
+        粗切只记录区间，细化与子块拆分按父块依次进行，因此第一个父块无需等待全文处理完成。
+        """
         sub_separator = sub_separator.replace("\\n", "\n")
 
+        # HTML 表格转 Markdown
+        source = await self._convert_html_tables_to_markdown(content)
+
+        async for subs in self._iter_pdf_sub_blocks(source, parent_block_size, sub_block_size, overlap):
+            # 子块连接
+            yield sub_separator.join(self._sub_block_texts(source, subs))
+
+    async def _iter_pdf_sub_blocks(
+        self,
+        source: str,
+        parent_block_size: int,
+        sub_block_size: int,
+        overlap: int = 0
+    ) -> AsyncIterator[List[SubBlock]]:
+        """
+        PDF 文本分块主流程（source 为 HTML 表格转换后的文本）。
+        逐个产出父块的子块列表，子块区间均为 source 上的偏移量（已去除首尾空白，不含空子块）。
+        """
         # 1. 确定切分限制
         p_target, p_max, s_target, s_max = await self._determine_effective_limits(parent_block_size, sub_block_size)
         
-        # 2. HTML 表格转 Markdown
-        content = await self._convert_html_tables_to_markdown(content)
+        # 2. HTML 表格转 Markdown（由调用方完成）
+        content = source
         
-        # 3. Tokenize (原子保护)
-        # 将图片和表格替换为 Token ID，并存储在 tokens map 中
+        # 3. 原子保护
+        # 单次扫描识别图片和表格，得到类型化片段；原文保持不变，不插入占位符。
         # 注意：这里我们只做标记，不做切分（除非超限）。但根据新需求，
         # 如果超子块限制，要在后面切分。这里我们先识别出来。
-        content, tokens = await self._tokenize_content(content)
+        segments = self._segment_content(content)
         
         # 4. 一级粗切 + 贪婪合并
-        # 保证每个分块结尾有一个父块分隔符 (在 Join 时处理)
-        coarse_blocks = await self._coarse_split_and_merge(content, p_target, tokens, overlap)
-        
-        # 5. 父块细化 (Parent Refinement)
-        # 校验粗切的每个分块是否符合父块大小上限，如果超过上限，再该块内部按段落结构拆分出多个父块。
-        final_parent_blocks = []
-        for block in coarse_blocks:
-            refined = await self._refine_parent_block(block, p_target, p_max, tokens)
-            final_parent_blocks.extend(refined)
-            
-        # 6. 子块拆分 (Sub Block Splitting)
-        # 在每个父块的基础上拆分子块
-        processed_parent_blocks = []
-        for p_block in final_parent_blocks:
-            sub_blocks = await self._split_into_sub_blocks(p_block, s_target, s_max, tokens)
+        # 之后的各阶段都只在 content 上传递 (start, end) 区间，直到产出父块时才生成字符串
+        coarse_spans = await self._coarse_split_and_merge(content, p_target, segments, overlap)
+        
+        for block_start, block_end in coarse_spans:
+            # 5. 父块细化 (Parent Refinement)
+            # 校验粗切的每个分块是否符合父块大小上限，如果超过上限，再该块内部按段落结构拆分出多个父块。
+            refined = await self._refine_parent_block(content, block_start, block_end, p_target, p_max, segments)
             
-            # 过滤空块
-            valid_subs = [s.strip() for s in sub_blocks if s.strip()]
-            if valid_subs:
-                # 子块连接
-                processed_parent_blocks.append(sub_separator.join(valid_subs))
+            # 6. 子块拆分 (Sub Block Splitting)
+            for p_start, p_end in refined:
+                sub_blocks = await self._split_into_sub_blocks(content, p_start, p_end, s_target, s_max, segments)
                 
-        # 7. 父块连接
-        final_text = parent_separator.join(processed_parent_blocks)
-
-        if parent_separator:
-            escaped_sep = re.escape(parent_separator)
-            fix_pattern = rf"#\s*{escaped_sep}\s*([^\n]+)"
-            final_text = re.sub(
-                fix_pattern,
-                lambda m: f"{parent_separator}# {m.group(1)}",
-                final_text,
-            )
-        
-        # 8. 还原 Token (如果还有遗留的)
-        # 注意：子块拆分时可能已经把 Token ID 变回内容了，或者我们留到最后统一变回。
-        # 建议在子块拆分阶段就处理好超限问题，并还原成文本，
-        # 这样 Join 后的文本就是最终文本。
-        # 但为了防止某些 Token 在中间过程中被意外修改，我们通常保留 ID 到最后。
-        # 不过根据设计，_split_into_sub_blocks 返回的已经是还原后的文本片段。
-        return final_text
+                # 去除首尾空白并过滤空块
+                valid_subs = self._to_sub_blocks(source, sub_blocks)
+                if valid_subs:
+                    yield valid_subs
 
     # -------- 辅助方法 --------
 
@@ -390,100 +1284,157 @@ class TextSplitterService:
         return p_target, p_max, s_target, s_max
 
     async def _convert_html_tables_to_markdown(self, text: str) -> str:
-        """将文本中的 HTML 表格转换为 Markdown 表格。"""
-        table_re = re.compile(r"<table\b[^>]*>(.*?)</table>", re.I | re.S)
-        tr_re = re.compile(r"<tr\b[^>]*>(.*?)</tr>", re.I | re.S)
-        cell_re = re.compile(r"<t(?:d|h)\b[^>]*>(.*?)</t(?:d|h)>", re.I | re.S)
-
-        def html_table_to_md(match) -> str:
-            table_html = match.group(1)
-            rows_html = tr_re.findall(table_html)
-            rows: List[List[str]] = []
-            for rh in rows_html:
-                cells = cell_re.findall(rh)
-                row: List[str] = []
-                for c in cells:
-                    raw = re.sub(r"<[^>]+>", "", c)
-                    raw = html.unescape(raw)
-                    raw = raw.strip()
-                    raw = raw.replace("|", "\\|")
-                    row.append(raw)
-                if row:
-                    rows.append(row)
-
-            if not rows:
-                return match.group(0)
-
-            col_count = max((len(r) for r in rows), default=0)
-            if col_count == 0:
-                return match.group(0)
-
-            norm_rows: List[List[str]] = []
-            for r in rows:
-                if len(r) < col_count:
-                    r = r + [""] * (col_count - len(r))
-                norm_rows.append(r)
-
-            header = norm_rows[0]
-            data_rows = norm_rows[1:]
-
-            header_line = "| " + " | ".join(header) + " |"
-            sep_line = "| " + " | ".join(["----------"] * col_count) + " |"
-            data_lines = ["| " + " | ".join(dr) + " |" for dr in data_rows]
-
-            md = "\n".join([header_line, sep_line] + data_lines)
-            return "\n\n" + md + "\n\n" # Ensure separation
-
-        return table_re.sub(html_table_to_md, text)
-
-    async def _tokenize_content(self, text: str) -> Tuple[str, Dict[str, str]]:
-        """将图片和表格内容替换为 Token ID"""
-        tokens = {}
-        
-        # 1. 图片处理
-        def img_replacer(match):
-            full_text = match.group(0)
-            token_id = f"<<ATOMIC_IMG_{len(tokens)}>>"
-            tokens[token_id] = full_text
-            return token_id # 暂时只返回 ID，不强制换行，后续 split 时处理
-            
-        text = re.sub(r"【(?:图片主题|图片解析内容).*?】", img_replacer, text, flags=re.DOTALL)
-        
-        # 2. 表格处理
-        def table_replacer(match):
-            full_text = match.group(0)
-            token_id = f"<<ATOMIC_TAB_{len(tokens)}>>"
-            tokens[token_id] = full_text
-            return token_id
-            
-        text = re.sub(r"(?:^\s*\|.*\|\s*$\n?)+", table_replacer, text, flags=re.MULTILINE)
-        
-        return text, tokens
+        """将文本中的 HTML 表格转换为 Markdown 表格（单次线性扫描，支持 rowspan / colspan）"""
+        # 不含 '<' 的文本不可能包含 HTML 表格，跳过扫描
+        if "<" not in text:
+            return text
+        return convert_html_tables(text)
+
+    def _segment_content(self, text: str) -> SegmentedText:
+        """识别图片和表格原子块，返回分块流水线的中间表示"""
+        return SegmentedText(text, self._scan_atomic_segments(text))
 
-    async def _extract_overlap_suffix(self, text: str, overlap_size: int, tokens: Dict[str, str]) -> str:
+    @classmethod
+    def _scan_atomic_segments(cls, text: str) -> List[Segment]:
         """
-        从文本末尾提取指定真实长度的后缀，保持 Token 完整性。
+        单次线性扫描识别原子块，按位置升序返回：
+        1. 图片块：'【图片主题' / '【图片解析内容' 开始，到其后第一个 '】' 结束（可跨行）
+        2. 表格块：连续的表格行（首尾非空白字符都是 '|'，且至少两个 '|'），
+           连同表格前紧邻的空白行及行间、行后的空白行；图片块视为一个普通字符参与识别
+        落在表格块内的图片块并入表格，不单独成块。
         """
-        if overlap_size <= 0 or not text:
-            return ""
+        images = cls._scan_image_blocks(text) if "【" in text else []
+        if "|" not in text:
+            return [Segment(ATOMIC_IMG, start, end) for start, end in images]
 
-        # 1. 解析 Token 结构
-        # finditer 按顺序返回，我们需要反向处理
-        # 简单起见，先按 Token 切分，得到 [text, token, text, token...]
-        parts = re.split(r"(<<ATOMIC_\w+_\d+>>)", text)
-        
-        suffix_parts = []
+        # 表格识别在"图片块替换为单个字符"的视图上进行，再把位置换算回原文
+        view = text
+        view_starts: List[int] = []
+        shrink = [0]
+        if images:
+            parts: List[str] = []
+            pos = view_len = 0
+            for start, end in images:
+                parts.append(text[pos:start])
+                view_len += start - pos
+                view_starts.append(view_len)
+                parts.append("\x00")
+                view_len += 1
+                shrink.append(shrink[-1] + end - start - 1)
+                pos = end
+            parts.append(text[pos:])
+            view = "".join(parts)
+
+        segments: List[Segment] = []
+        img_idx = 0
+        for v_start, v_end in cls._scan_table_runs(view):
+            start = v_start + shrink[bisect_left(view_starts, v_start)]
+            end = v_end + shrink[bisect_left(view_starts, v_end)]
+            while img_idx < len(images) and images[img_idx][0] < start:
+                segments.append(Segment(ATOMIC_IMG, *images[img_idx]))
+                img_idx += 1
+            while img_idx < len(images) and images[img_idx][0] < end:
+                img_idx += 1
+            segments.append(Segment(ATOMIC_TAB, start, end))
+        segments.extend(Segment(ATOMIC_IMG, start, end) for start, end in images[img_idx:])
+        return segments
+
+    @staticmethod
+    def _scan_image_blocks(text: str) -> List[Span]:
+        """查找图片解析内容块；某个块找不到 '】' 时，之后也不会再有完整的块"""
+        spans: List[Span] = []
+        pos = 0
+        while True:
+            start = text.find("【", pos)
+            if start < 0:
+                break
+            if not text.startswith(_IMAGE_BLOCK_PREFIXES, start):
+                pos = start + 1
+                continue
+            close = text.find("】", start + 1)
+            if close < 0:
+                break
+            spans.append((start, close + 1))
+            pos = close + 1
+        return spans
+
+    @staticmethod
+    def _is_table_row(text: str, line_start: int, line_end: int) -> bool:
+        line = text[line_start:line_end].strip()
+        return len(line) >= 2 and line[0] == "|" and line[-1] == "|"
+
+    @classmethod
+    def _scan_table_runs(cls, text: str) -> List[Span]:
+        """
+        查找连续表格行构成的区间（行以 '\\n' 分隔）。
+        区间从表格前紧邻的第一个空白行（没有则为首行行首）开始，到表格后第一个非空白行行首（或文末）结束。
+        只在含 '|' 的行上做判断，每个字符至多被检查常数次。
+        """
+        runs: List[Span] = []
+        n = len(text)
+        pos = 0  # 之前的内容已处理完，pos 总是行首
+        while pos < n:
+            bar = text.find("|", pos)
+            if bar < 0:
+                break
+            line_start = text.rfind("\n", pos, bar) + 1 or pos
+            line_end = text.find("\n", bar)
+            if line_end < 0:
+                line_end = n
+            if not cls._is_table_row(text, line_start, line_end):
+                pos = line_end + 1
+                continue
+
+            # 向前并入紧邻的空白行
+            start = line_start
+            while start > pos:
+                prev_start = text.rfind("\n", pos, start - 1) + 1 or pos
+                if _NON_SPACE_RE.search(text, prev_start, start - 1):
+                    break
+                start = prev_start
+
+            # 向后越过空白行，延伸到下一个非表格行
+            while True:
+                match = _NON_SPACE_RE.search(text, line_end)
+                if match is None:
+                    end = n
+                    break
+                next_start = text.rfind("\n", line_end, match.start()) + 1
+                next_end = text.find("\n", match.start())
+                if next_end < 0:
+                    next_end = n
+                if not cls._is_table_row(text, next_start, next_end):
+                    end = next_start
+                    break
+                line_end = next_end
+
+            runs.append((start, end))
+            pos = end
+        return runs
+
+    async def _overlap_start(
+        self,
+        text: str,
+        start: int,
+        end: int,
+        overlap_size: int,
+        segments: SegmentedText
+    ) -> int:
+        """
+        从区间 [start, end) 末尾提取指定真实长度的后缀，保持原子块完整性。
+        返回后缀的起始位置（无需重叠时返回 end）。
+        """
+        if overlap_size <= 0 or start >= end:
+            return end
+
+        suffix_start = end
         current_len = 0
         
-        # 反向遍历
-        for part in reversed(parts):
-            if not part: continue
-            
-            if part.startswith("<<ATOMIC_") and part.endswith(">>"):
-                # Token
-                token_content = tokens.get(part, "")
-                # 如果 Token ID 不在 tokens 中（虽然不应该），退化为 ID 长度
-                t_len = len(token_content) if token_content else len(part)
+        # 反向遍历 [text, token, text, token...] 片段
+        for part in segments.iter_parts(start, end, reverse=True):
+            part_start, part_end = part.start, part.end
+            if part.kind != SEG_TEXT:
+                t_len = part.length
                 
                 # 检查是否可以加入
                 # 策略：如果 current_len 已经接近 overlap，就不加了。
@@ -492,7 +1443,7 @@ class TextSplitterService:
                     # 已经有一定 overlap 了，放弃这个大 Token
                     break
                 
-                suffix_parts.append(part)
+                suffix_start = part_start
                 current_len += t_len
             else:
                 # 普通文本
@@ -500,267 +1451,337 @@ class TextSplitterService:
                 if needed <= 0:
                     break
                 
-                if len(part) <= needed:
-                    suffix_parts.append(part)
-                    current_len += len(part)
+                part_len = part_end - part_start
+                if part_len <= needed:
+                    suffix_start = part_start
+                    current_len += part_len
                 else:
                     # 截取后 needed 个字符
-                    suffix_parts.append(part[-needed:])
+                    suffix_start = part_end - needed
                     current_len += needed
                     break # 满足要求了
             
             if current_len >= overlap_size:
                 break
                 
-        return "".join(reversed(suffix_parts))
+        return suffix_start
 
-    async def _coarse_split_and_merge(self, text: str, merge_limit: int, tokens: Dict[str, str], overlap: int = 0) -> List[str]:
+    async def _coarse_split_and_merge(
+        self,
+        text: str,
+        merge_limit: int,
+        segments: SegmentedText,
+        overlap: int = 0
+    ) -> List[Span]:
         """
-        按一级标题 # 切分，然后进行贪婪合并。
+        按一级标题 # 切分，然后进行贪婪合并，返回各块在 text 上的区间。
         1. 识别 (?=^# ) 或 (?=\n# ) 进行切分。
         2. 遍历切分后的块，进行合并，直到达到 merge_limit。
-        3. 使用 _get_real_length 计算真实长度（展开 Token）。
+        3. 区间不切开原子块，区间长度即真实长度；标题只在普通文本中查找。
         4. (新增) 每次生成新块时，提取前一个块的 overlap 长度后缀作为新块开头。
+           后缀总是紧邻新块的原文，因此新块仍是 text 上的一个连续区间。
         """
-        # 1. Split using lookahead to keep the delimiter with the following block
-        # Pattern: Split BEFORE a newline followed by # and space, OR start of string followed by # and space
-        pattern = r"(?=(?:^|\n)# )"
-        parts = re.split(pattern, text)
+        # 1. Split BEFORE a newline followed by # and space, OR start of string followed by # and space
+        # 只记录切分位置，等价于在普通文本上 re.split(r"(?=(?:^|\n)# )", text)
+        bounds = [0]
+        pos = segments.find("\n# ", 1, len(text))
+        while pos >= 0:
+            bounds.append(pos)
+            pos = segments.find("\n# ", pos + 1, len(text))
+        bounds.append(len(text))
         
-        merged_blocks = []
-        current_block = ""
+        merged_spans: List[Span] = []
+        block_start = block_end = -1
         
-        for part in parts:
-            if not part: continue
+        for part_start, part_end in zip(bounds, bounds[1:]):
+            if part_start == part_end: continue
             
+            if block_start < 0:
+                block_start, block_end = part_start, part_end
+                continue
+
             # Check if merging exceeds limit
-            # Calculate length of (current + part)
-            temp_text = current_block + part
-            if await self._get_real_length(temp_text, tokens) <= merge_limit:
-                current_block += part
+            if part_end - block_start <= merge_limit:
+                block_end = part_end
             else:
-                # Exceeds limit, emit current_block if exists
-                if current_block:
-                    merged_blocks.append(current_block)
-                    
-                    # Calculate overlap suffix for the next block
-                    overlap_suffix = await self._extract_overlap_suffix(current_block, overlap, tokens)
-                    current_block = overlap_suffix + part
-                else:
-                    # part itself is bigger than limit?
-                    current_block = part
+                # Exceeds limit, emit current block
+                merged_spans.append((block_start, block_end))
+                
+                # Overlap suffix of the emitted block becomes the head of the next block
+                block_start = await self._overlap_start(text, block_start, block_end, overlap, segments)
+                block_end = part_end
         
-        if current_block:
-            merged_blocks.append(current_block)
+        if block_start >= 0:
+            merged_spans.append((block_start, block_end))
             
-        return merged_blocks
-
-    async def _get_real_length(self, text: str, tokens: Dict[str, str]) -> int:
-        """计算包含 Token 的文本真实长度"""
-        length = 0
-        last_pos = 0
-        for match in re.finditer(r"<<ATOMIC_\w+_\d+>>", text):
-            # 加之前文本长度
-            length += len(text[last_pos:match.start()])
-            # 加 Token 真实内容长度
-            token_id = match.group(0)
-            if token_id in tokens:
-                length += len(tokens[token_id])
-            else:
-                length += len(token_id)
-            last_pos = match.end()
-        length += len(text[last_pos:])
-        return length
+        return merged_spans
 
-    async def _refine_parent_block(self, block: str, target: int, max_limit: int, tokens: Dict[str, str]) -> List[str]:
+    async def _refine_parent_block(
+        self,
+        text: str,
+        start: int,
+        end: int,
+        target: int,
+        max_limit: int,
+        segments: SegmentedText
+    ) -> List[Span]:
         """
         父块细化：如果超过上限，内部按段落结构拆分。
         """
-        real_len = await self._get_real_length(block, tokens)
-        if real_len <= max_limit:
-            return [block]
+        if end - start <= max_limit:
+            return [(start, end)]
             
         # 超过上限，需要拆分。
         # 优先级：二级标题 > 三级标题 > 段落 (\n\n) > 换行 (\n)
         separators = ["\n## ", "\n### ", "\n#### ", "\n\n", "\n", " "]
         
         # 使用递归切分逻辑 (RecursiveCharacterSplitter 思想)
-        refined_blocks = await self._recursive_split(block, target, max_limit, tokens, separators)
-        refined_blocks = await self._merge_broken_markdown_headers(refined_blocks)
-        return refined_blocks
+        refined_spans = await self._recursive_split(text, target, max_limit, segments, separators, start, end)
+        refined_spans = await self._merge_broken_markdown_headers(segments, refined_spans)
+        return refined_spans
+
+    @staticmethod
+    def _ends_with_bare_header(segments: SegmentedText, start: int, end: int) -> bool:
+        """
+        判断区间 [start, end) 去掉末尾换行后的最后一行是否只有 '#'，
+        等价于 re.fullmatch(r"#+", block.rstrip("\r\n").splitlines()[-1].strip())，
+        但只向前扫描最后一行。原子块（图片/表格）视为非标题内容，扫描到其末尾即返回 False。
+        """
+        text = segments.text
+        atomic_end = segments.last_atomic_end(start, end)
+        floor = start if atomic_end < 0 else atomic_end
+        while end > floor and text[end - 1] in "\r\n":
+            end -= 1
+        # splitlines 不会为结尾的换行符产生空行
+        if end > floor and text[end - 1] in _LINE_BOUNDARIES:
+            end -= 1
+        line_start = end
+        while line_start > floor and text[line_start - 1] not in _LINE_BOUNDARIES:
+            ch = text[line_start - 1]
+            if ch != "#" and not ch.isspace():
+                return False
+            line_start -= 1
+        if line_start == atomic_end:
+            return False
+        last_line = text[line_start:end].strip()
+        return bool(last_line) and not last_line.strip("#")
 
-    async def _merge_broken_markdown_headers(self, blocks: List[str]) -> List[str]:
+    async def _merge_broken_markdown_headers(self, segments: SegmentedText, blocks: List[Span]) -> List[Span]:
         """
         合并在父块切分过程中被拆开的 Markdown 标题前缀。
 
         Args:
-            blocks: 细化后得到的父块列表
+            segments: 源缓冲区及其原子块
+            blocks: 细化后得到的父块区间列表（相邻区间首尾相接）
 
         Returns:
-            List[str]: 经过标题前缀修复后的父块列表
+            List[Span]: 经过标题前缀修复后的父块区间列表
         """
         if not blocks:
             return blocks
 
-        fixed_blocks: List[str] = []
+        fixed_blocks: List[Span] = []
         idx = 0
 
         while idx < len(blocks):
             current = blocks[idx]
 
-            if idx < len(blocks) - 1:
-                nxt = blocks[idx + 1]
-
-                current_stripped = current.rstrip("\r\n")
-                if current_stripped:
-                    last_line = current_stripped.splitlines()[-1]
-                else:
-                    last_line = ""
-
-                if re.fullmatch(r"#+", last_line.strip()):
-                    merged = current + nxt
-                    blocks[idx + 1] = merged
-                    idx += 1
-                    continue
+            if idx < len(blocks) - 1 and self._ends_with_bare_header(segments, current[0], current[1]):
+                blocks[idx + 1] = (current[0], blocks[idx + 1][1])
+                idx += 1
+                continue
 
             fixed_blocks.append(current)
             idx += 1
 
         return fixed_blocks
 
-    async def _recursive_split(self, text: str, target: int, max_limit: int, tokens: Dict[str, str], separators: List[str]) -> List[str]:
-        real_len = await self._get_real_length(text, tokens)
-        if real_len <= max_limit: # 使用 max_limit 作为硬性停止条件
-            return [text]
+    async def _recursive_split(
+        self,
+        text: str,
+        target: int,
+        max_limit: int,
+        segments: SegmentedText,
+        separators: List[str],
+        start: int = 0,
+        end: Optional[int] = None
+    ) -> List[Span]:
+        """
+        在 text[start:end] 区间内递归切分，返回叶子块区间。
+        区间长度即真实长度，分隔符只在普通文本中查找，不生成中间字符串。
+        """
+        if end is None:
+            end = len(text)
+
+        if end - start <= max_limit: # 使用 max_limit 作为硬性停止条件
+            return [(start, end)]
             
         if not separators:
-            return [text] # 无法再分，只能返回
+            return [(start, end)] # 无法再分，只能返回
             
         separator = separators[0]
         next_separators = separators[1:]
         
-        # 重新实现一个更简单的逻辑：
-
-        # 1. Split text by separator.
-        # 2. Re-attach separator to the correct side (usually left of the next part, or right of current).
+        # 1. Split text by separator (分隔符本身作为独立片段保留).
         #    For headers "\n## ", it effectively starts a new section.
-        #    So "Content\n## Header" -> ["Content", "## Header"]
-        
-        split_pattern = f"({re.escape(separator)})"
-        parts = re.split(split_pattern, text)
-        # parts: ["Content", "\n## ", "Header...", "\n## ", "Header2..."]
-        
-        good_blocks = []
-        current_buf = ""
+        #    So "Content\n## Header" -> ["Content", "\n## ", "Header"]
+        # 2. 贪婪合并片段，直到超过 target。
         
-        for part in parts:
-            if not part: continue
-            
-            # 检查 buffer + part 是否超限
-            # 注意：这里我们还没合并 separator。
-            # 逻辑：current_buf 累积，直到 > target (或 max)。
-            
-            temp = current_buf + part
-            if await self._get_real_length(temp, tokens) <= target:
-                current_buf += part
+        good_blocks: List[Span] = []
+        buf_start = buf_end = -1
+
+        def add_part(part_start: int, part_end: int):
+            nonlocal buf_start, buf_end
+            if part_start == part_end:
+                return
+            if buf_start < 0:
+                # buffer 为空：无论是否超限，片段都成为新 buffer
+                buf_start, buf_end = part_start, part_end
+            elif part_end - buf_start <= target:
+                buf_end = part_end
             else:
-                # current_buf 已经够了 (或者加上 part 就爆了)
-                if current_buf:
-                    good_blocks.append(current_buf)
-                current_buf = part
+                # buffer 已经够了 (或者加上 part 就爆了)
+                good_blocks.append((buf_start, buf_end))
+                buf_start, buf_end = part_start, part_end
+
+        pos = start
+        sep_len = len(separator)
+        while True:
+            found = segments.find(separator, pos, end)
+            if found < 0:
+                add_part(pos, end)
+                break
+            add_part(pos, found)
+            add_part(found, found + sep_len)
+            pos = found + sep_len
         
-        if current_buf:
-            good_blocks.append(current_buf)
+        if buf_start >= 0:
+            good_blocks.append((buf_start, buf_end))
             
         # 递归检查生成的 blocks
         result = []
-        for blk in good_blocks:
-            if await self._get_real_length(blk, tokens) > max_limit:
-                 result.extend(await self._recursive_split(blk, target, max_limit, tokens, next_separators))
+        for blk_start, blk_end in good_blocks:
+            if blk_end - blk_start > max_limit:
+                 result.extend(await self._recursive_split(
+                     text, target, max_limit, segments, next_separators, blk_start, blk_end
+                 ))
             else:
-                 result.append(blk)
+                 result.append((blk_start, blk_end))
                  
         return result
 
-    async def _split_into_sub_blocks(self, parent_block: str, sub_target: int, sub_max: int, tokens: Dict[str, str]) -> List[str]:
+    async def _split_into_sub_blocks(
+        self,
+        text: str,
+        start: int,
+        end: int,
+        sub_target: int,
+        sub_max: int,
+        segments: SegmentedText
+    ) -> List[SubBlock]:
         """
-        将父块拆分为子块。
+        将父块区间 [start, end) 拆分为子块。
         核心逻辑：
-        1. 识别 Token。
+        1. 识别原子块（Token）。
         2. Token 必须独立（前后有子块分隔符）。
         3. Token 若超限，需拆分。
         4. 普通文本按 sub_limit 拆分。
+        子块均以 text 上的区间返回；超限 Token 的拆分片段附带其文本。
         """
-        # 使用正则切分 Token
-        # pattern: (<<ATOMIC_.*?>>)
-        parts = re.split(r"(<<ATOMIC_\w+_\d+>>)", parent_block)
-        
-        sub_blocks = []
+        sub_blocks: List[SubBlock] = []
         
-        for part in parts:
-            if not part: continue
-            
-            if part.startswith("<<ATOMIC_") and part.endswith(">>"):
+        for part in segments.iter_parts(start, end):
+            part_start, part_end = part.start, part.end
+            if part.kind != SEG_TEXT:
                 # 是 Token
-                token_content = tokens.get(part, "")
+                token_content = text[part_start:part_end]
                 if not token_content: continue # Should not happen
                 
                 if len(token_content) <= sub_max:
                     # 未超限，直接作为独立子块
-                    sub_blocks.append(token_content)
+                    sub_blocks.append(SubBlock(part_start, part_end))
                 else:
                     # 超限，需要拆分
-                    if "ATOMIC_IMG" in part:
-                        sub_blocks.extend(await self._split_atomic_image(token_content, sub_max))
-                    elif "ATOMIC_TAB" in part:
-                        sub_blocks.extend(await self._split_atomic_table(token_content, sub_max))
+                    if part.kind == ATOMIC_IMG:
+                        chunks = await self._split_atomic_image(token_content, sub_max)
+                    elif part.kind == ATOMIC_TAB:
+                        chunks = await self._split_atomic_table(token_content, sub_max)
                     else:
-                        sub_blocks.append(token_content) # Fallback
+                        chunks = None # Fallback
+                    if chunks is None:
+                        sub_blocks.append(SubBlock(part_start, part_end))
+                    else:
+                        sub_blocks.extend(SubBlock(part_start, part_end, chunk) for chunk in chunks)
             else:
                 # 是普通文本
                 # 递归切分
-                text_chunks = await self._split_normal_text(part, sub_target, sub_max)
-                sub_blocks.extend(text_chunks)
+                text_chunks = await self._split_normal_text(text, part_start, part_end, sub_target, sub_max)
+                sub_blocks.extend(SubBlock(c_start, c_end) for c_start, c_end in text_chunks)
                 
         return sub_blocks
 
-    async def _split_normal_text(self, text: str, target: int, max_limit: int) -> List[str]:
-        """普通文本切分"""
-        if len(text) <= max_limit:
-            return [text]
+    async def _split_normal_text(self, text: str, start: int, end: int, target: int, max_limit: int) -> List[Span]:
+        """普通文本切分（区间版本）"""
+        if end - start <= max_limit:
+            return [(start, end)]
             
         separators = ["\n\n", "\n", "。", "！", "？", "；", ";", " ", ""]
         # 简化的递归切分
         for sep in separators:
             if sep == "":
                 # 强制切分
-                return [text[i:i+target] for i in range(0, len(text), target)]
+                return [(i, min(i + target, end)) for i in range(start, end, target)]
             
-            if sep in text:
-                parts = text.split(sep)
-                chunks = []
-                current = ""
-                for p in parts:
-                    if len(current) + len(p) + len(sep) <= target:
-                        current += (sep if current else "") + p
+            if text.find(sep, start, end) >= 0:
+                sep_len = len(sep)
+                chunks: List[Span] = []
+                # 当前块区间；cur_start == cur_end 表示当前块为空
+                cur_start = cur_end = start
+                p_start = start
+                while p_start <= end:
+                    p_end = text.find(sep, p_start, end)
+                    if p_end < 0:
+                        p_end = end
+                    if (cur_end - cur_start) + (p_end - p_start) + sep_len <= target:
+                        if cur_end > cur_start:
+                            cur_end = p_end
+                        else:
+                            cur_start, cur_end = p_start, p_end
                     else:
-                        if current: chunks.append(current)
-                        current = p
-                if current: chunks.append(current)
+                        if cur_end > cur_start: chunks.append((cur_start, cur_end))
+                        cur_start, cur_end = p_start, p_end
+                    p_start = p_end + sep_len
+                if cur_end > cur_start: chunks.append((cur_start, cur_end))
                 
                 # Check valid
-                final = []
-                valid = True
-                for c in chunks:
-                    if len(c) > max_limit:
-                        valid = False
-                        break
-                
-                if valid:
+                if all(c_end - c_start <= max_limit for c_start, c_end in chunks):
                     return chunks
                 # else continue next sep
         
-        return [text] # Should not reach here if sep="" exists
+        return [(start, end)] # Should not reach here if sep="" exists
+
+    @staticmethod
+    def _to_sub_blocks(source: str, pieces: List[SubBlock]) -> List[SubBlock]:
+        """原文切片去除首尾空白、替代文本 strip，并丢弃空子块"""
+        result: List[SubBlock] = []
+        for p_start, p_end, text in pieces:
+            if text is not None:
+                stripped = text.strip()
+                if stripped:
+                    result.append(SubBlock(p_start, p_end, stripped))
+                continue
+            while p_start < p_end and source[p_start].isspace():
+                p_start += 1
+            while p_end > p_start and source[p_end - 1].isspace():
+                p_end -= 1
+            if p_end > p_start:
+                result.append(SubBlock(p_start, p_end))
+        return result
+
+    @staticmethod
+    def _sub_block_texts(source: str, subs: List[SubBlock]) -> List[str]:
+        """取出各子块的文本"""
+        return [source[sub.start:sub.end] if sub.text is None else sub.text for sub in subs]
 
     async def _split_atomic_image(self, content: str, limit: int) -> List[str]:
         """
@@ -824,7 +1845,19 @@ class TextSplitterService:
         return chunks
 
 
-text_splitter_service = TextSplitterService()
+def _build_result_cache() -> Optional[ResultCache]:
+    """根据配置创建分块结果缓存，未启用时返回 None"""
+    if not settings.TEXT_SPLITTER_CACHE_ENABLED:
+        return None
+    return ResultCache(
+        max_bytes=settings.TEXT_SPLITTER_CACHE_MAX_BYTES,
+        ttl=settings.TEXT_SPLITTER_CACHE_TTL,
+        disk_dir=settings.TEXT_SPLITTER_CACHE_DIR,
+        disk_max_bytes=settings.TEXT_SPLITTER_CACHE_DISK_MAX_BYTES,
+    )
+
+
+text_splitter_service = TextSplitterService(cache=_build_result_cache())
 
 
 # if __name__ == "__main__":
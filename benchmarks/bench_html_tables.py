@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+HTML 表格转换性能基准（含病态输入）
+
+对每类输入按规模倍增统计 convert_html_tables 的耗时，耗时应随规模线性增长。
+--legacy 同时统计旧版嵌套正则实现（未闭合 <table> 等输入上呈平方级增长，规模较大时非常慢）。
+
+用法:
+    python benchmarks/bench_html_tables.py --sizes 5000 10000 20000 --legacy
+"""
+import argparse
+import html
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.html_table import HtmlTableConverter, convert_html_tables
+
+_LEGACY_TABLE_RE = re.compile(r"<table\b[^>]*>(.*?)</table>", re.I | re.S)
+_LEGACY_TR_RE = re.compile(r"<tr\b[^>]*>(.*?)</tr>", re.I | re.S)
+_LEGACY_CELL_RE = re.compile(r"<t(?:d|h)\b[^>]*>(.*?)</t(?:d|h)>", re.I | re.S)
+_LEGACY_TAG_RE = re.compile(r"<[^>]+>")
+
+
+def legacy_convert(text: str) -> str:
+    """旧版实现：惰性 (.*?) 表格正则 + 嵌套 tr / td 正则"""
+    def table_to_md(match) -> str:
+        rows = []
+        for row_html in _LEGACY_TR_RE.findall(match.group(1)):
+            row = [
+                html.unescape(_LEGACY_TAG_RE.sub("", c)).strip().replace("|", "\\|")
+                for c in _LEGACY_CELL_RE.findall(row_html)
+            ]
+            if row:
+                rows.append(row)
+        if not rows:
+            return match.group(0)
+        col_count = max(len(r) for r in rows)
+        rows = [r + [""] * (col_count - len(r)) for r in rows]
+        lines = ["| " + " | ".join(rows[0]) + " |", "| " + " | ".join(["----------"] * col_count) + " |"]
+        lines += ["| " + " | ".join(r) + " |" for r in rows[1:]]
+        return "\n\n" + "\n".join(lines) + "\n\n"
+
+    return _LEGACY_TABLE_RE.sub(table_to_md, text)
+
+
+# 输入规模 n -> 文档
+CASES = {
+    # 规整的大表格
+    "well_formed": lambda n: "<table>" + "<tr><td>数据 &amp; 值</td><td><b>x</b></td></tr>\n" * n + "</table>",
+    # OCR 常见：大量未闭合的 <table>，旧实现对每个 <table> 都扫描到文末
+    "unclosed_tables": lambda n: "<table><tr><td>x" * n,
+    # 一个未闭合的 <table> 后跟大量行
+    "unclosed_table": lambda n: "<table>" + "<tr><td>x</td></tr>" * n,
+    # 大量不构成标签的 '<'
+    "bare_lt": lambda n: "<table><tr><td>" + "<a" * n + "</td></tr></table>",
+    # 大量 '<table' 前缀但没有 '>'
+    "table_prefix": lambda n: "<table" * n,
+    # 合并单元格
+    "spans": lambda n: "<table>" + '<tr><td rowspan="2" colspan="2">A</td><td>b</td></tr><tr><td>c</td></tr>' * n + "</table>",
+}
+
+
+def _time(func, text: str) -> float:
+    start = time.perf_counter()
+    func(text)
+    return time.perf_counter() - start
+
+
+def _chunked(text: str, chunk_size: int = 64 * 1024) -> str:
+    converter = HtmlTableConverter()
+    parts = [converter.feed(text[i:i + chunk_size]) for i in range(0, len(text), chunk_size)]
+    parts.append(converter.close())
+    return "".join(parts)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="HTML table converter benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5000, 10000, 20000, 40000])
+    parser.add_argument("--cases", nargs="+", default=list(CASES), choices=list(CASES))
+    parser.add_argument("--legacy", action="store_true", help="同时统计旧版正则实现")
+    args = parser.parse_args()
+
+    for name in args.cases:
+        for n in args.sizes:
+            text = CASES[name](n)
+            line = f"{name:<16} n={n:<7} chars={len(text):<9} new={_time(convert_html_tables, text):.4f}s"
+            line += f" chunked={_time(_chunked, text):.4f}s"
+            if args.legacy:
+                line += f" legacy={_time(legacy_convert, text):.4f}s"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+短文档吞吐基准
+
+模拟高 QPS 的短文档请求：生成大量小的合成文档（段落、标题、表格、图片块），
+在单个事件循环内逐个调用 TextSplitterService.split（inline 执行、不启用结果缓存），
+统计每秒处理的文档数。短文档下正则查找/编译等固定开销占比最高。
+--batch N 改为每次 split_batch 提交 N 篇文档，可配合 --executor 比较打包派发到线程池/进程池的效果。
+
+用法:
+    python benchmarks/bench_small_documents.py --docs 5000 --size 2000
+    python benchmarks/bench_small_documents.py --docs 5000 --batch 200 --executor process
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_text_splitter import generate_document
+from app.services.text_splitter_service import TextSplitterService
+
+HTML_TABLE = "<table><tr><th>名称</th><th>数值</th></tr><tr><td>A</td><td>1</td></tr><tr><td>B</td><td>2</td></tr></table>"
+
+
+async def run(docs: int, size: int, repeat: int, mode: str, batch: int, executor: str) -> None:
+    documents = []
+    for seed in range(docs):
+        doc = generate_document(size, seed)
+        # 每 4 篇插入一个 HTML 表格，覆盖 HTML 转换路径
+        if seed % 4 == 0:
+            doc = HTML_TABLE + "\n" + doc
+        documents.append(doc)
+    service = TextSplitterService(executor_mode=executor)
+    params = dict(parent_block_size=1280, sub_block_size=512, parent_separator="/--P--/", preview_url="http://example.com/a.png")
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        if batch:
+            for i in range(0, docs, batch):
+                await service.split_batch([{"content": doc} for doc in documents[i:i + batch]], mode=mode, **params)
+        else:
+            for doc in documents:
+                await service.split(mode, doc, **params)
+        timings.append(time.perf_counter() - start)
+    service.shutdown()
+    best = min(timings)
+    print(f"mode={mode} docs={docs} avg_size={sum(map(len, documents)) // docs} chars batch={batch} executor={executor}")
+    print(f"best={best:.3f}s ({docs / best:.0f} docs/s, {best / docs * 1e6:.1f} us/doc) repeat={repeat}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="TextSplitterService short document benchmark")
+    parser.add_argument("--docs", type=int, default=5000, help="文档数量")
+    parser.add_argument("--size", type=int, default=2000, help="每篇文档字符数")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--mode", default="pdf")
+    parser.add_argument("--batch", type=int, default=0, help="每次 split_batch 的文档数，0 表示逐篇调用 split")
+    parser.add_argument("--executor", default="inline", choices=TextSplitterService.EXECUTOR_MODES)
+    args = parser.parse_args()
+    asyncio.run(run(args.docs, args.size, args.repeat, args.mode, args.batch, args.executor))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+文本分块性能基准
+
+生成模拟 OCR PDF 输出的合成文档（段落、标题、Markdown 表格、图片解析块），
+并统计 TextSplitterService.split 的耗时。
+
+用法:
+    python benchmarks/bench_text_splitter.py --size 5000000 --repeat 3
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.text_splitter_service import TextSplitterService
+
+WORDS = [
+    "合同", "条款", "数据", "模型", "分析", "结果", "系统", "服务", "接口", "文档",
+    "contract", "clause", "revenue", "model", "service", "report", "page", "value",
+]
+PUNCTUATION = ["。", "，", "；", "！", "？", " ", " ", " "]
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return "".join(rng.choice(WORDS) + rng.choice(PUNCTUATION) for _ in range(words))
+
+
+def _table(rng: random.Random, rows: int, cols: int) -> str:
+    lines = [
+        "| " + " | ".join(f"列{i}" for i in range(cols)) + " |",
+        "| " + " | ".join("---" for _ in range(cols)) + " |",
+    ]
+    for _ in range(rows):
+        lines.append("| " + " | ".join(_sentence(rng, 2) for _ in range(cols)) + " |")
+    return "\n".join(lines)
+
+
+def _image(rng: random.Random) -> str:
+    body = "\n".join(_sentence(rng, 12) for _ in range(rng.randint(1, 6)))
+    return f"【图片解析内容：{body}】"
+
+
+def generate_document(size: int, seed: int = 42) -> str:
+    """生成约 size 个字符的合成文档（大部分为长段落，夹杂标题、表格与图片块）"""
+    rng = random.Random(seed)
+    parts = []
+    total = 0
+    while total < size:
+        roll = rng.random()
+        if roll < 0.01:
+            piece = "# " + _sentence(rng, 4)
+        elif roll < 0.04:
+            piece = "## " + _sentence(rng, 4)
+        elif roll < 0.06:
+            piece = _table(rng, rng.randint(3, 30), rng.randint(2, 6))
+        elif roll < 0.08:
+            piece = _image(rng)
+        else:
+            # OCR 段落：单换行折行，较少空行
+            piece = " ".join(_sentence(rng, rng.randint(20, 60)) for _ in range(rng.randint(1, 8)))
+        parts.append(piece)
+        total += len(piece) + 1
+    return "\n".join(parts)
+
+
+async def run(size: int, repeat: int, mode: str, overlap: int) -> None:
+    content = generate_document(size)
+    service = TextSplitterService()
+    timings = []
+    result = {}
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = await service.split(mode, content, 1280, 512, overlap=overlap)
+        timings.append(time.perf_counter() - start)
+    print(f"mode={mode} input={len(content)} chars output={len(result['result'])} chars")
+    print(f"best={min(timings):.3f}s mean={sum(timings) / len(timings):.3f}s (repeat={repeat})")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="TextSplitterService benchmark")
+    parser.add_argument("--size", type=int, default=5 * 1024 * 1024, help="合成文档字符数")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--mode", default="pdf")
+    parser.add_argument("--overlap", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(run(args.size, args.repeat, args.mode, args.overlap))
+
+
+if __name__ == "__main__":
+    main()
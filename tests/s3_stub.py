@@ -0,0 +1,220 @@
+"""
+内存版 S3 (MinIO 兼容) 桩服务，供异步 S3 客户端测试使用
+
+ASGI 应用，配合 httpx.ASGITransport 使用，无需启动真实服务。
+每个请求都用 MinIO SDK 的签名实现重新计算 SigV4 签名并校验请求体哈希（预签名 URL 校验查询参数签名与有效期），
+签名不一致时返回 403。
+"""
+import re
+import uuid
+import base64
+import hashlib
+import urllib.parse
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from xml.sax.saxutils import escape
+import xml.etree.ElementTree as ET
+
+from minio.credentials import Credentials
+from minio.signer import presign_v4, sign_v4_s3
+
+ACCESS_KEY = "stub-access"
+SECRET_KEY = "stub-secret"
+REGION = "us-east-1"
+
+_AUTH_RE = re.compile(r"Credential=([^,]+), SignedHeaders=([^,]+), Signature=([0-9a-f]+)")
+
+
+class S3Stub:
+    def __init__(self):
+        self.buckets = {}  # bucket -> {key: (data, content_type, etag, last_modified)}
+        self.uploads = {}  # upload_id -> (content_type, {part_number: (data, etag)})
+        self.requests = []  # (method, path, query)
+        self.protected = set()  # 批量删除时返回 AccessDenied 的对象名
+        self.encodings = {}  # key -> 对象的 Content-Encoding（如 gzip），读取时原样返回该响应头
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        method = scope["method"]
+        raw_path = scope.get("raw_path") or scope["path"].encode()
+        path = urllib.parse.unquote(raw_path.decode())
+        query = dict(urllib.parse.parse_qsl(scope["query_string"].decode(), keep_blank_values=True))
+        headers = {k.decode().lower(): v.decode() for k, v in scope["headers"]}
+        self.requests.append((method, path, query))
+
+        if not self._check_signature(method, raw_path.decode(), query, headers, body):
+            status, extra, payload = self._error(403, "SignatureDoesNotMatch", path)
+        else:
+            status, extra, payload = self._handle(method, path, query, headers, body)
+        if method == "HEAD":
+            payload = b""
+        response_headers = [(k.encode(), str(v).encode()) for k, v in extra.items()]
+        if "content-length" not in extra:
+            response_headers.append((b"content-length", str(len(payload)).encode()))
+        await send({"type": "http.response.start", "status": status, "headers": response_headers})
+        await send({"type": "http.response.body", "body": payload})
+
+    # -------- 签名校验 --------
+
+    def _check_signature(self, method, raw_path, query, headers, body) -> bool:
+        if "X-Amz-Signature" in query:
+            return self._check_presigned(method, raw_path, query, headers)
+        match = _AUTH_RE.search(headers.get("authorization", ""))
+        if not match:
+            return False
+        credential, signed_headers, _ = match.groups()
+        if not credential.startswith(ACCESS_KEY + "/"):
+            return False
+        content_sha256 = headers.get("x-amz-content-sha256", "")
+        if content_sha256 != "UNSIGNED-PAYLOAD" and content_sha256 != hashlib.sha256(body).hexdigest():
+            return False
+        date = datetime.strptime(headers["x-amz-date"], "%Y%m%dT%H%M%SZ").replace(tzinfo=timezone.utc)
+        canonical_query = "&".join(
+            f"{urllib.parse.quote(k, safe='-_.~')}={urllib.parse.quote(v, safe='-_.~')}" for k, v in sorted(query.items())
+        )
+        url = urllib.parse.SplitResult("http", headers["host"], raw_path, canonical_query, "")
+        expected = sign_v4_s3(
+            method=method,
+            url=url,
+            region=REGION,
+            headers={name: headers[name] for name in signed_headers.split(";")},
+            credentials=Credentials(ACCESS_KEY, SECRET_KEY),
+            content_sha256=content_sha256,
+            date=date,
+        )
+        return expected["Authorization"] == headers["authorization"]
+
+    def _check_presigned(self, method, raw_path, query, headers) -> bool:
+        if not query.get("X-Amz-Credential", "").startswith(ACCESS_KEY + "/"):
+            return False
+        date = datetime.strptime(query["X-Amz-Date"], "%Y%m%dT%H%M%SZ").replace(tzinfo=timezone.utc)
+        expires = int(query["X-Amz-Expires"])
+        if (datetime.now(timezone.utc) - date).total_seconds() > expires:
+            return False
+        rest = "&".join(
+            f"{urllib.parse.quote(k, safe='-_.~')}={urllib.parse.quote(v, safe='-_.~')}"
+            for k, v in query.items() if not k.startswith("X-Amz-")
+        )
+        url = presign_v4(
+            method=method,
+            url=urllib.parse.SplitResult("http", headers["host"], raw_path, rest, ""),
+            region=REGION,
+            credentials=Credentials(ACCESS_KEY, SECRET_KEY),
+            date=date,
+            expires=expires,
+        )
+        expected = dict(urllib.parse.parse_qsl(url.query))["X-Amz-Signature"]
+        return expected == query["X-Amz-Signature"]
+
+    # -------- 请求处理 --------
+
+    @staticmethod
+    def _error(status, code, resource):
+        body = (
+            f"<?xml version=\"1.0\" encoding=\"UTF-8\"?><Error><Code>{code}</Code><Message>{code}</Message>"
+            f"<Resource>{escape(resource)}</Resource><RequestId>stub</RequestId></Error>"
+        ).encode()
+        return status, {"content-type": "application/xml"}, body
+
+    def _handle(self, method, path, query, headers, body):
+        bucket, _, key = path.lstrip("/").partition("/")
+        if not key:
+            if method == "HEAD":
+                return (200, {}, b"") if bucket in self.buckets else (404, {}, b"")
+            if method == "PUT":
+                self.buckets.setdefault(bucket, {})
+                return 200, {}, b""
+            if method == "POST" and "delete" in query and bucket in self.buckets:
+                return self._handle_delete_objects(self.buckets[bucket], headers, body, path)
+            return self._error(405, "MethodNotAllowed", path)
+
+        objects = self.buckets.get(bucket)
+        if objects is None:
+            return self._error(404, "NoSuchBucket", path)
+
+        if method == "POST" and "uploads" in query:
+            upload_id = uuid.uuid4().hex
+            self.uploads[upload_id] = (headers.get("content-type", "application/octet-stream"), {})
+            xml = f"<InitiateMultipartUploadResult><UploadId>{upload_id}</UploadId></InitiateMultipartUploadResult>"
+            return 200, {"content-type": "application/xml"}, xml.encode()
+        if "uploadId" in query:
+            return self._handle_multipart(method, objects, key, query, headers, body, path)
+
+        if method == "PUT":
+            etag = hashlib.md5(body).hexdigest()
+            objects[key] = (body, headers.get("content-type", "application/octet-stream"), etag, datetime.now(timezone.utc))
+            return 200, {"etag": f'"{etag}"'}, b""
+        if method == "DELETE":
+            # S3 删除是幂等的：对象不存在也返回 204
+            objects.pop(key, None)
+            return 204, {}, b""
+        if key not in objects:
+            return self._error(404, "NoSuchKey", path)
+        data, content_type, etag, last_modified = objects[key]
+        meta = {
+            "etag": f'"{etag}"',
+            "content-type": content_type,
+            "content-length": str(len(data)),
+        }
+        if last_modified is not None:
+            meta["last-modified"] = format_datetime(last_modified, usegmt=True)
+        if key in self.encodings:
+            meta["content-encoding"] = self.encodings[key]
+        if_match = headers.get("if-match")
+        if if_match and if_match.strip('"') != etag:
+            return self._error(412, "PreconditionFailed", path)
+        if method == "GET" and "range" in headers:
+            match = re.fullmatch(r"bytes=(\d+)-(\d*)", headers["range"])
+            start = int(match.group(1))
+            if start >= len(data):
+                return self._error(416, "InvalidRange", path)
+            end = min(int(match.group(2)) if match.group(2) else len(data) - 1, len(data) - 1)
+            meta.update({"content-length": str(end - start + 1), "content-range": f"bytes {start}-{end}/{len(data)}"})
+            return 206, meta, data[start:end + 1]
+        if method in ("HEAD", "GET"):
+            return 200, meta, data
+        return self._error(405, "MethodNotAllowed", path)
+
+    def _handle_multipart(self, method, objects, key, query, headers, body, path):
+        upload_id = query["uploadId"]
+        if upload_id not in self.uploads:
+            return self._error(404, "NoSuchUpload", path)
+        content_type, parts = self.uploads[upload_id]
+        if method == "PUT":
+            etag = hashlib.md5(body).hexdigest()
+            parts[int(query["partNumber"])] = (body, etag)
+            return 200, {"etag": f'"{etag}"'}, b""
+        if method == "DELETE":
+            del self.uploads[upload_id]
+            return 204, {}, b""
+        # CompleteMultipartUpload
+        numbers = [int(n) for n in re.findall(r"<PartNumber>(\d+)</PartNumber>", body.decode())]
+        data = b"".join(parts[n][0] for n in numbers)
+        etag = hashlib.md5(b"".join(bytes.fromhex(parts[n][1]) for n in numbers)).hexdigest() + f"-{len(numbers)}"
+        objects[key] = (data, content_type, etag, datetime.now(timezone.utc))
+        del self.uploads[upload_id]
+        xml = f"<CompleteMultipartUploadResult><Key>{escape(key)}</Key><ETag>\"{etag}\"</ETag></CompleteMultipartUploadResult>"
+        return 200, {"content-type": "application/xml"}, xml.encode()
+
+    def _handle_delete_objects(self, objects, headers, body, path):
+        """DeleteObjects：不存在的对象视为删除成功，protected 中的对象返回 AccessDenied"""
+        if headers.get("content-md5") != base64.b64encode(hashlib.md5(body).digest()).decode():
+            return self._error(400, "BadDigest", path)
+        keys = [el.text for el in ET.fromstring(body).iter() if el.tag.endswith("Key")]
+        if len(keys) > 1000:
+            return self._error(400, "MalformedXML", path)
+        errors = []
+        for key in keys:
+            if key in self.protected:
+                errors.append(f"<Error><Key>{escape(key)}</Key><Code>AccessDenied</Code><Message>Access Denied.</Message></Error>")
+            else:
+                objects.pop(key, None)
+        xml = "<DeleteResult xmlns=\"http://s3.amazonaws.com/doc/2006-03-01/\">" + "".join(errors) + "</DeleteResult>"
+        return 200, {"content-type": "application/xml"}, xml.encode()
@@ -0,0 +1,55 @@
+import time
+import pytest
+from app.core.html_table import HtmlTableConverter, convert_html_tables
+
+def test_convert_basic_table():
+    text = "前言<TABLE border=1><tr><th>名称</th><th>说明</th></tr><tr><td><b>a|b</b></td><td>x &amp; y</td></tr></TABLE>结尾"
+    assert convert_html_tables(text) == (
+        "前言\n\n| 名称 | 说明 |\n| ---------- | ---------- |\n| a\\|b | x & y |\n\n结尾"
+    )
+
+def test_convert_rowspan_colspan():
+    text = (
+        '<table><tr><th colspan="2">季度</th><th>备注</th></tr>'
+        "<tr><td rowspan=2>A</td><td>1</td><td>x</td></tr>"
+        "<tr><td>2</td><td>y</td></tr></table>"
+    )
+    assert convert_html_tables(text).strip().split("\n") == [
+        "| 季度 | 季度 | 备注 |",
+        "| ---------- | ---------- | ---------- |",
+        "| A | 1 | x |",
+        "| A | 2 | y |",
+    ]
+
+def test_unclosed_or_empty_table_kept_verbatim():
+    assert convert_html_tables("<table><tr><td>x") == "<table><tr><td>x"
+    assert convert_html_tables("a<table></table>b") == "a<table></table>b"
+    # 未闭合的单元格由下一个单元格隐式结束
+    assert "| a | b |" in convert_html_tables("<table><tr><td>a<td>b</tr></table>")
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 64])
+def test_chunked_feed_matches_one_shot(chunk_size):
+    text = (
+        "x < y <tab <table class='t'><tr><td>1</td><td colspan=2>&lt;2&gt;</td></tr>"
+        "<tr><td>3<br/>4</td></tr></table> tail <table><tr><td>open"
+    )
+    converter = HtmlTableConverter()
+    parts = [converter.feed(text[i:i + chunk_size]) for i in range(0, len(text), chunk_size)]
+    parts.append(converter.close())
+    assert "".join(parts) == convert_html_tables(text)
+
+def _best_runtime(func, arg, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(arg)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def test_pathological_input_is_linear():
+    # 旧版嵌套正则在这些输入上呈平方级耗时；输入放大 4 倍后比较耗时比值（线性约 4，平方级约 16）
+    makers = (lambda n: "<table><tr><td>x" * n, lambda n: "<table" * n, lambda n: "<table><td>" + "<a" * n)
+    for make, n in zip(makers, (5000, 12500, 25000)):
+        small = _best_runtime(convert_html_tables, make(n))
+        large = _best_runtime(convert_html_tables, make(4 * n))
+        assert large / small < 10
@@ -5,7 +5,8 @@ from io import BytesIO
 from datetime import datetime
 from minio.error import S3Error
 from app.services.minio_service import MinioService
-from app.exceptions import FileValidationError, FileUploadError, FileDownloadError
+from app.core.bounded_executor import BoundedExecutor
+from app.exceptions import FileValidationError, FileUploadError, FileDownloadError, ServiceBusyError
 
 # Mock settings
 @pytest.fixture
@@ -16,6 +17,9 @@ def mock_settings():
         mock.MAX_FILE_SIZE = 1024 * 1024
         mock.MINIO_CONSOLE_ENDPOINT = "localhost:9001"
         mock.MINIO_SECURE = False
+        mock.MINIO_CLIENT_BACKEND = "sdk"
+        mock.MINIO_INFO_CACHE_ENABLED = False
+        mock.MINIO_UPLOAD_DEDUP = False
         yield mock
 
 # Mock Minio Client
@@ -25,6 +29,7 @@ def mock_minio_client():
         mock_manager = MagicMock()
         mock_client = MagicMock()
         mock_manager.get_client.return_value = mock_client
+        mock_manager.get_executor.return_value = BoundedExecutor(max_workers=2, queue_size=10)
         mock_get.return_value = mock_manager
         yield mock_client
 
@@ -106,3 +111,585 @@ async def test_delete_file_not_found(service, mock_minio_client):
     with pytest.raises(FileDownloadError) as exc:
         await service.delete_file("test.txt")
     assert exc.value.code == "FILE_NOT_FOUND"
+
+@pytest.mark.asyncio
+async def test_delete_file_idempotent_skips_stat(service, mock_minio_client):
+    # 幂等删除只发送 remove_object，对象不存在也返回成功
+    mock_minio_client.stat_object.side_effect = AssertionError("stat_object should not be called")
+    
+    result = await service.delete_file("test.txt", check_exists=False)
+    
+    assert result['deleted'] is True and result['existence_checked'] is False
+    mock_minio_client.remove_object.assert_called_once_with("test-bucket", "test.txt")
+
+@pytest.mark.asyncio
+async def test_read_text_decodes_across_chunks(service, mock_minio_client):
+    # Setup: 多字节字符跨越块边界，带 BOM
+    data = "\ufeff中文内容".encode("utf-8")
+    response = MagicMock()
+    response.stream.return_value = [data[i:i + 2] for i in range(0, len(data), 2)]
+    mock_minio_client.get_object.return_value = response
+    
+    # Execute
+    text = await service.read_text("doc.txt")
+    
+    # Verify
+    assert text == "中文内容"
+    response.release_conn.assert_called_once()
+    
+    response.stream.return_value = [b"\xff\xfe"]
+    with pytest.raises(FileValidationError) as exc:
+        await service.read_text("doc.txt")
+    assert exc.value.code == "INVALID_ENCODING"
+
+@pytest.mark.asyncio
+async def test_put_text_success(service, mock_minio_client):
+    mock_minio_client.put_object.return_value = MagicMock(etag="e1")
+    
+    result = await service.put_text("out.txt", "分块结果")
+    
+    assert result['size'] == len("分块结果".encode("utf-8"))
+    assert result['etag'] == "e1"
+    _, kwargs = mock_minio_client.put_object.call_args
+    assert kwargs['data'].read() == "分块结果".encode("utf-8")
+
+@pytest.mark.asyncio
+async def test_upload_file_streams_in_parts(service, mock_settings, mock_minio_client):
+    import hashlib
+    mock_settings.MINIO_UPLOAD_PART_SIZE = 5 * 1024 * 1024
+    mock_settings.MINIO_UPLOAD_PARALLEL_PARTS = 1
+    mock_settings.MAX_FILE_SIZE = 10
+    
+    def put_object(**kwargs):
+        # 模拟 SDK 按分片读取；读取超过 MAX_FILE_SIZE 时中止
+        while kwargs['data'].read(4):
+            pass
+        return MagicMock(etag="e")
+    mock_minio_client.put_object.side_effect = put_object
+    
+    result = await service.upload_file(BytesIO(b"0123456789"), "a.txt")
+    assert result['file_size'] == 10
+    _, kwargs = mock_minio_client.put_object.call_args
+    assert kwargs['part_size'] == 5 * 1024 * 1024
+    
+    # 可 seek 的文件在发送数据之前按文件大小拒绝
+    mock_minio_client.put_object.reset_mock()
+    with pytest.raises(FileValidationError):
+        await service.upload_file(BytesIO(b"0123456789 more data"), "a.txt")
+    mock_minio_client.put_object.assert_not_called()
+    
+    # 不可 seek 的流：大小未知，上传过程中超过限制时被拦截
+    class Pipe:
+        def __init__(self, data):
+            self._buf = BytesIO(data)
+        def read(self, size=-1):
+            return self._buf.read(size)
+    with pytest.raises(FileValidationError) as exc:
+        await service.upload_file(Pipe(b"0123456789 more data"), "a.txt")
+    assert exc.value.code == "FILE_TOO_LARGE"
+    _, kwargs = mock_minio_client.put_object.call_args
+    assert kwargs['length'] == -1
+    
+    # 没有扩展名时按第一块数据的文件头检测类型，不支持的类型在上传数据之前失败
+    result = await service.upload_file(Pipe(b"\xff\xd8\xff\xe0 jpeg"), "noext")
+    assert result['file_size'] == 9 and result['content_md5'] == hashlib.md5(b"\xff\xd8\xff\xe0 jpeg").hexdigest()
+    with pytest.raises(FileValidationError) as exc:
+        await service.upload_file(Pipe(b"\x00\xff\xfe binary"), "noext")
+    assert exc.value.code == "UNSUPPORTED_FILE_TYPE"
+
+@pytest.mark.asyncio
+async def test_httpx_backend_against_stub(mock_settings, monkeypatch):
+    import httpx
+    from app.core import s3_async
+    from app.core.s3_async import AsyncS3Client
+    from s3_stub import S3Stub, ACCESS_KEY, SECRET_KEY
+    
+    mock_settings.MINIO_CLIENT_BACKEND = "httpx"
+    mock_settings.MINIO_UPLOAD_PART_SIZE = 4
+    monkeypatch.setattr(s3_async, "MIN_PART_SIZE", 4)
+    stub = S3Stub()
+    client = AsyncS3Client("stub:9000", ACCESS_KEY, SECRET_KEY, transport=httpx.ASGITransport(app=stub))
+    with patch("app.services.minio_service.get_minio_client") as mock_get:
+        mock_get.return_value.get_async_client.return_value = client
+        mock_get.return_value.get_executor.return_value = BoundedExecutor(max_workers=2, queue_size=10)
+        service = MinioService()
+    
+    # 上传走分片（10 字节 / 4 字节分片），不经过 SDK 客户端
+    result = await service.upload_file(BytesIO(b"0123456789"), "a.txt", object_name="a.txt")
+    assert stub.buckets["test-bucket"]["a.txt"][0] == b"0123456789"
+    assert result['file_size'] == 10
+    info = await service.get_file_info("a.txt")
+    assert info['size'] == 10 and info['content_type'] == "text/plain"
+    
+    await service.put_text("doc.txt", "中文内容")
+    assert await service.read_text("doc.txt") == "中文内容"
+    
+    assert (await service.delete_file("a.txt"))['deleted'] is True
+    with pytest.raises(FileDownloadError) as exc:
+        await service.delete_file("a.txt")
+    assert exc.value.code == "FILE_NOT_FOUND"
+    before = len(stub.requests)
+    assert (await service.delete_file("a.txt", check_exists=False))['deleted'] is True
+    assert [r[0] for r in stub.requests[before:]] == ["DELETE"]
+    mock_get.return_value.get_client.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_bounded_executor_rejects_when_saturated(service, mock_minio_client):
+    import threading
+    executor = BoundedExecutor(max_workers=1, queue_size=1)
+    service.client_manager.get_executor.return_value = executor
+    service._bucket_checked = True
+    release = threading.Event()
+    mock_minio_client.stat_object.side_effect = lambda *args: release.wait(5) and MagicMock(size=1, last_modified=datetime.now())
+    
+    # 1 个执行中 + 1 个排队，第 3 个请求立即被拒绝
+    running = [asyncio.create_task(service.get_file_info(f"{i}.txt")) for i in range(2)]
+    await asyncio.sleep(0.05)
+    with pytest.raises(ServiceBusyError):
+        await service.get_file_info("3.txt")
+    stats = executor.stats()
+    assert stats["active"] == 1 and stats["queued"] == 1 and stats["rejected"] == 1
+    
+    release.set()
+    await asyncio.gather(*running)
+    stats = executor.stats()
+    assert stats["completed"] == 2 and stats["queued"] == 0 and stats["wait_ms_max"] > 0
+    executor.shutdown()
+
+@pytest.mark.asyncio
+async def test_delete_files_and_get_files_info(service, mock_settings, mock_minio_client):
+    import time
+    import threading
+    from minio.deleteobjects import DeleteError
+    mock_settings.MINIO_BATCH_MAX_OBJECTS = 10
+    mock_settings.MINIO_BATCH_CONCURRENCY = 2
+    deleted = []
+    
+    def remove_objects(bucket, delete_objects):
+        # 与 SDK 一致：返回惰性迭代器，遍历时才执行删除
+        for obj in delete_objects:
+            if obj.name == "locked.txt":
+                yield DeleteError("AccessDenied", "Access Denied.", obj.name, None)
+            else:
+                deleted.append(obj.name)
+    mock_minio_client.remove_objects.side_effect = remove_objects
+    
+    result = await service.delete_files(["a.txt", "locked.txt", "a.txt", "b.txt"])
+    assert deleted == ["a.txt", "b.txt"]
+    assert result['deleted'] == 2 and result['failed'] == 1
+    assert [r['object_name'] for r in result['results']] == ["a.txt", "locked.txt", "b.txt"]
+    assert result['results'][1] == {'object_name': "locked.txt", 'deleted': False, 'error': "Access Denied.", 'code': "AccessDenied"}
+    mock_minio_client.stat_object.assert_not_called()
+    
+    # 并发 stat 不超过 MINIO_BATCH_CONCURRENCY，不存在的对象单独记录错误
+    lock = threading.Lock()
+    running = {"now": 0, "max": 0}
+    def stat_object(bucket, name):
+        with lock:
+            running["now"] += 1
+            running["max"] = max(running["max"], running["now"])
+        time.sleep(0.02)
+        with lock:
+            running["now"] -= 1
+        if name == "missing.txt":
+            raise S3Error(code="NoSuchKey", message="Not Found", resource="/test", request_id="1", host_id="1", response="response")
+        return MagicMock(size=1, last_modified=datetime(2024, 1, 1), etag="e", content_type="text/plain")
+    mock_minio_client.stat_object.side_effect = stat_object
+    service.client_manager.get_executor.return_value = BoundedExecutor(max_workers=4, queue_size=10)
+    
+    result = await service.get_files_info(["1.txt", "missing.txt", "2.txt", "3.txt"])
+    assert result['found'] == 3 and result['failed'] == 1
+    assert result['results'][1] == {'object_name': "missing.txt", 'error': "文件不存在", 'code': "FILE_NOT_FOUND"}
+    assert result['results'][3]['size'] == 1
+    assert running["max"] == 2
+    
+    with pytest.raises(FileValidationError):
+        await service.delete_files([f"{i}.txt" for i in range(11)])
+    with pytest.raises(FileValidationError):
+        await service.get_files_info([])
+
+@pytest.mark.asyncio
+async def test_httpx_backend_delete_files_against_stub(mock_settings):
+    import httpx
+    from app.core.s3_async import AsyncS3Client
+    from s3_stub import S3Stub, ACCESS_KEY, SECRET_KEY
+    
+    mock_settings.MINIO_CLIENT_BACKEND = "httpx"
+    mock_settings.MINIO_BATCH_MAX_OBJECTS = 5000
+    mock_settings.MINIO_BATCH_CONCURRENCY = 4
+    stub = S3Stub()
+    stub.buckets["test-bucket"] = {}
+    client = AsyncS3Client("stub:9000", ACCESS_KEY, SECRET_KEY, transport=httpx.ASGITransport(app=stub))
+    with patch("app.services.minio_service.get_minio_client") as mock_get:
+        mock_get.return_value.get_async_client.return_value = client
+        service = MinioService()
+    
+    names = [f"dir/<{i}> & 文件.txt" for i in range(1500)]
+    for name in names[:3]:
+        await service.put_text(name, "x")
+    info = await service.get_files_info(names[:4])
+    assert info['found'] == 3 and info['results'][3]['code'] == "FILE_NOT_FOUND"
+    
+    stub.protected.add(names[1])
+    result = await service.delete_files(names)
+    # 1500 个对象分两次 DeleteObjects 请求
+    assert sum(1 for method, _, query in stub.requests if method == "POST" and "delete" in query) == 2
+    assert result['deleted'] == 1499 and result['failed'] == 1
+    assert result['results'][1]['code'] == "AccessDenied"
+    assert list(stub.buckets["test-bucket"]) == [names[1]]
+
+@pytest.fixture
+def cached_service(mock_settings, mock_minio_client):
+    mock_settings.MINIO_INFO_CACHE_ENABLED = True
+    mock_settings.MINIO_INFO_CACHE_MAX_ENTRIES = 2
+    mock_settings.MINIO_INFO_CACHE_TTL = 60
+    mock_settings.MINIO_INFO_CACHE_NEGATIVE_TTL = 60
+    return MinioService()
+
+@pytest.mark.asyncio
+async def test_get_file_info_cache(cached_service, mock_minio_client):
+    service = cached_service
+    not_found = S3Error(code="NoSuchKey", message="Not Found", resource="/test", request_id="1", host_id="1", response="response")
+    def stat_object(bucket, name):
+        if name == "missing.txt":
+            raise not_found
+        return MagicMock(size=len(name), last_modified=datetime(2024, 1, 1), etag="e", content_type="text/plain")
+    mock_minio_client.stat_object.side_effect = stat_object
+    
+    info = await service.get_file_info("a.txt")
+    info['size'] = -1  # 修改返回值不影响缓存
+    assert (await service.get_file_info("a.txt"))['size'] == 5
+    for _ in range(2):
+        with pytest.raises(FileDownloadError) as exc:
+            await service.get_file_info("missing.txt")
+        assert exc.value.code == "FILE_NOT_FOUND"
+    assert mock_minio_client.stat_object.call_count == 2
+    
+    # 本服务写入后失效，负向缓存不再命中
+    await service.put_text("missing.txt", "now exists")
+    mock_minio_client.stat_object.side_effect = lambda bucket, name: MagicMock(
+        size=10, last_modified=datetime(2024, 1, 1), etag="e2", content_type="text/plain")
+    assert (await service.get_file_info("missing.txt"))['etag'] == "e2"
+    # 删除后失效；容量为 2，第 3 个对象淘汰最久未使用的条目
+    await service.delete_file("a.txt", check_exists=False)
+    await service.get_file_info("b.txt")
+    await service.get_file_info("c.txt")
+    
+    stats = service.info_cache_stats()
+    assert stats["enabled"] is True and stats["entries"] == 2
+    assert stats["hits"] == 1 and stats["negative_hits"] == 1 and stats["misses"] == 5
+    assert stats["invalidations"] == 2 and stats["evictions"] == 1
+
+@pytest.mark.asyncio
+async def test_get_file_info_cache_skips_stale_result(cached_service, mock_minio_client):
+    # stat 进行中对象被删除：返回的旧结果不写入缓存
+    service = cached_service
+    def stat_object(bucket, name):
+        service.info_cache.invalidate(name)
+        return MagicMock(size=1, last_modified=datetime(2024, 1, 1), etag="old", content_type="text/plain")
+    mock_minio_client.stat_object.side_effect = stat_object
+    await service.get_file_info("a.txt")
+    assert service.info_cache.get("a.txt") == (False, None)
+
+def test_info_cache_listener_invalidates_on_notification(cached_service, mock_minio_client):
+    import threading
+    service = cached_service
+    service.info_cache.set("dir/a b.txt", {"size": 1})
+    done = threading.Event()
+    
+    class Events:
+        def __enter__(self):
+            return iter([{"Records": [{"s3": {"object": {"key": "dir/a+b.txt"}}}]}])
+        def __exit__(self, *args):
+            service.stop_info_cache_listener()
+            done.set()
+    mock_minio_client.listen_bucket_notification.return_value = Events()
+    
+    service.start_info_cache_listener()
+    assert done.wait(5)
+    service._listener.join(5)
+    assert service.info_cache.get("dir/a b.txt") == (False, None)
+    assert service.info_cache.invalidations == 1
+
+@pytest.mark.asyncio
+async def test_upload_dedup_by_content_hash(mock_settings, mock_minio_client, tmp_path):
+    import hashlib
+    mock_settings.MINIO_UPLOAD_DEDUP = True
+    mock_settings.MINIO_UPLOAD_DEDUP_DB = str(tmp_path / "dedup.db")
+    mock_settings.MAX_FILE_SIZE = 1024
+    service = MinioService()
+    stored = {}
+    def put_object(**kwargs):
+        stored[kwargs['object_name']] = kwargs['data'].read(-1)
+        return MagicMock(etag=hashlib.md5(stored[kwargs['object_name']]).hexdigest())
+    def stat_object(bucket, name):
+        if name not in stored:
+            raise S3Error(code="NoSuchKey", message="Not Found", resource="/test", request_id="1", host_id="1", response="response")
+        return MagicMock(size=len(stored[name]), last_modified=datetime(2024, 1, 1),
+                         etag=hashlib.md5(stored[name]).hexdigest(), content_type="text/plain")
+    mock_minio_client.put_object.side_effect = put_object
+    mock_minio_client.stat_object.side_effect = stat_object
+    mock_minio_client.remove_object.side_effect = lambda bucket, name: stored.pop(name)
+    
+    first = await service.upload_file(BytesIO(b"same content"), "a.txt")
+    second = await service.upload_file(BytesIO(b"same content"), "b.txt")
+    assert first['deduplicated'] is False and second['deduplicated'] is True
+    assert second['object_name'] == first['object_name'] and second['original_filename'] == "b.txt"
+    assert first['content_sha256'] == hashlib.sha256(b"same content").hexdigest()
+    assert mock_minio_client.put_object.call_count == 1
+    
+    # 指定 object_name 时不去重；已删除的对象不会被复用
+    await service.upload_file(BytesIO(b"same content"), "c.txt", object_name="fixed.txt")
+    assert "fixed.txt" in stored
+    await service.delete_file(first['object_name'])
+    third = await service.upload_file(BytesIO(b"same content"), "d.txt")
+    assert third['deduplicated'] is False and third['object_name'] != first['object_name']
+    assert mock_minio_client.put_object.call_count == 3
+    
+    # 对象在外部被覆盖为长度相同的其他内容（ETag 改变）时不复用，并重新上传
+    stored[third['object_name']] = b"SAME CONTENT"
+    fourth = await service.upload_file(BytesIO(b"same content"), "e.txt")
+    assert fourth['deduplicated'] is False and fourth['object_name'] != third['object_name']
+    assert stored[fourth['object_name']] == b"same content"
+    assert (await service.upload_file(BytesIO(b"same content"), "f.txt"))['object_name'] == fourth['object_name']
+    service.dedup_index.close()
+
+def test_dedup_index_adds_etag_column_to_old_db(tmp_path):
+    import sqlite3
+    from app.core.dedup_index import DedupIndex
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE uploads (sha256 TEXT NOT NULL, content_type TEXT NOT NULL, object_name TEXT NOT NULL,"
+        " size INTEGER NOT NULL, created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP, PRIMARY KEY (sha256, content_type))"
+    )
+    conn.execute("INSERT INTO uploads (sha256, content_type, object_name, size) VALUES ('h', 'text/plain', 'a.txt', 1)")
+    conn.commit()
+    conn.close()
+    
+    index = DedupIndex(path)
+    # 旧条目没有 ETag，无法与对象当前的 ETag 匹配，命中时会被清理
+    assert index.get("h", "text/plain") == ("a.txt", "")
+    index.put("h", "text/plain", "b.txt", 1, "e1")
+    assert index.get("h", "text/plain") == ("b.txt", "e1")
+    index.close()
+
+@pytest.mark.asyncio
+async def test_presigned_urls_against_stub(service, mock_settings):
+    import json
+    import base64
+    import httpx
+    from minio.signer import post_presign_v4
+    from s3_stub import S3Stub, ACCESS_KEY, SECRET_KEY, REGION
+    
+    mock_settings.MINIO_PUBLIC_ENDPOINT = "http://stub:9000"
+    mock_settings.MINIO_ACCESS_KEY = ACCESS_KEY
+    mock_settings.MINIO_SECRET_KEY = SECRET_KEY
+    mock_settings.MINIO_REGION = REGION
+    mock_settings.MINIO_PRESIGN_EXPIRES = 600
+    stub = S3Stub()
+    stub.buckets["test-bucket"] = {}
+    
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=stub)) as http:
+        upload = await service.presigned_upload_url(filename="报告.txt")
+        assert upload['url'].startswith("http://stub:9000/test-bucket/") and upload['expires_in'] == 600
+        response = await http.put(upload['url'], content=b"direct", headers=upload['headers'])
+        assert response.status_code == 200
+        assert stub.buckets["test-bucket"][upload['object_name']][:2] == (b"direct", "text/plain")
+        
+        download = await service.presigned_download_url(upload['object_name'], expires=60, filename="报告.txt")
+        response = await http.get(download['url'])
+        assert response.status_code == 200 and response.content == b"direct"
+        # 篡改对象名称后签名失效
+        response = await http.get(download['url'].replace("/test-bucket/", "/test-bucket/x"))
+        assert response.status_code == 403
+    
+    with pytest.raises(FileValidationError):
+        await service.presigned_upload_url(filename="a.exe")
+    with pytest.raises(FileValidationError):
+        await service.presigned_download_url("a.txt", expires=8 * 24 * 3600)
+    
+    post = await service.presigned_post_policy(object_name="dir/a.jpg", max_size=1024)
+    fields = post['fields']
+    assert post['url'] == "http://stub:9000/test-bucket"
+    assert fields['key'] == "dir/a.jpg" and fields['Content-Type'] == "image/jpeg"
+    date = datetime.strptime(fields['x-amz-date'], "%Y%m%dT%H%M%SZ")
+    assert fields['x-amz-signature'] == post_presign_v4(fields['policy'], SECRET_KEY, date, REGION)
+    conditions = json.loads(base64.b64decode(fields['policy']))['conditions']
+    assert ["content-length-range", 0, 1024] in conditions and ["eq", "$key", "dir/a.jpg"] in conditions
+    with pytest.raises(FileValidationError):
+        await service.presigned_post_policy(filename="a.txt", max_size=mock_settings.MAX_FILE_SIZE + 1)
+
+@pytest.fixture
+def stub_service(mock_settings):
+    import httpx
+    from app.core.s3_async import AsyncS3Client
+    from s3_stub import S3Stub, ACCESS_KEY, SECRET_KEY
+    
+    mock_settings.MINIO_CLIENT_BACKEND = "httpx"
+    mock_settings.MINIO_INFO_CACHE_ENABLED = True
+    mock_settings.MINIO_INFO_CACHE_MAX_ENTRIES = 100
+    mock_settings.MINIO_INFO_CACHE_TTL = 60
+    mock_settings.MINIO_INFO_CACHE_NEGATIVE_TTL = 60
+    stub = S3Stub()
+    client = AsyncS3Client("stub:9000", ACCESS_KEY, SECRET_KEY, transport=httpx.ASGITransport(app=stub))
+    with patch("app.services.minio_service.get_minio_client") as mock_get:
+        mock_get.return_value.get_async_client.return_value = client
+        service = MinioService()
+    service.READ_CHUNK_SIZE = 4
+    return service, stub
+
+async def _collect(chunks):
+    return b"".join([chunk async for chunk in chunks])
+
+def test_info_cache_is_opt_in():
+    from app.core.config import Settings
+    # 缓存默认关闭；开启后默认也不缓存“文件不存在”，避免轮询外部写入的客户端持续得到旧结果
+    assert Settings.model_fields["MINIO_INFO_CACHE_ENABLED"].default is False
+    assert Settings.model_fields["MINIO_INFO_CACHE_NEGATIVE_TTL"].default == 0
+
+@pytest.mark.asyncio
+async def test_presign_clears_negative_info_cache(stub_service, mock_settings):
+    import httpx
+    from s3_stub import ACCESS_KEY, SECRET_KEY, REGION
+    service, stub = stub_service
+    mock_settings.MINIO_PUBLIC_ENDPOINT = "http://stub:9000"
+    mock_settings.MINIO_ACCESS_KEY = ACCESS_KEY
+    mock_settings.MINIO_SECRET_KEY = SECRET_KEY
+    mock_settings.MINIO_REGION = REGION
+    mock_settings.MINIO_PRESIGN_EXPIRES = 600
+    await service.put_text("other.txt", "x")
+    
+    with pytest.raises(FileDownloadError):
+        await service.get_file_info("direct.txt")
+    upload = await service.presigned_upload_url(object_name="direct.txt")
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=stub)) as http:
+        assert (await http.put(upload['url'], content=b"direct", headers=upload['headers'])).status_code == 200
+    assert (await service.get_file_info("direct.txt"))['size'] == 6
+
+@pytest.mark.asyncio
+async def test_open_object_ranges_and_conditions(stub_service):
+    service, stub = stub_service
+    await service.put_text("doc.txt", "0123456789")
+    
+    info, chunks = await service.open_object("doc.txt")
+    assert info['range'] is None and await _collect(chunks) == b"0123456789"
+    info, chunks = await service.open_object("doc.txt", 2, 5)
+    assert info['range'] == (2, 5) and await _collect(chunks) == b"2345"
+    info, chunks = await service.open_object("doc.txt", None, 3)
+    assert info['range'] == (7, 9) and await _collect(chunks) == b"789"
+    info, chunks = await service.open_object("doc.txt", 8, None)
+    assert await _collect(chunks) == b"89"
+    with pytest.raises(FileValidationError) as exc:
+        await service.open_object("doc.txt", 10, None)
+    assert exc.value.code == "RANGE_NOT_SATISFIABLE"
+    
+    info, chunks = await service.open_object("doc.txt", if_none_match=[info['etag']])
+    assert chunks is None
+    with pytest.raises(FileDownloadError) as exc:
+        await service.open_object("missing.txt")
+    assert exc.value.code == "FILE_NOT_FOUND"
+    
+    # 对象被外部改写：缓存中的 ETag 过期，If-Match 失败后刷新并重试
+    data, content_type, _, last_modified = stub.buckets["test-bucket"]["doc.txt"]
+    stub.buckets["test-bucket"]["doc.txt"] = (b"abc", content_type, "changed", last_modified)
+    info, chunks = await service.open_object("doc.txt")
+    assert info['etag'] == "changed" and await _collect(chunks) == b"abc"
+    
+    await service.put_text("big.txt", "中文" * 10)
+    result = await service.read_range("big.txt", 0, 7)
+    assert result['length'] == 7 and result['truncated'] is True and result['size'] == 60
+    assert result['content'] == "中文�"
+    with pytest.raises(FileValidationError):
+        await service.read_range("big.txt", 0, service.READ_RANGE_MAX + 1)
+
+def test_download_object_route(stub_service):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from app.api.routes import minio as minio_routes
+    service, stub = stub_service
+    app = FastAPI()
+    app.include_router(minio_routes.router, prefix="/api/v1/minio")
+    
+    with patch.object(minio_routes, "minio_service", service), TestClient(app) as client:
+        client.portal.call(service.put_text, "dir/报告.txt", "0123456789")
+        url = "/api/v1/minio/objects/dir/报告.txt"
+        response = client.get(url)
+        assert response.status_code == 200 and response.content == b"0123456789"
+        assert response.headers["accept-ranges"] == "bytes" and response.headers["content-length"] == "10"
+        etag = response.headers["etag"]
+        
+        response = client.get(url, headers={"Range": "bytes=-4"})
+        assert response.status_code == 206 and response.content == b"6789"
+        assert response.headers["content-range"] == "bytes 6-9/10"
+        assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+        response = client.get(url, headers={"Range": "bytes=20-"})
+        assert response.status_code == 416 and response.headers["content-range"] == "bytes */10"
+        # 多段 Range 忽略，返回整个文件
+        assert client.get(url, headers={"Range": "bytes=0-1,4-5"}).status_code == 200
+        assert client.get("/api/v1/minio/objects/missing.txt").status_code == 404
+        
+        # 响应中没有 Last-Modified 时文件信息为 None，下载响应省略该响应头
+        client.portal.call(service.put_text, "no-mtime.txt", "abc")
+        data, content_type, etag, _ = stub.buckets["test-bucket"]["no-mtime.txt"]
+        stub.buckets["test-bucket"]["no-mtime.txt"] = (data, content_type, etag, None)
+        service.info_cache.clear()
+        assert client.portal.call(service.get_file_info, "no-mtime.txt")['last_modified'] is None
+        response = client.get("/api/v1/minio/objects/no-mtime.txt")
+        assert response.status_code == 200 and "last-modified" not in response.headers
+
+@pytest.mark.asyncio
+async def test_open_object_sdk_backend(service, mock_minio_client):
+    mock_minio_client.stat_object.return_value = MagicMock(
+        size=10, last_modified=datetime(2024, 1, 1), etag="e1", content_type="text/plain")
+    response = MagicMock()
+    response.stream.return_value = iter([b"2345"])
+    mock_minio_client.get_object.return_value = response
+    
+    info, chunks = await service.open_object("a.txt", 2, 5)
+    assert await _collect(chunks) == b"2345"
+    mock_minio_client.get_object.assert_called_once_with(
+        "test-bucket", "a.txt", offset=2, length=4, request_headers={'If-Match': '"e1"'})
+    response.release_conn.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_open_object_sdk_holds_one_executor_slot(service, mock_minio_client):
+    import threading
+    executor = BoundedExecutor(max_workers=2, queue_size=0)
+    service.client_manager.get_executor.return_value = executor
+    service._bucket_checked = True
+    mock_minio_client.stat_object.return_value = MagicMock(
+        size=6, last_modified=datetime(2024, 1, 1), etag="e1", content_type="text/plain")
+    response = MagicMock()
+    response.stream.return_value = iter([b"ab", b"cd", b"ef"])
+    mock_minio_client.get_object.return_value = response
+    
+    info, chunks = await service.open_object("a.txt")
+    # 下载已开始（第一块已读取）后线程池被占满：后续数据块不再经过准入，下载完整结束
+    release = threading.Event()
+    blocker = asyncio.create_task(service._run_in_thread(release.wait, 5))
+    await asyncio.sleep(0.05)
+    with pytest.raises(ServiceBusyError):
+        await service._run_in_thread(lambda: None)
+    assert await _collect(chunks) == b"abcdef"
+    response.release_conn.assert_called_once()
+    
+    # 线程池已满时打开下载立即失败（路由在发送响应前返回 503）
+    running = asyncio.create_task(service._run_in_thread(release.wait, 5))
+    await asyncio.sleep(0.05)
+    with pytest.raises(ServiceBusyError):
+        await service.open_object("a.txt")
+    release.set()
+    await asyncio.gather(blocker, running)
+    
+    # 提前结束迭代时读取线程退出并释放名额
+    response.stream.return_value = iter([b"ab", b"cd", b"ef", b"gh", b"ij"])
+    info, chunks = await service.open_object("a.txt")
+    assert await chunks.__anext__() == b"ab"
+    await chunks.aclose()
+    for _ in range(50):
+        if executor.stats()["completed"] == executor.stats()["submitted"]:
+            break
+        await asyncio.sleep(0.01)
+    assert executor.stats()["active"] == 0
+    executor.shutdown()
@@ -0,0 +1,57 @@
+import time
+import pytest
+from httpx import AsyncClient, ASGITransport
+from app.main import app
+from app.core.result_cache import ResultCache
+from app.services.text_splitter_service import TextSplitterService
+
+@pytest.mark.asyncio
+async def test_result_cache_lru_byte_bound():
+    cache = ResultCache(max_bytes=30)  # 每个条目序列化后 12 字节
+    await cache.set("a", "x" * 10)
+    await cache.set("b", "y" * 10)
+    assert await cache.get("a") == "x" * 10  # a 变为最近使用
+    await cache.set("c", "z" * 10)            # 超出 30 字节，淘汰最久未使用的 b
+    assert await cache.get("b") is None
+    assert await cache.get("a") == "x" * 10
+    await cache.set("huge", "h" * 100)        # 单条超限不进入缓存
+    assert await cache.get("huge") is None
+    stats = cache.stats()
+    assert stats["bytes"] <= 30
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 2 and stats["misses"] == 2
+
+@pytest.mark.asyncio
+async def test_result_cache_ttl_and_disk_tier(tmp_path):
+    cache = ResultCache(max_bytes=1024, ttl=60, disk_dir=str(tmp_path), disk_max_bytes=1024)
+    value = {"result": "分块结果"}
+    await cache.set("k" * 64, value)
+
+    # 新实例（模拟重启）从磁盘命中
+    restarted = ResultCache(max_bytes=1024, ttl=60, disk_dir=str(tmp_path), disk_max_bytes=1024)
+    assert await restarted.get("k" * 64) == value
+    assert restarted.stats()["disk_hits"] == 1
+
+    # 过期后不再命中
+    restarted.ttl = 0.01
+    time.sleep(0.02)
+    assert await restarted.get("k" * 64) is None
+    assert restarted.stats()["disk_entries"] == 0
+    assert not any(tmp_path.rglob("*.json"))
+
+@pytest.mark.asyncio
+async def test_split_uses_cache_and_metrics():
+    service = TextSplitterService(executor_mode="inline", cache=ResultCache(max_bytes=1024 * 1024))
+    content = "# 标题\n" + "段落内容。\n" * 100
+    first = await service.split("pdf", content, 300, 100)
+    first["result"] = "modified"  # 修改返回值不影响缓存
+    second = await service.split("pdf", content, 300, 100)
+    assert second == await TextSplitterService(executor_mode="inline").split("pdf", content, 300, 100)
+    await service.split("pdf", content, 300, 120)
+    stats = service.cache_stats()
+    assert stats["hits"] == 1 and stats["misses"] == 2
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        response = await ac.get("/metrics")
+    assert response.status_code == 200
+    assert "hits" in response.json()["text_splitter_cache"]
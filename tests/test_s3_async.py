@@ -0,0 +1,102 @@
+import gzip
+import pytest
+import httpx
+import urllib.parse
+from datetime import datetime, timezone
+from minio.credentials import Credentials
+from minio.error import S3Error
+from minio.signer import sign_v4_s3
+from app.core import s3_async
+from app.core.s3_async import AsyncS3Client, SigV4Signer
+from s3_stub import S3Stub, ACCESS_KEY, SECRET_KEY, REGION
+
+def make_client(stub, secret_key=SECRET_KEY):
+    return AsyncS3Client(
+        "stub:9000", ACCESS_KEY, secret_key, region=REGION, transport=httpx.ASGITransport(app=stub)
+    )
+
+def test_signer_matches_minio_sdk():
+    date = datetime(2025, 12, 25, 10, 0, 0, tzinfo=timezone.utc)
+    headers = {"host": "localhost:9000", "content-type": "text/plain"}
+    payload_hash = "e3b0c44298fc1c149afbf4c8996fb92427ae41e4649b934ca495991b7852b855"
+    signed = SigV4Signer("ak", "sk", "us-east-1").sign(
+        "PUT", "/bucket/a%20b/%E4%B8%AD.txt", {"partNumber": "1", "uploadId": "x y"}, headers, payload_hash, now=date
+    )
+    expected = sign_v4_s3(
+        method="PUT",
+        url=urllib.parse.urlsplit("http://localhost:9000/bucket/a%20b/%E4%B8%AD.txt?partNumber=1&uploadId=x%20y"),
+        region="us-east-1",
+        headers={k: v for k, v in signed.items() if k != "authorization"},
+        credentials=Credentials("ak", "sk"),
+        content_sha256=payload_hash,
+        date=date,
+    )
+    assert signed["authorization"] == expected["Authorization"]
+
+@pytest.mark.asyncio
+async def test_async_client_against_stub(monkeypatch):
+    monkeypatch.setattr(s3_async, "MIN_PART_SIZE", 4)
+    stub = S3Stub()
+    client = make_client(stub)
+    assert not await client.bucket_exists("b")
+    await client.make_bucket("b")
+    assert await client.bucket_exists("b")
+
+    await client.put_object("b", "目录/a b.txt", b"hello", "text/plain")
+    stat = await client.stat_object("b", "目录/a b.txt")
+    assert stat.size == 5 and stat.content_type == "text/plain" and stat.last_modified is not None
+    assert b"".join([chunk async for chunk in client.get_object("b", "目录/a b.txt", 2)]) == b"hello"
+
+    # 分片上传：10 字节按 4 字节分片
+    data = iter([b"0123", b"4567", b"89", b""])
+    async def read(size):
+        return next(data)
+    result = await client.put_object_stream("b", "big.bin", read, part_size=4)
+    assert stub.buckets["b"]["big.bin"][0] == b"0123456789"
+    assert result.etag.endswith("-3") and not stub.uploads
+
+    # read 返回的字节数少于请求时继续读取，直到读满分片或结束
+    def short_reader(payload):
+        buffer = bytearray(payload)
+        async def read(size):
+            chunk = bytes(buffer[:min(size, 3)])
+            del buffer[:len(chunk)]
+            return chunk
+        return read
+    await client.put_object_stream("b", "short.bin", short_reader(b"0123456789"), part_size=4)
+    assert stub.buckets["b"]["short.bin"][0] == b"0123456789"
+    await client.put_object_stream("b", "small.bin", short_reader(b"abcd"), part_size=8)
+    assert stub.buckets["b"]["small.bin"][0] == b"abcd"
+
+    # 读取出错时中止分片上传
+    async def failing_read(size, chunks=iter([b"0123", b"4567"])):
+        chunk = next(chunks, None)
+        if chunk is None:
+            raise OSError("disk error")
+        return chunk
+    with pytest.raises(OSError):
+        await client.put_object_stream("b", "broken.bin", failing_read, part_size=4)
+    assert not stub.uploads and "broken.bin" not in stub.buckets["b"]
+
+    # 分片小于 MIN_PART_SIZE 时在传输任何数据之前拒绝
+    monkeypatch.setattr(s3_async, "MIN_PART_SIZE", 5 * 1024 * 1024)
+    before = len(stub.requests)
+    with pytest.raises(ValueError):
+        await client.put_object_stream("b", "tiny.bin", short_reader(b"0123456789"), part_size=4)
+    assert len(stub.requests) == before
+
+    # 带 Content-Encoding 的对象按存储的原始字节返回，不在本地解压
+    compressed = gzip.compress(b"hello hello hello")
+    await client.put_object("b", "gz.txt", compressed, "text/plain")
+    stub.encodings["gz.txt"] = "gzip"
+    assert b"".join([chunk async for chunk in client.get_object("b", "gz.txt", 4)]) == compressed
+    assert b"".join([chunk async for chunk in client.get_object("b", "gz.txt", 4, offset=2, length=5)]) == compressed[2:7]
+
+    await client.remove_object("b", "big.bin")
+    with pytest.raises(S3Error) as exc:
+        await client.stat_object("b", "big.bin")
+    assert exc.value.code == "NoSuchKey"
+    with pytest.raises(S3Error) as exc:
+        await make_client(stub, secret_key="wrong").remove_object("b", "目录/a b.txt")
+    assert exc.value.code == "SignatureDoesNotMatch"
+    await client.aclose()
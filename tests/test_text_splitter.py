@@ -1,5 +1,10 @@
+import json
+import time
+import random
 import pytest
-from app.services.text_splitter_service import text_splitter_service
+from httpx import AsyncClient, ASGITransport
+from app.main import app
+from app.services.text_splitter_service import text_splitter_service, TextSplitterService, SegmentedText, MarkdownTable
 
 @pytest.mark.asyncio
 async def test_split_pdf_text():
@@ -9,6 +14,24 @@ async def test_split_pdf_text():
     assert isinstance(result["result"], str)
     assert "This is a test content for PDF mode." in result["result"]
 
+@pytest.mark.asyncio
+async def test_split_pdf_text_overlap_and_atomic_blocks():
+    # 基于区间的 PDF 流水线（粗切 + overlap、父块细化、子块拆分）须与原字符串拼接实现的输出逐字一致
+    content = (
+        "# 第一章\n第一章的正文，包含两句话。第二句话在这里！\n"
+        "# 第二章\n【图片主题：流程图】第二章正文。\n\n补充说明一句。\n"
+        "# 第三章\n<table><tr><th>名称</th></tr><tr><td>苹果</td></tr></table>\n"
+        "# 第四章\n" + "很长的第四章内容。" * 8
+    )
+    result = await text_splitter_service.split("pdf", content, 60, 30, overlap=10)
+    assert result["result"].split("\n\n\n\n") == [
+        "# 第一章\n第一章的正文，包含两句话。第二句话在这里！\n\n\n# 第二章\n\n\n【图片主题：流程图】\n\n\n第二章正文。\n\n补充说明一句。",
+        "。",
+        "补充说明一句。\n# 第三章\n\n\n| 名称 |\n| ---------- |\n| 苹果 |\n\n\n# 第四章",
+        "很长的第四章内容。很长的第四章内容。很长的第四章内容\n\n\n很长的第四章内容。很长的第四章内容。很长的第四章内容"
+        "\n\n\n很长的第四章内容。很长的第四章内容。",
+    ]
+
 @pytest.mark.asyncio
 async def test_split_table_text():
     content = "| Header 1 | Header 2 |\n| --- | --- |\n| Cell 1 | Cell 2 |"
@@ -35,3 +58,419 @@ async def test_invalid_mode():
 async def test_image_mode_missing_url():
     with pytest.raises(ValueError):
         await text_splitter_service.split("image", "content")
+
+def test_segmented_text_skips_atomic_blocks():
+    source = "前言【图片主题：a\n\nb】正文\n| a |\n\n| b |\n\n结尾<<ATOMIC_IMG_0>>\n\n"
+    segments = text_splitter_service._segment_content(source)
+    # 用户内容中的占位符字样只是普通文本
+    assert [(seg.kind, source[seg.start:seg.end]) for seg in segments.atomic] == [
+        ("IMG", "【图片主题：a\n\nb】"), ("TAB", "| a |\n\n| b |\n\n"),
+    ]
+    # 分隔符只在普通文本中查找，不会落入原子块内部或跨越其边界
+    found = []
+    pos = segments.find("\n\n", 0, len(source))
+    while pos >= 0:
+        found.append(pos)
+        pos = segments.find("\n\n", pos + 1, len(source))
+    assert found == [len(source) - 2]
+    parts = list(segments.iter_parts(0, len(source)))
+    assert [part.kind for part in parts] == ["TEXT", "IMG", "TEXT", "TAB", "TEXT"]
+    assert "".join(source[part.start:part.end] for part in parts) == source
+    assert list(segments.iter_parts(0, len(source), reverse=True)) == parts[::-1]
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("executor_mode", ["thread", "process"])
+async def test_split_in_executor_matches_inline(executor_mode):
+    content = "# 标题\n" + "段落内容，用于测试。\n\n" * 200 + "| a | b |\n| --- | --- |\n| 1 | 2 |\n"
+    inline = TextSplitterService(executor_mode="inline")
+    service = TextSplitterService(executor_mode=executor_mode, max_workers=1, inline_threshold=0)
+    try:
+        expected = await inline.split("pdf", content, 300, 100, overlap=20)
+        assert await service.split("pdf", content, 300, 100, overlap=20) == expected
+        with pytest.raises(ValueError):
+            await service.split("invalid_mode", content)
+    finally:
+        service.shutdown()
+
+def test_invalid_executor_mode():
+    with pytest.raises(ValueError):
+        TextSplitterService(executor_mode="gpu")
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("executor_mode", ["inline", "thread"])
+async def test_iter_split_yields_parent_blocks(executor_mode):
+    content = "# 第一章\n" + "第一章内容。\n" * 80 + "# 第二章\n" + "第二章内容。\n" * 80
+    service = TextSplitterService(executor_mode=executor_mode, max_workers=1, inline_threshold=0)
+    try:
+        expected = await service.split("pdf", content, 400, 100)
+        blocks = [block async for block in service.iter_split("pdf", content, 400, 100)]
+    finally:
+        service.shutdown()
+    assert len(blocks) > 1
+    assert "\n\n\n\n".join(blocks) == expected["result"]
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("mode", ["pdf", "table"])
+async def test_iter_split_matches_split_header_repair(mode):
+    # 父块以 '##' 加换行结尾、下一父块为标题行：修复结果须与 split 的正则修复一致
+    content = "正文内容。###\n##\n正文内容。正文内容。##正文内容。##\n# 标题\n\n# 标题\n### 标题\n###\n\n"
+    expected = await text_splitter_service.split(mode, content, 24, 21)
+    blocks = [block async for block in text_splitter_service.iter_split(mode, content, 24, 21)]
+    assert "# # # 标题" in expected["result"]
+    assert "\n\n\n\n".join(blocks) == expected["result"]
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("seed", range(5))
+async def test_iter_fix_broken_headers_matches_regex(seed):
+    rng = random.Random(seed)
+    sep = "\n\n\n\n"
+    pieces = ["#", "###", " ", "\n", "\t", "a", "Title", sep]
+
+    async def agen(items):
+        for item in items:
+            yield item
+
+    for _ in range(500):
+        blocks = ["".join(rng.choice(pieces) for _ in range(rng.randint(0, 6))) for _ in range(rng.randint(1, 6))]
+        once = TextSplitterService._fix_broken_headers(sep.join(blocks), sep)
+        streamed = [b async for b in TextSplitterService._iter_fix_broken_headers(agen(blocks), sep)]
+        assert sep.join(streamed) == once
+        twice = TextSplitterService._iter_fix_broken_headers(TextSplitterService._iter_fix_broken_headers(agen(blocks), sep), sep)
+        assert sep.join([b async for b in twice]) == TextSplitterService._fix_broken_headers(once, sep)
+
+@pytest.mark.asyncio
+async def test_text_splitter_stream_tool_without_progress_token():
+    from unittest.mock import AsyncMock, MagicMock
+    from app.plugins.text_splitter import text_splitter_stream
+    content = "# A\n" + "内容。\n" * 100
+    expected = [b async for b in text_splitter_service.iter_split("pdf", content, 200)]
+
+    # 未携带 progressToken：进度通知会被丢弃，父块在结果中返回
+    ctx = MagicMock()
+    ctx.request_context.meta = None
+    ctx.report_progress = AsyncMock()
+    result = await text_splitter_stream("pdf", content, ctx, parent_block_size=200)
+    assert result["blocks"] == expected and result["parent_blocks"] == len(expected) > 1
+    ctx.report_progress.assert_not_called()
+
+    ctx.request_context.meta = MagicMock(progressToken="t1")
+    result = await text_splitter_stream("pdf", content, ctx, parent_block_size=200)
+    assert "blocks" not in result
+    assert [c.kwargs["message"] for c in ctx.report_progress.call_args_list] == expected
+
+@pytest.mark.asyncio
+async def test_split_stream_endpoint():
+    payload = {"mode": "pdf", "content": "# A\n" + "内容。\n" * 100, "parent_block_size": 200}
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        response = await ac.post("/api/v1/split/stream", json=payload)
+        invalid = await ac.post("/api/v1/split/stream", json={"mode": "bad", "content": "x"})
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [item["index"] for item in lines] == list(range(len(lines)))
+    assert len(lines) > 1
+    assert invalid.status_code == 400
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("mode", ["pdf", "table"])
+async def test_split_structured_offsets(mode):
+    if mode == "pdf":
+        content = "# 第一章\n" + "第一章内容。\n" * 60 + "【图片主题：示例】\n" + "# 第二章\n" + "第二章内容。\n" * 60
+    else:
+        content = "说明\n| a | b |\n| --- | --- |\n" + "".join(f"| {i} | 值{i} |\n" for i in range(80))
+    text = await text_splitter_service.split(mode, content, 300, 100, sub_separator="\n\n\n")
+    structured = await text_splitter_service.split(mode, content, 300, 100, sub_separator="\n\n\n", output="structured")
+    assert "content" not in structured
+
+    def piece(entry):
+        return content[entry[0]:entry[1]] if len(entry) == 2 else entry[2]
+
+    blocks = []
+    for block in structured["result"]:
+        subs = [piece(entry) for entry in block["subs"]]
+        body = "\n\n\n".join(subs)
+        if "header" in block:
+            body = piece(block["header"]) + "\n" + body
+        assert block["length"] == len(body) - 3 * (len(subs) - 1)
+        blocks.append(body)
+    assert len(blocks) > 1
+    assert "\n\n\n\n".join(blocks) == text["result"]
+
+@pytest.mark.asyncio
+async def test_split_structured_html_and_invalid_output():
+    content = "前言\n<table><tr><th>a</th></tr><tr><td>1</td></tr></table>\n结尾"
+    structured = await text_splitter_service.split("pdf", content, output="structured")
+    source = structured["content"]
+    assert "| a |" in source
+    assert [source[s:e] for s, e in structured["result"][0]["subs"]] == ["前言", "| a |\n| ---------- |\n| 1 |", "结尾"]
+    with pytest.raises(ValueError):
+        await text_splitter_service.split("pdf", content, output="json")
+
+@pytest.mark.asyncio
+async def test_split_table_multiple_tables_keeps_prose():
+    content = (
+        "前言段落。\n\n| a | b |\n|---|---|\n| 1 | 2 |\n| 3 | 4 |\n"
+        "中间说明。\n| 仅表头 |\n|---|\n\n| x | y |\n| - | - |\n| 5 | 6 |\n\n结尾。"
+    )
+    result = await text_splitter_service.split("table", content, 200, 100, sub_separator="\n\n\n")
+    assert result["result"].split("\n\n\n\n") == [
+        "前言段落。",
+        "| a | b |\n|---|---|\n| 1 | 2 |\n| 3 | 4 |",
+        "中间说明。\n\n\n| 仅表头 |\n|---|",
+        "| x | y |\n| - | - |\n| 5 | 6 |",
+        "结尾。",
+    ]
+    streamed = [b async for b in text_splitter_service.iter_split("table", content, 200, 100, sub_separator="\n\n\n")]
+    assert "\n\n\n\n".join(streamed) == result["result"]
+
+@pytest.mark.asyncio
+async def test_split_table_empty_cell_row_is_data():
+    content = "| 名称 | 数量 |\n|---|---|\n| 苹果 | 1 |\n|  |  |\n| 香蕉 | 2 |\n| 梨 | 3 |"
+    result = await text_splitter_service.split("table", content, 40, 30)
+    header = "| 名称 | 数量 |\n|---|---|\n"
+    assert result["result"].split("\n\n\n\n") == [
+        header + "| 苹果 | 1 |", header + "|  |  |", header + "| 香蕉 | 2 |", header + "| 梨 | 3 |",
+    ]
+
+@pytest.mark.asyncio
+async def test_split_table_several_tables():
+    # 表格中间形似分隔行的行按数据行处理；空行后的 表头 + 分隔行 开始新表格
+    content = (
+        "| a | b |\n|:-:|---|\n| 1 | 2 |\n| - | -- |\n| 3 | 4 |\n\n"
+        "| c |\n| --- |\n| 5 |\n|   |\n\n| 6 |\n"
+        "说明\n| d | e |\n|---|---:|\n| 7 | 8 |"
+    )
+    result = await text_splitter_service.split("table", content, 200, 100)
+    assert result["result"].split("\n\n\n\n") == [
+        "| a | b |\n|:-:|---|\n| 1 | 2 |\n| - | -- |\n| 3 | 4 |",
+        "| c |\n| --- |\n| 5 |\n|   |\n| 6 |",
+        "说明",
+        "| d | e |\n|---|---:|\n| 7 | 8 |",
+    ]
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("executor_mode", ["inline", "thread", "process"])
+async def test_split_batch_matches_split(executor_mode):
+    inline = TextSplitterService(executor_mode="inline")
+    documents = [
+        {"content": f"# 文档{i}\n" + "段落内容，用于测试。\n" * (20 + i * 10)} for i in range(5)
+    ]
+    documents.append({"content": "| a | b |\n| --- | --- |\n| 1 | 2 |", "mode": "table"})
+    documents.append({"content": "x", "mode": "bad"})
+    service = TextSplitterService(executor_mode=executor_mode, max_workers=2, inline_threshold=500)
+    try:
+        results = await service.split_batch(documents, mode="pdf", parent_block_size=300, sub_block_size=100)
+    finally:
+        service.shutdown()
+    for document, result in zip(documents[:-1], results):
+        kwargs = {"mode": "pdf", "parent_block_size": 300, "sub_block_size": 100, **document}
+        assert result == await inline.split(**kwargs)
+    assert "error" in results[-1]
+    with pytest.raises(ValueError):
+        await inline.split_batch([{"content": "x", "unknown": 1}], mode="pdf")
+
+@pytest.mark.asyncio
+async def test_split_batch_endpoint():
+    payload = {
+        "documents": [{"content": "# A\n" + "内容。\n" * 50}, {"content": "x", "mode": "bad"}],
+        "parent_block_size": 200,
+    }
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        response = await ac.post("/api/v1/split/batch", json=payload)
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert results[0] == await text_splitter_service.split("pdf", payload["documents"][0]["content"], 200, 512)
+    assert "error" in results[1]
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("encoding", ["identity", "gzip", "zstd"])
+async def test_split_endpoint_compression(encoding):
+    import gzip
+    payload = {"mode": "pdf", "content": "# A\n" + "内容。\n" * 500, "parent_block_size": 200}
+    body = json.dumps(payload).encode()
+    if encoding == "gzip":
+        body = gzip.compress(body)
+    elif encoding == "zstd":
+        zstandard = pytest.importorskip("zstandard")
+        body = zstandard.ZstdCompressor().compress(body)
+    headers = {"Content-Encoding": encoding, "Accept-Encoding": encoding, "Content-Type": "application/json"}
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        response = await ac.post("/api/v1/split", content=body, headers=headers)
+        invalid = await ac.post("/api/v1/split", json={"mode": "bad", "content": "x"})
+        unsupported = await ac.post("/api/v1/split", content=b"x", headers={"Content-Encoding": "br"})
+    assert response.status_code == 200
+    if encoding != "identity":
+        assert response.headers["content-encoding"] == encoding
+    assert response.json() == await text_splitter_service.split(**payload)
+    assert invalid.status_code == 400
+    assert unsupported.status_code == 415
+
+@pytest.mark.asyncio
+async def test_split_endpoint_rejects_oversized_body(monkeypatch):
+    import gzip
+    from app.api.routes import split as split_route
+    monkeypatch.setattr(split_route.settings, "TEXT_SPLITTER_MAX_REQUEST_SIZE", 10_000)
+    # 压缩后很小、解压后超限
+    body = gzip.compress(json.dumps({"mode": "pdf", "content": "a" * 100_000}).encode())
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        response = await ac.post("/api/v1/split", content=body, headers={"Content-Encoding": "gzip"})
+    assert response.status_code == 413
+
+@pytest.mark.asyncio
+async def test_split_object_reads_and_writes_minio(monkeypatch):
+    from app.services import text_splitter_service as module
+    content = "# A\n" + "内容。\n" * 100
+    stored = {}
+
+    class FakeMinio:
+        async def read_text(self, object_name):
+            return content
+
+        async def put_text(self, object_name, text, content_type="text/plain; charset=utf-8"):
+            stored[object_name] = text
+            return {"object_name": object_name, "size": len(text.encode("utf-8")), "etag": "e"}
+
+    monkeypatch.setattr(module, "get_minio_service", lambda: FakeMinio())
+    service = TextSplitterService(executor_mode="inline")
+    expected = await service.split("pdf", content, 200, 100)
+    assert await service.split_object("doc.txt", "pdf", parent_block_size=200, sub_block_size=100) == expected
+
+    stats = await service.split_object("doc.txt", "pdf", "doc.chunks.txt", parent_block_size=200, sub_block_size=100)
+    assert stored["doc.chunks.txt"] == expected["result"]
+    assert stats["parent_blocks"] == len(expected["result"].split("\n\n\n\n"))
+    assert stats["content_length"] == len(content)
+
+def test_fix_broken_headers_pattern_cached_per_separator():
+    from app.services.text_splitter_service import _broken_header_pattern
+    fixed = TextSplitterService._fix_broken_headers("正文#\n*+*\n标题", "\n*+*\n")
+    assert fixed == "正文\n*+*\n# 标题"
+    assert _broken_header_pattern("\n*+*\n") is _broken_header_pattern("\n*+*\n")
+    assert TextSplitterService._fix_broken_headers("无标题", "\n*+*\n") == "无标题"
+
+
+def _reference_table_blocks(header_str, data_rows, parent_block_size, sub_block_size, sub_separator):
+    """原 _split_table_text 的 O(n^2) 分块实现，作为线性实现的对照"""
+    parent_blocks = []
+    current_parent_subs = []
+    current_sub_rows = []
+
+    def sub_len(rows):
+        return sum(len(r) for r in rows) + len(rows) - 1 if rows else 0
+
+    def parent_len(subs):
+        if not subs:
+            return len(header_str)
+        return len(header_str) + 1 + sum(len(x) for x in subs) + len(sub_separator) * (len(subs) - 1)
+
+    def emit():
+        parent_blocks.append(header_str + "\n" + sub_separator.join(current_parent_subs))
+
+    for row in data_rows:
+        temp_sub_rows = current_sub_rows + [row]
+        limit = sub_block_size
+        if not current_parent_subs:
+            limit = max(0, limit - (len(header_str) + 1))
+        if sub_len(temp_sub_rows) <= limit:
+            if parent_len(current_parent_subs + ["\n".join(temp_sub_rows)]) <= parent_block_size:
+                current_sub_rows.append(row)
+            elif current_sub_rows:
+                current_parent_subs.append("\n".join(current_sub_rows))
+                emit()
+                current_parent_subs = []
+                current_sub_rows = [row]
+            else:
+                current_sub_rows.append(row)
+        elif current_sub_rows:
+            sub_str = "\n".join(current_sub_rows)
+            if parent_len(current_parent_subs + [sub_str]) > parent_block_size and current_parent_subs:
+                emit()
+                current_parent_subs = []
+            current_parent_subs.append(sub_str)
+            current_sub_rows = [row]
+            if parent_len(current_parent_subs + [row]) > parent_block_size:
+                emit()
+                current_parent_subs = []
+        else:
+            current_sub_rows.append(row)
+
+    if current_sub_rows:
+        sub_str = "\n".join(current_sub_rows)
+        if parent_len(current_parent_subs + [sub_str]) <= parent_block_size:
+            current_parent_subs.append(sub_str)
+            emit()
+        else:
+            if current_parent_subs:
+                emit()
+            parent_blocks.append(header_str + "\n" + sub_str)
+    elif current_parent_subs:
+        emit()
+    return parent_blocks
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("seed", range(20))
+async def test_table_chunker_matches_reference(seed):
+    rng = random.Random(seed)
+    service = TextSplitterService(executor_mode="inline")
+    for _ in range(25):
+        cols = rng.randint(1, 6)
+        header = "| " + " | ".join(f"列{i}" for i in range(cols)) + " |\n| " + " | ".join(["---"] * cols) + " |"
+        rows = [
+            "| " + " | ".join("x" * rng.choice([0, 1, 3, 8, 20, 60, 200]) for _ in range(cols)) + " |"
+            for _ in range(rng.randint(0, 120))
+        ]
+        table = MarkdownTable(header, (0, len(header)), rows, [0] * len(rows))
+        parent_size = rng.choice([1, 40, 100, 256, 512, 1024, 4000])
+        sub_size = rng.choice([1, 20, 64, 128, 320, 800])
+        sub_separator = rng.choice(["\n\n\n", "/--S--/", "", "\\n\\n\\n"])
+        blocks = [
+            service._render_table_block(table, ranges, sub_separator)
+            async for ranges in service._iter_table_rows(table, parent_size, sub_size, sub_separator)
+        ]
+        assert blocks == _reference_table_blocks(header, rows, parent_size, sub_size, sub_separator)
+
+def _reference_atomic_tokens(text):
+    """原实现：先用正则替换图片块，再在替换后的文本上用多行正则识别表格行"""
+    import re
+    contents = {}
+
+    def image(match):
+        token_id = f"<<ATOMIC_IMG_{len(contents)}>>"
+        contents[token_id] = ("IMG", match.group(0))
+        return token_id
+
+    def table(match):
+        full = re.sub(r"<<ATOMIC_IMG_\d+>>", lambda m: contents[m.group(0)][1], match.group(0))
+        token_id = f"<<ATOMIC_TAB_{len(contents)}>>"
+        contents[token_id] = ("TAB", full)
+        return token_id
+
+    text = re.sub(r"【(?:图片主题|图片解析内容).*?】", image, text, flags=re.DOTALL)
+    text = re.sub(r"(?:^\s*\|.*\|\s*$\n?)+", table, text, flags=re.MULTILINE)
+    return [contents[token_id] for token_id in re.findall(r"<<ATOMIC_\w+_\d+>>", text)]
+
+@pytest.mark.parametrize("seed", range(5))
+def test_atomic_scanner_matches_regex_reference(seed):
+    rng = random.Random(seed)
+    fragments = [
+        "| a | b |", "|x|", "| a", "a |", "|", "||", " | c | ", "\n", "\n", "  \n", "\r\n", "\t", "正文", "　",
+        "【图片主题：x\ny】", "【图片解析内容：|a|\n】", "【图片主题：未闭合", "】", "【其他】", "| 【图片主题：z】 |",
+    ]
+    for _ in range(400):
+        text = "".join(rng.choice(fragments) for _ in range(rng.randint(1, 15)))
+        tokens = TextSplitterService._scan_atomic_segments(text)
+        assert [(t.kind, text[t.start:t.end]) for t in tokens] == _reference_atomic_tokens(text)
+
+def _best_runtime(func, arg, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(arg)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def test_atomic_scanner_is_linear_on_pathological_input():
+    # 输入放大 4 倍：线性实现耗时约 4 倍，平方级约 16 倍；比较比值而非绝对耗时，不受机器负载影响
+    makers = (lambda n: "【图片主题：x" * n, lambda n: "|\n" + " \n" * n + "x", lambda n: "| a | b\n" * n)
+    for make, n in zip(makers, (5000, 12500, 12500)):
+        small = _best_runtime(TextSplitterService._scan_atomic_segments, make(n))
+        large = _best_runtime(TextSplitterService._scan_atomic_segments, make(4 * n))
+        assert large / small < 10